@@ -0,0 +1,194 @@
+"""
+E-Commerce Warehouse DAG
+Runs the same stages as ``python -m src.run_pipeline``, one task per loader
+step, so a failure only retries the step that failed and independent steps
+run in parallel across workers:
+
+    check_connection >> ensure_staging_tables
+        >> list_<table>_shards >> load_staging_<table> (mapped: one task per CSV shard)
+        >> load_dim_customers / load_dim_products / load_dim_date (each after its source table)
+        >> prune_facts, plan_fact_partitions
+        >> load_fact_slice (mapped: one task per order month)
+        >> load_agg_daily_sales, load_customer_analytics
+        >> validate
+
+A staging table's shards are ``<table>.csv`` and ``<table>_*.csv`` in
+PIPELINE_DATA_DIR. Every task that touches the warehouse runs in the Airflow
+pool AIRFLOW_DB_POOL (default ``ecommerce_dw``), which caps concurrent DB
+sessions however wide the mapped tasks fan out:
+
+    airflow pools set ecommerce_dw 4 "E-commerce warehouse connections"
+
+Local run without a scheduler (against the Postgres in .env):
+    python airflow/dags/ecommerce_pipeline.py
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from airflow.sdk import dag, task
+from airflow.sdk.exceptions import AirflowFailException
+
+# Make the project importable when the DAG folder is parsed on its own
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# Every task loads or transforms: use the etl workload profile (read by src.utils.config)
+os.environ.setdefault('DB_WORKLOAD', 'etl')
+
+from src.loaders.csv_to_postgres import CSVLoader
+from src.transformers.load_dimensions import DimensionLoader
+
+DATA_DIR = os.getenv('PIPELINE_DATA_DIR', str(PROJECT_ROOT / 'data' / 'sample'))
+DB_POOL = os.getenv('AIRFLOW_DB_POOL', 'ecommerce_dw')
+
+default_args = {
+    'owner': 'data-engineering',
+    'retries': 2,
+    'retry_delay': timedelta(minutes=2),
+    'pool': DB_POOL,
+}
+
+
+@task
+def check_connection():
+    """Fail fast when the warehouse is unreachable"""
+    from src.utils.db_connection import db
+
+    if not db.test_connection():
+        raise AirflowFailException("Database connection failed")
+
+
+@task
+def ensure_staging_tables():
+    """Create the staging tables (idempotent)"""
+    CSVLoader().ensure_tables()
+
+
+@task(pool='default_pool')
+def list_shards(table, data_dir=DATA_DIR):
+    """CSV shards for a staging table: <table>.csv and <table>_*.csv"""
+    directory = Path(data_dir)
+    shards = sorted(directory.glob(f"{table}.csv")) + sorted(directory.glob(f"{table}_*.csv"))
+    if not shards:
+        raise AirflowFailException(f"No {table} CSV files in {directory}")
+    return [str(path) for path in shards]
+
+
+@task
+def load_staging_shard(table, csv_path):
+    """Upsert one CSV shard into its staging table (safe to run shards in parallel)"""
+    return CSVLoader().load_table(table, csv_path)
+
+
+@task
+def load_dimension(dim_table):
+    """Load one dimension table"""
+    return getattr(DimensionLoader(), f"load_{dim_table}")()
+
+
+@task
+def prune_facts():
+    """Delete fact rows for orders that are no longer staged"""
+    from src.transformers.load_facts import FactLoader
+
+    return FactLoader().prune_facts()
+
+
+@task
+def plan_fact_partitions():
+    """Monthly order-date ranges to load as parallel fact slices"""
+    from src.transformers.load_facts import FactLoader
+
+    return FactLoader().fact_partitions()
+
+
+@task
+def load_fact_slice(partition):
+    """Upsert fact_orders, fact_order_items (and order_lines_wide) for one month"""
+    from src.transformers.load_facts import FactLoader
+
+    return FactLoader().load_fact_slice(partition['start_date'], partition['end_date'])
+
+
+@task
+def load_agg_daily_sales():
+    """Rebuild the daily sales aggregate once every slice is loaded"""
+    from src.transformers.load_facts import FactLoader
+
+    return FactLoader().load_agg_daily_sales()
+
+
+@task
+def load_customer_analytics():
+    """Rebuild the RFM and cohort retention marts"""
+    from src.transformers.customer_analytics import CustomerAnalyticsLoader
+
+    return CustomerAnalyticsLoader().load_all()
+
+
+@task
+def validate():
+    """Run the data quality rules; failing rules fail the task"""
+    from src.utils.config import config
+    from src.utils.data_quality import DataQualityEngine
+
+    report = DataQualityEngine(mode=config.DQ_MODE).run()
+    report.print_report()
+    if not report.passed:
+        issues = [f"{r['table']}: {r['rule']}" for r in report.failures]
+        raise AirflowFailException(f"Data quality issues found: {issues}")
+    return report.table_rows
+
+
+@dag(
+    dag_id='ecommerce_pipeline',
+    description='CSV -> staging -> dimensions -> facts -> analytics marts',
+    schedule='@daily',
+    start_date=datetime(2024, 10, 1),
+    catchup=False,
+    max_active_runs=1,
+    default_args=default_args,
+    tags=['ecommerce', 'etl'],
+)
+def ecommerce_pipeline():
+    tables_ready = ensure_staging_tables()
+    check_connection() >> tables_ready
+
+    # Staging: one mapped task instance per CSV shard
+    staged = {}
+    for table in CSVLoader.TABLES:
+        shards = list_shards.override(task_id=f"list_{table}_shards")(table)
+        tables_ready >> shards
+        staged[table] = (
+            load_staging_shard.override(task_id=f"load_staging_{table}")
+            .partial(table=table)
+            .expand(csv_path=shards)
+        )
+
+    # Dimensions: each starts as soon as its only source table is staged
+    dimensions = []
+    for dim_table, source in DimensionLoader.SOURCE_TABLES.items():
+        dimension = load_dimension.override(task_id=f"load_{dim_table}")(dim_table)
+        staged[source] >> dimension
+        dimensions.append(dimension)
+
+    # Facts: one mapped task instance per order month
+    pruned = prune_facts()
+    partitions = plan_fact_partitions()
+    for upstream in [*staged.values(), *dimensions]:
+        upstream >> [pruned, partitions]
+    slices = load_fact_slice.expand(partition=partitions)
+    pruned >> slices
+
+    slices >> [load_agg_daily_sales(), load_customer_analytics()] >> validate()
+
+
+dag = ecommerce_pipeline()
+
+
+if __name__ == "__main__":
+    dag.test()
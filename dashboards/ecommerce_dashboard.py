@@ -2,7 +2,6 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from sqlalchemy import create_engine, text
 import sys
 from pathlib import Path
 
@@ -10,7 +9,14 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from src.utils.async_db import async_db
 from src.utils.config import config
+from src.utils.db_connection import db
+from src.utils.frames import FrameCache
+from src.utils.kpis import TIME_PERIODS, panel_queries, revenue_trend, sales_overview, trend_bucket
+
+# Dashboard sessions use the interactive pool and session settings (statement timeout, small work_mem)
+db.use_workload('interactive')
 
 # Page configuration
 st.set_page_config(
@@ -36,15 +42,33 @@ st.markdown("""
     """, unsafe_allow_html=True)
 
 @st.cache_resource
-def get_connection():
-    """Create database connection"""
-    return create_engine(config.database_url)
+def get_frame_cache():
+    """Result cache shared by all sessions, bounded by DASHBOARD_CACHE_MB"""
+    return FrameCache(int(config.DASHBOARD_CACHE_MB * 1024 * 1024), ttl=config.DASHBOARD_CACHE_TTL)
+
+TREND_TITLES = {'day': 'Daily', 'week': 'Weekly', 'month': 'Monthly'}
+
+def load_trend(days, max_points):
+    """Load the bucketed revenue trend (compacted and cached like the panels)"""
+    def load():
+        with db.read_connection() as conn:
+            return revenue_trend(conn, days, max_points=max_points)[0]
+    return get_frame_cache().get_or_load(('revenue_trend', days, max_points), load)
+
+def load_panels(queries):
+    """Load every panel at once: cache misses are fetched concurrently on the async pool"""
+    cache = get_frame_cache()
+    frames = cache.get_or_load_many(
+        queries.values(),
+        lambda missing: async_db.run(async_db.fetch_frames(missing, read_only=True))
+    )
+    return {name: frames[sql] for name, sql in queries.items()}
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def load_data(query):
-    """Load data from database"""
-    engine = get_connection()
-    return pd.read_sql(query, engine)
+@st.cache_data(ttl=300)
+def load_kpis(days, exact=False):
+    """Load KPIs from the daily aggregates (or exactly from fact_orders)"""
+    with db.read_connection() as conn:
+        return sales_overview(conn, days, exact=exact)
 
 def main():
     """Main dashboard function"""
@@ -57,34 +81,23 @@ def main():
     st.sidebar.header("📊 Filters")
     date_range = st.sidebar.selectbox(
         "Time Period",
-        ["Last 7 Days", "Last 30 Days", "Last 90 Days", "All Time"]
+        list(TIME_PERIODS)
     )
+    days = TIME_PERIODS[date_range]
     
-    # Map selection to days
-    days_map = {
-        "Last 7 Days": 7,
-        "Last 30 Days": 30,
-        "Last 90 Days": 90,
-        "All Time": 9999
-    }
-    days = days_map[date_range]
+    exact_counts = st.sidebar.checkbox(
+        "Exact distinct counts (audit)",
+        value=False,
+        help="Count unique customers exactly instead of from HyperLogLog sketches"
+    )
+    
+    # Fan out all panel queries up front instead of one round trip per panel
+    panels = load_panels(panel_queries(days))
     
     # ===== KPI METRICS =====
     st.header("📈 Key Performance Indicators")
     
-    kpi_query = f"""
-        SELECT 
-            COUNT(DISTINCT order_id) as total_orders,
-            COUNT(DISTINCT customer_key) as total_customers,
-            COALESCE(SUM(total_amount), 0) as revenue,
-            COALESCE(AVG(total_amount), 0) as avg_order_value,
-            COALESCE(SUM(profit), 0) as profit
-        FROM marts.fact_orders
-        WHERE order_date >= CURRENT_DATE - INTERVAL '{days} days'
-            AND status = 'completed'
-    """
-    
-    kpis = load_data(kpi_query).iloc[0]
+    kpis = load_kpis(days, exact_counts)
     
     col1, col2, col3, col4, col5 = st.columns(5)
     
@@ -98,8 +111,8 @@ def main():
     with col2:
         st.metric(
             label="Unique Customers",
-            value=f"{int(kpis['total_customers']):,}",
-            delta="Active customers"
+            value=f"{'' if kpis['exact'] else '≈'}{kpis['unique_customers']:,}",
+            delta="Active customers" if kpis['exact'] else f"±{kpis['unique_customers_error'] * 100:.1f}% (HLL)"
         )
     
     with col3:
@@ -113,7 +126,7 @@ def main():
         st.metric(
             label="Total Profit",
             value=f"${kpis['profit']:,.2f}",
-            delta=f"{(kpis['profit']/kpis['revenue']*100):.1f}% margin"
+            delta=f"{(kpis['profit'] / kpis['revenue'] * 100 if kpis['revenue'] else 0):.1f}% margin"
         )
     
     with col5:
@@ -128,21 +141,8 @@ def main():
     # ===== REVENUE TREND =====
     st.header("📊 Revenue Trend Over Time")
     
-    trend_query = f"""
-        SELECT 
-            d.date,
-            COALESCE(SUM(f.total_amount), 0) as revenue,
-            COALESCE(SUM(f.profit), 0) as profit,
-            COUNT(DISTINCT f.order_id) as orders
-        FROM marts.dim_date d
-        LEFT JOIN marts.fact_orders f ON d.date_key = f.order_date_key 
-            AND f.status = 'completed'
-        WHERE d.date >= CURRENT_DATE - INTERVAL '{days} days'
-        GROUP BY d.date
-        ORDER BY d.date
-    """
-    
-    trend_df = load_data(trend_query)
+    # Day/week/month buckets from agg_daily_sales, LTTB-capped at DASHBOARD_TREND_POINTS
+    trend_df = load_trend(days, config.DASHBOARD_TREND_POINTS)
     
     if not trend_df.empty:
         fig = go.Figure()
@@ -163,7 +163,7 @@ def main():
         ))
         
         fig.update_layout(
-            title="Daily Revenue & Profit",
+            title=f"{TREND_TITLES[trend_bucket(days)]} Revenue & Profit",
             xaxis_title="Date",
             yaxis_title="Amount ($)",
             hovermode='x unified',
@@ -180,23 +180,7 @@ def main():
     with col1:
         st.subheader("🏆 Top 10 Products by Revenue")
         
-        products_query = f"""
-            SELECT 
-                p.product_name,
-                p.category,
-                COALESCE(SUM(fi.total_price), 0) as revenue,
-                SUM(fi.quantity) as units_sold
-            FROM marts.dim_products p
-            JOIN marts.fact_order_items fi ON p.product_key = fi.product_key
-            JOIN marts.fact_orders fo ON fi.order_key = fo.order_key
-            WHERE fo.order_date >= CURRENT_DATE - INTERVAL '{days} days'
-                AND fo.status = 'completed'
-            GROUP BY p.product_key, p.product_name, p.category
-            ORDER BY revenue DESC
-            LIMIT 10
-        """
-        
-        products_df = load_data(products_query)
+        products_df = panels['products']
         
         if not products_df.empty:
             fig = px.bar(
@@ -214,21 +198,7 @@ def main():
     with col2:
         st.subheader("📦 Revenue by Category")
         
-        category_query = f"""
-            SELECT 
-                p.category,
-                COALESCE(SUM(fi.total_price), 0) as revenue,
-                COUNT(DISTINCT fi.order_key) as orders
-            FROM marts.dim_products p
-            JOIN marts.fact_order_items fi ON p.product_key = fi.product_key
-            JOIN marts.fact_orders fo ON fi.order_key = fo.order_key
-            WHERE fo.order_date >= CURRENT_DATE - INTERVAL '{days} days'
-                AND fo.status = 'completed'
-            GROUP BY p.category
-            ORDER BY revenue DESC
-        """
-        
-        category_df = load_data(category_query)
+        category_df = panels['category']
         
         if not category_df.empty:
             fig = px.pie(
@@ -249,20 +219,7 @@ def main():
     with col1:
         st.subheader("👥 Customer Segments")
         
-        segments_query = f"""
-            SELECT 
-                c.customer_segment,
-                COUNT(DISTINCT c.customer_key) as customers,
-                COALESCE(SUM(f.total_amount), 0) as revenue
-            FROM marts.dim_customers c
-            LEFT JOIN marts.fact_orders f ON c.customer_key = f.customer_key
-            WHERE f.order_date >= CURRENT_DATE - INTERVAL '{days} days'
-                AND f.status = 'completed'
-            GROUP BY c.customer_segment
-            ORDER BY revenue DESC
-        """
-        
-        segments_df = load_data(segments_query)
+        segments_df = panels['segments']
         
         if not segments_df.empty:
             fig = px.bar(
@@ -279,20 +236,7 @@ def main():
     with col2:
         st.subheader("📍 Top 10 Countries by Revenue")
         
-        country_query = f"""
-            SELECT 
-                c.country,
-                COALESCE(SUM(f.total_amount), 0) as revenue
-            FROM marts.dim_customers c
-            JOIN marts.fact_orders f ON c.customer_key = f.customer_key
-            WHERE f.order_date >= CURRENT_DATE - INTERVAL '{days} days'
-                AND f.status = 'completed'
-            GROUP BY c.country
-            ORDER BY revenue DESC
-            LIMIT 10
-        """
-        
-        country_df = load_data(country_query)
+        country_df = panels['country']
         
         if not country_df.empty:
             fig = px.bar(
@@ -308,27 +252,52 @@ def main():
     
     st.markdown("---")
     
+    # ===== RFM & COHORTS =====
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("🎯 RFM Segments")
+        
+        rfm_df = panels['rfm']
+        
+        if not rfm_df.empty:
+            fig = px.bar(
+                rfm_df,
+                x='rfm_segment',
+                y='customers',
+                color='revenue',
+                hover_data=['avg_recency_days'],
+                title="Customers by RFM Segment (all time)",
+                labels={'rfm_segment': 'Segment', 'customers': 'Customers', 'revenue': 'Revenue ($)'}
+            )
+            fig.update_layout(height=350)
+            st.plotly_chart(fig, use_container_width=True)
+    
+    with col2:
+        st.subheader("🔁 Cohort Retention")
+        
+        cohort_df = panels['cohort']
+        
+        if not cohort_df.empty:
+            matrix = cohort_df.pivot(index='cohort_month', columns='months_since', values='retention_rate')
+            matrix.index = matrix.index.strftime('%Y-%m')
+            fig = px.imshow(
+                matrix,
+                color_continuous_scale='Blues',
+                zmin=0,
+                zmax=1,
+                title="Share of Cohort Ordering N Months Later (last 12 cohorts)",
+                labels={'x': 'Months since first order', 'y': 'Cohort', 'color': 'Retention'}
+            )
+            fig.update_layout(height=350)
+            st.plotly_chart(fig, use_container_width=True)
+    
+    st.markdown("---")
+    
     # ===== DATA TABLE =====
     st.header("📋 Recent Orders")
     
-    orders_query = f"""
-        SELECT 
-            fo.order_id,
-            dc.full_name as customer,
-            dc.country,
-            fo.order_date,
-            fo.status,
-            fo.total_items,
-            fo.total_amount,
-            fo.profit
-        FROM marts.fact_orders fo
-        JOIN marts.dim_customers dc ON fo.customer_key = dc.customer_key
-        WHERE fo.order_date >= CURRENT_DATE - INTERVAL '{days} days'
-        ORDER BY fo.order_date DESC
-        LIMIT 100
-    """
-    
-    orders_df = load_data(orders_query)
+    orders_df = panels['orders']
     
     if not orders_df.empty:
         # Format currency columns
@@ -342,6 +311,19 @@ def main():
             hide_index=True
         )
     
+    # Cache memory accounting (rendered last, once every panel has loaded)
+    cache = get_frame_cache()
+    with st.sidebar.expander("🧠 Cache Memory"):
+        st.caption(
+            f"{cache.total_bytes / 1e6:,.1f} MB of {cache.max_bytes / 1e6:,.0f} MB budget, "
+            f"{cache.evictions} evictions"
+        )
+        st.dataframe(cache.report(), hide_index=True, use_container_width=True)
+    
+    # Time this server process spent waiting for pooled connections, per workload profile
+    with st.sidebar.expander("⏳ Connection Waits"):
+        st.dataframe(pd.DataFrame(db.wait_report()), hide_index=True, use_container_width=True)
+    
     # Footer
     st.markdown("---")
     st.markdown(
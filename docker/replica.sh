@@ -0,0 +1,13 @@
+#!/bin/bash
+# Entrypoint of the postgres-replica service: a streaming replica of `postgres`
+set -e
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    mkdir -p "$PGDATA"
+    chown postgres:postgres "$PGDATA"
+    chmod 700 "$PGDATA"
+    # Clone the primary; -R writes standby.signal and primary_conninfo
+    gosu postgres pg_basebackup -h postgres -U "$POSTGRES_USER" -D "$PGDATA" -R -X stream -P
+fi
+
+exec gosu postgres postgres
@@ -0,0 +1,4 @@
+#!/bin/bash
+# Primary init script: allow streaming replication connections from the compose network
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -1,3 +1,21 @@
+-- Staging tables created by older loaders (pandas to_sql with if_exists='replace')
+-- have no primary key, which the upsert load path needs. They only hold copies
+-- of the source CSV files, so drop them and let them be recreated below.
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['customers', 'products', 'orders', 'order_items'] LOOP
+        IF to_regclass('staging.' || t) IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conrelid = to_regclass('staging.' || t) AND contype = 'p'
+        ) THEN
+            EXECUTE format('DROP TABLE staging.%I', t);
+            RAISE NOTICE 'Dropped staging.% (no primary key), it will be recreated', t;
+        END IF;
+    END LOOP;
+END $$;
+
 -- Staging: Customers
 CREATE TABLE IF NOT EXISTS staging.customers (
     customer_id INTEGER PRIMARY KEY,
@@ -76,11 +76,112 @@ CREATE TABLE IF NOT EXISTS marts.fact_order_items (
     profit DECIMAL(12, 2)
 );
 
+-- Aggregate: Daily Sales (per day and order status)
+CREATE TABLE IF NOT EXISTS marts.agg_daily_sales (
+    date_key INTEGER REFERENCES marts.dim_date(date_key),
+    date DATE,
+    status VARCHAR(50),
+    total_orders INTEGER,
+    unique_customers INTEGER,
+    total_items INTEGER,
+    revenue DECIMAL(14, 2),
+    cost DECIMAL(14, 2),
+    profit DECIMAL(14, 2),
+    customer_sketch BYTEA,  -- HyperLogLog sketch of customer_key (src/utils/hyperloglog.py)
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (date_key, status)
+);
+
+-- Added after the first release of agg_daily_sales
+ALTER TABLE marts.agg_daily_sales ADD COLUMN IF NOT EXISTS customer_sketch BYTEA;
+
+-- Wide order lines: fact_order_items joined with its order, customer, product
+-- and date attributes, so analytical queries can scan a single table.
+-- Rows are written in order_date order (see FactLoader.load_order_lines_wide).
+CREATE TABLE IF NOT EXISTS marts.order_lines_wide (
+    order_item_key INTEGER PRIMARY KEY,
+    order_key INTEGER,
+    order_id INTEGER,
+    order_date TIMESTAMP,
+    order_date_key INTEGER,
+    year INTEGER,
+    quarter INTEGER,
+    month INTEGER,
+    month_name VARCHAR(20),
+    week INTEGER,
+    day_of_week INTEGER,
+    day_name VARCHAR(20),
+    is_weekend BOOLEAN,
+    is_holiday BOOLEAN,
+    status VARCHAR(50),
+    customer_key INTEGER,
+    customer_id INTEGER,
+    customer_name VARCHAR(255),
+    country VARCHAR(100),
+    customer_segment VARCHAR(50),
+    product_key INTEGER,
+    product_id INTEGER,
+    product_name VARCHAR(255),
+    category VARCHAR(100),
+    quantity INTEGER,
+    unit_price DECIMAL(10, 2),
+    total_price DECIMAL(12, 2),
+    unit_cost DECIMAL(10, 2),
+    total_cost DECIMAL(12, 2),
+    profit DECIMAL(12, 2),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Customer RFM scores (src/transformers/customer_analytics.py)
+CREATE TABLE IF NOT EXISTS marts.customer_rfm (
+    customer_key INTEGER PRIMARY KEY REFERENCES marts.dim_customers(customer_key),
+    first_order_date TIMESTAMP,
+    last_order_date TIMESTAMP,
+    frequency INTEGER,
+    monetary DECIMAL(14, 2),
+    recency_days INTEGER,
+    r_score SMALLINT,
+    f_score SMALLINT,
+    m_score SMALLINT,
+    rfm_segment VARCHAR(30),
+    cohort_month DATE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Quintile cutoffs of the last full RFM scoring pass: the highest recency_days
+-- and lowest frequency/monetary reaching each score, used to score new customers
+CREATE TABLE IF NOT EXISTS marts.customer_rfm_cutoffs (
+    score SMALLINT PRIMARY KEY,
+    recency_days INTEGER,
+    frequency INTEGER,
+    monetary DECIMAL(14, 2),
+    as_of DATE,
+    scored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Monthly cohort retention: share of each first-order month's customers
+-- who ordered again months_since months later
+CREATE TABLE IF NOT EXISTS marts.cohort_retention (
+    cohort_month DATE,
+    months_since INTEGER,
+    active_customers INTEGER,
+    cohort_size INTEGER,
+    retention_rate DECIMAL(6, 4),
+    PRIMARY KEY (cohort_month, months_since)
+);
+
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_fact_orders_customer ON marts.fact_orders(customer_key);
 CREATE INDEX IF NOT EXISTS idx_fact_orders_date ON marts.fact_orders(order_date_key);
 CREATE INDEX IF NOT EXISTS idx_fact_order_items_order ON marts.fact_order_items(order_key);
 CREATE INDEX IF NOT EXISTS idx_fact_order_items_product ON marts.fact_order_items(product_key);
+CREATE INDEX IF NOT EXISTS idx_fact_order_items_order_id ON marts.fact_order_items(order_id);
+CREATE INDEX IF NOT EXISTS idx_agg_daily_sales_date ON marts.agg_daily_sales(date);
+CREATE INDEX IF NOT EXISTS idx_order_lines_wide_date ON marts.order_lines_wide USING BRIN (order_date);
+CREATE INDEX IF NOT EXISTS idx_order_lines_wide_order_id ON marts.order_lines_wide(order_id);
+CREATE INDEX IF NOT EXISTS idx_customer_rfm_cohort ON marts.customer_rfm(cohort_month);
+-- Customers changed since the last rescore, counted on every stream refresh
+CREATE INDEX IF NOT EXISTS idx_customer_rfm_updated_at ON marts.customer_rfm(updated_at);
 
 -- Log completion
 DO $$
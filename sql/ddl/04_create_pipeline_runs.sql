@@ -0,0 +1,31 @@
+-- Pipeline run checkpoints (used by `python -m src.run_pipeline --resume`)
+CREATE SCHEMA IF NOT EXISTS etl;
+
+-- One row per pipeline run
+CREATE TABLE IF NOT EXISTS etl.pipeline_runs (
+    run_id SERIAL PRIMARY KEY,
+    input_fingerprint VARCHAR(64) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP,
+    error_message TEXT
+);
+
+-- One row per completed stage of a run
+CREATE TABLE IF NOT EXISTS etl.pipeline_stages (
+    run_id INTEGER REFERENCES etl.pipeline_runs(run_id),
+    stage VARCHAR(50),
+    input_fingerprint VARCHAR(64) NOT NULL,
+    row_counts JSONB,
+    duration_seconds DECIMAL(10, 3),
+    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (run_id, stage)
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_runs_fingerprint ON etl.pipeline_runs(input_fingerprint, status);
+
+-- Log completion
+DO $$
+BEGIN
+    RAISE NOTICE 'Pipeline run tables created successfully';
+END $$;
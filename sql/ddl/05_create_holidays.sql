@@ -0,0 +1,82 @@
+-- Holidays used to flag marts.dim_date (is_holiday). Edit or extend this list
+-- and re-run the pipeline; DimensionLoader.load_dim_date refreshes the flags.
+CREATE TABLE IF NOT EXISTS marts.holidays (
+    holiday_date DATE PRIMARY KEY,
+    holiday_name VARCHAR(100) NOT NULL
+);
+
+-- Widely observed public holidays, 2020-2030
+INSERT INTO marts.holidays (holiday_date, holiday_name) VALUES
+    ('2020-01-01', 'New Year''s Day'),
+    ('2020-04-10', 'Good Friday'),
+    ('2020-04-13', 'Easter Monday'),
+    ('2020-05-01', 'Labour Day'),
+    ('2020-12-25', 'Christmas Day'),
+    ('2020-12-26', 'Boxing Day'),
+    ('2021-01-01', 'New Year''s Day'),
+    ('2021-04-02', 'Good Friday'),
+    ('2021-04-05', 'Easter Monday'),
+    ('2021-05-01', 'Labour Day'),
+    ('2021-12-25', 'Christmas Day'),
+    ('2021-12-26', 'Boxing Day'),
+    ('2022-01-01', 'New Year''s Day'),
+    ('2022-04-15', 'Good Friday'),
+    ('2022-04-18', 'Easter Monday'),
+    ('2022-05-01', 'Labour Day'),
+    ('2022-12-25', 'Christmas Day'),
+    ('2022-12-26', 'Boxing Day'),
+    ('2023-01-01', 'New Year''s Day'),
+    ('2023-04-07', 'Good Friday'),
+    ('2023-04-10', 'Easter Monday'),
+    ('2023-05-01', 'Labour Day'),
+    ('2023-12-25', 'Christmas Day'),
+    ('2023-12-26', 'Boxing Day'),
+    ('2024-01-01', 'New Year''s Day'),
+    ('2024-03-29', 'Good Friday'),
+    ('2024-04-01', 'Easter Monday'),
+    ('2024-05-01', 'Labour Day'),
+    ('2024-12-25', 'Christmas Day'),
+    ('2024-12-26', 'Boxing Day'),
+    ('2025-01-01', 'New Year''s Day'),
+    ('2025-04-18', 'Good Friday'),
+    ('2025-04-21', 'Easter Monday'),
+    ('2025-05-01', 'Labour Day'),
+    ('2025-12-25', 'Christmas Day'),
+    ('2025-12-26', 'Boxing Day'),
+    ('2026-01-01', 'New Year''s Day'),
+    ('2026-04-03', 'Good Friday'),
+    ('2026-04-06', 'Easter Monday'),
+    ('2026-05-01', 'Labour Day'),
+    ('2026-12-25', 'Christmas Day'),
+    ('2026-12-26', 'Boxing Day'),
+    ('2027-01-01', 'New Year''s Day'),
+    ('2027-03-26', 'Good Friday'),
+    ('2027-03-29', 'Easter Monday'),
+    ('2027-05-01', 'Labour Day'),
+    ('2027-12-25', 'Christmas Day'),
+    ('2027-12-26', 'Boxing Day'),
+    ('2028-01-01', 'New Year''s Day'),
+    ('2028-04-14', 'Good Friday'),
+    ('2028-04-17', 'Easter Monday'),
+    ('2028-05-01', 'Labour Day'),
+    ('2028-12-25', 'Christmas Day'),
+    ('2028-12-26', 'Boxing Day'),
+    ('2029-01-01', 'New Year''s Day'),
+    ('2029-03-30', 'Good Friday'),
+    ('2029-04-02', 'Easter Monday'),
+    ('2029-05-01', 'Labour Day'),
+    ('2029-12-25', 'Christmas Day'),
+    ('2029-12-26', 'Boxing Day'),
+    ('2030-01-01', 'New Year''s Day'),
+    ('2030-04-19', 'Good Friday'),
+    ('2030-04-22', 'Easter Monday'),
+    ('2030-05-01', 'Labour Day'),
+    ('2030-12-25', 'Christmas Day'),
+    ('2030-12-26', 'Boxing Day')
+ON CONFLICT (holiday_date) DO NOTHING;
+
+-- Log completion
+DO $$
+BEGIN
+    RAISE NOTICE 'Holiday table created successfully';
+END $$;
@@ -0,0 +1,91 @@
+-- Compact fact storage (optional, COMPACT_FACTS; built by FactLoader.load_compact_facts)
+-- The same rows as fact_orders / fact_order_items, stored for fast aggregates:
+--   * money as integer cents: BIGINT for totals and profit, INTEGER for unit
+--     prices (up to 21,474,836.47 per unit), so SUMs use integer arithmetic
+--     instead of NUMERIC
+--   * INTEGER quantities / item counts like the source facts (SMALLINT would
+--     fail the whole load on one line or order above 32,767 and saves at most
+--     2 bytes once rows are aligned)
+--   * fixed-width columns declared widest first so no alignment padding is
+--     needed between them; the variable-length status goes last
+CREATE TABLE IF NOT EXISTS marts.fact_orders_compact (
+    order_date TIMESTAMP,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    total_amount_cents BIGINT,
+    total_cost_cents BIGINT,
+    profit_cents BIGINT,
+    order_key INTEGER PRIMARY KEY,
+    order_id INTEGER UNIQUE,
+    customer_key INTEGER,
+    order_date_key INTEGER,
+    total_items INTEGER,
+    status VARCHAR(50)
+);
+
+CREATE TABLE IF NOT EXISTS marts.fact_order_items_compact (
+    total_price_cents BIGINT,
+    total_cost_cents BIGINT,
+    profit_cents BIGINT,
+    order_item_key INTEGER PRIMARY KEY,
+    order_key INTEGER,
+    product_key INTEGER,
+    order_id INTEGER,
+    product_id INTEGER,
+    unit_price_cents INTEGER,
+    unit_cost_cents INTEGER,
+    quantity INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_fact_orders_compact_date ON marts.fact_orders_compact(order_date_key);
+CREATE INDEX IF NOT EXISTS idx_fact_order_items_compact_order_id ON marts.fact_order_items_compact(order_id);
+
+-- Widen SMALLINT counts of tables created by earlier versions (the views they
+-- depend on are recreated below)
+DO $$
+BEGIN
+    IF (SELECT atttypid = 'smallint'::regtype FROM pg_attribute
+        WHERE attrelid = to_regclass('marts.fact_orders_compact') AND attname = 'total_items') THEN
+        DROP VIEW IF EXISTS marts.fact_orders_compat;
+        ALTER TABLE marts.fact_orders_compact ALTER COLUMN total_items TYPE INTEGER;
+    END IF;
+    IF (SELECT atttypid = 'smallint'::regtype FROM pg_attribute
+        WHERE attrelid = to_regclass('marts.fact_order_items_compact') AND attname = 'quantity') THEN
+        DROP VIEW IF EXISTS marts.fact_order_items_compat;
+        ALTER TABLE marts.fact_order_items_compact ALTER COLUMN quantity TYPE INTEGER;
+    END IF;
+END $$;
+
+-- Compatibility views: the compact facts with the columns and DECIMAL types of
+-- fact_orders / fact_order_items, for queries written against those tables.
+-- Aggregate the *_cents columns directly (SUM(x_cents) / 100.0) for speed.
+CREATE OR REPLACE VIEW marts.fact_orders_compat AS
+SELECT
+    order_key,
+    order_id,
+    customer_key,
+    order_date_key,
+    order_date,
+    status,
+    total_items,
+    (total_amount_cents / 100.0)::DECIMAL(12, 2) AS total_amount,
+    (total_cost_cents / 100.0)::DECIMAL(12, 2) AS total_cost,
+    (profit_cents / 100.0)::DECIMAL(12, 2) AS profit,
+    created_at,
+    updated_at
+FROM marts.fact_orders_compact;
+
+CREATE OR REPLACE VIEW marts.fact_order_items_compat AS
+SELECT
+    order_item_key,
+    order_key,
+    product_key,
+    order_id,
+    product_id,
+    quantity,
+    (unit_price_cents / 100.0)::DECIMAL(10, 2) AS unit_price,
+    (total_price_cents / 100.0)::DECIMAL(12, 2) AS total_price,
+    (unit_cost_cents / 100.0)::DECIMAL(10, 2) AS unit_cost,
+    (total_cost_cents / 100.0)::DECIMAL(12, 2) AS total_cost,
+    (profit_cents / 100.0)::DECIMAL(12, 2) AS profit
+FROM marts.fact_order_items_compact;
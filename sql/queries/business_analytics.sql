@@ -28,6 +28,7 @@ SELECT
 FROM marts.dim_date d
 LEFT JOIN marts.fact_orders f ON d.date_key = f.order_date_key
 WHERE d.date >= CURRENT_DATE - INTERVAL '90 days'
+    AND d.date <= CURRENT_DATE
 GROUP BY d.date, d.day_name, d.is_weekend
 ORDER BY d.date DESC;
 
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+CLI Startup Benchmark
+Measures how long each entry point takes to import and print --help, and
+which modules dominate import time (via `python -X importtime`).
+
+Usage:
+    python -m src.benchmarks.cli_startup --repeat 5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+ENTRY_POINTS = {
+    "run_pipeline --help": [sys.executable, "-m", "src.run_pipeline", "--help"],
+    "run_analytics --help": [sys.executable, "-m", "src.utils.run_analytics", "--help"],
+    "import db_connection": [sys.executable, "-c", "import src.utils.db_connection"],
+    "import csv_to_postgres": [sys.executable, "-c", "import src.loaders.csv_to_postgres"],
+}
+
+
+def time_command(cmd, repeat):
+    """Return the median wall time of a command in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def top_imports(module, top=10):
+    """Return the slowest cumulative imports of a module as (microseconds, name)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.replace("import time:", "").split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup time")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per entry point (median is reported)")
+    parser.add_argument("--module", default="src.run_pipeline", help="Module to break down with -X importtime")
+    args = parser.parse_args()
+
+    baseline = time_command([sys.executable, "-c", "pass"], args.repeat)
+
+    print("\n" + "=" * 60)
+    print(f"⏱️  CLI STARTUP (median of {args.repeat}, interpreter {baseline * 1000:.0f} ms)")
+    print("=" * 60)
+    for name, cmd in ENTRY_POINTS.items():
+        seconds = time_command(cmd, args.repeat)
+        print(f"   {name:28} {seconds * 1000:>8.0f} ms  (+{(seconds - baseline) * 1000:.0f} ms)")
+
+    print("\n" + "=" * 60)
+    print(f"📦 SLOWEST IMPORTS: {args.module}")
+    print("=" * 60)
+    for cumulative_us, name in top_imports(args.module):
+        print(f"   {name:40} {cumulative_us / 1000:>8.1f} ms")
+    print("=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Compact Facts Benchmark
+Copies marts.fact_order_items into a scratch schema in both layouts (DECIMAL
+measures and the integer-cents fact_order_items_compact), then compares heap
+size per row and aggregate latency on the decimal table, the cents columns
+and the DECIMAL compatibility view, checking all three return the same results.
+
+Usage:
+    python -m src.benchmarks.compact_facts --scale 20 --repeat 5
+"""
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+
+from src.transformers.load_facts import FACT_ORDER_ITEMS_COMPACT_COLUMNS, FACT_ORDER_ITEMS_COMPACT_SELECT, FactLoader
+from src.utils.db_connection import db
+
+SCHEMA = "bench_compact"
+
+# name -> (decimal table query, cents query, compat view query)
+QUERIES = {
+    "totals": (
+        """
+        SELECT COUNT(*), SUM(total_price), SUM(total_cost), SUM(profit)
+        FROM {schema}.fact_order_items
+        """,
+        """
+        SELECT COUNT(*), SUM(total_price_cents) / 100.0, SUM(total_cost_cents) / 100.0, SUM(profit_cents) / 100.0
+        FROM {schema}.fact_order_items_compact
+        """,
+        """
+        SELECT COUNT(*), SUM(total_price), SUM(total_cost), SUM(profit)
+        FROM {schema}.fact_order_items_compat
+        """,
+    ),
+    "revenue by product": (
+        """
+        SELECT product_key, SUM(quantity), SUM(total_price), SUM(profit)
+        FROM {schema}.fact_order_items
+        GROUP BY product_key
+        """,
+        """
+        SELECT product_key, SUM(quantity), SUM(total_price_cents) / 100.0, SUM(profit_cents) / 100.0
+        FROM {schema}.fact_order_items_compact
+        GROUP BY product_key
+        """,
+        """
+        SELECT product_key, SUM(quantity), SUM(total_price), SUM(profit)
+        FROM {schema}.fact_order_items_compat
+        GROUP BY product_key
+        """,
+    ),
+    "large lines": (
+        """
+        SELECT COUNT(*), SUM(total_price)
+        FROM {schema}.fact_order_items
+        WHERE unit_price >= 100 AND quantity >= 2
+        """,
+        """
+        SELECT COUNT(*), SUM(total_price_cents) / 100.0
+        FROM {schema}.fact_order_items_compact
+        WHERE unit_price_cents >= 10000 AND quantity >= 2
+        """,
+        """
+        SELECT COUNT(*), SUM(total_price)
+        FROM {schema}.fact_order_items_compat
+        WHERE unit_price >= 100 AND quantity >= 2
+        """,
+    ),
+}
+
+
+def build_copies(conn, scale):
+    """Create the scratch schema with `scale` key-shifted copies of the item facts in both layouts"""
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    FactLoader(schema=SCHEMA, compact_facts=True).ensure_compact_facts()
+
+    conn.execute(text(f"CREATE TABLE {SCHEMA}.fact_order_items (LIKE marts.fact_order_items)"))
+    conn.execute(text(f"""
+        INSERT INTO {SCHEMA}.fact_order_items
+        SELECT fi.order_item_key + copy * span.keys, fi.order_key + copy * span.orders, fi.product_key,
+               fi.order_id + copy * span.orders, fi.product_id, fi.quantity, fi.unit_price,
+               fi.total_price, fi.unit_cost, fi.total_cost, fi.profit
+        FROM marts.fact_order_items fi
+        CROSS JOIN (
+            SELECT MAX(order_item_key) AS keys, (SELECT MAX(order_key) FROM marts.fact_orders) AS orders
+            FROM marts.fact_order_items
+        ) span
+        CROSS JOIN generate_series(0, :copies) AS copy
+    """), {"copies": scale - 1})
+    conn.execute(text(
+        f"INSERT INTO {SCHEMA}.fact_order_items_compact ({FACT_ORDER_ITEMS_COMPACT_COLUMNS}) "
+        + FACT_ORDER_ITEMS_COMPACT_SELECT.format(schema=SCHEMA, where="")
+    ))
+    for table in ("fact_order_items", "fact_order_items_compact"):
+        # Separate statements: VACUUM cannot run inside a multi-statement transaction
+        conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.{table}"))
+
+
+def heap_size(conn, table):
+    """Return (heap bytes, rows) of a scratch table"""
+    return conn.execute(text(
+        f"SELECT pg_relation_size('{SCHEMA}.{table}'), (SELECT COUNT(*) FROM {SCHEMA}.{table})"
+    )).one()
+
+
+def time_query(conn, query, repeat):
+    """Return (median seconds, rows) for a query"""
+    statement = text(query.format(schema=SCHEMA))
+    conn.execute(statement).all()
+    timings = []
+    rows = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(statement).all()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), rows
+
+
+def normalise(rows):
+    """Make result sets comparable regardless of row order and numeric scale"""
+    return sorted(tuple(round(float(v), 2) if v is not None else v for v in row) for row in rows)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark DECIMAL facts against integer-cents compact facts")
+    parser.add_argument("--scale", type=int, default=20, help="Copies of marts.fact_order_items to benchmark on")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query (median is reported)")
+    parser.add_argument("--keep", action="store_true", help=f"Keep the {SCHEMA} schema afterwards")
+    args = parser.parse_args()
+
+    db.use_workload('batch-analytics')
+
+    with db.get_connection() as conn:
+        try:
+            build_copies(conn, args.scale)
+
+            decimal_bytes, row_count = heap_size(conn, "fact_order_items")
+            compact_bytes, _ = heap_size(conn, "fact_order_items_compact")
+
+            print("\n" + "=" * 78)
+            print(f"⏱️  DECIMAL vs INTEGER CENTS (median of {args.repeat}, {row_count:,} item rows)")
+            print("=" * 78)
+            print(f"   heap: decimal {decimal_bytes / 1024 ** 2:,.1f} MB ({decimal_bytes / row_count:.1f} B/row), "
+                  f"compact {compact_bytes / 1024 ** 2:,.1f} MB ({compact_bytes / row_count:.1f} B/row), "
+                  f"{1 - compact_bytes / decimal_bytes:.0%} smaller")
+            print(f"\n   {'query':22} {'decimal':>10} {'cents':>10} {'compat':>10} {'speedup':>9}  same result")
+
+            for name, (decimal_query, cents_query, compat_query) in QUERIES.items():
+                decimal_seconds, decimal_rows = time_query(conn, decimal_query, args.repeat)
+                cents_seconds, cents_rows = time_query(conn, cents_query, args.repeat)
+                compat_seconds, compat_rows = time_query(conn, compat_query, args.repeat)
+                expected = normalise(decimal_rows)
+                same = "✓" if normalise(cents_rows) == expected == normalise(compat_rows) else "✗"
+                print(
+                    f"   {name:22} {decimal_seconds * 1000:>8.1f}ms {cents_seconds * 1000:>8.1f}ms "
+                    f"{compat_seconds * 1000:>8.1f}ms {decimal_seconds / cents_seconds:>8.2f}x  {same}"
+                )
+            print("=" * 78 + "\n")
+        finally:
+            if not args.keep:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
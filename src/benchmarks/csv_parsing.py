@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+CSV Parsing Benchmark
+Compares default pd.read_csv inference against the explicit staging schemas
+(PyArrow engine, compact dtypes, dates parsed at read time).
+
+Usage:
+    python -m src.benchmarks.csv_parsing --scale 50
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from src.loaders.schemas import CSV_ENGINE, DATE_COLUMNS, read_staging_csv
+
+TABLES = ["customers", "products", "orders", "order_items"]
+ID_COLUMNS = {
+    "customers": ["customer_id"],
+    "products": ["product_id"],
+    "orders": ["order_id", "customer_id"],
+    "order_items": ["order_item_id", "order_id"],
+}
+
+
+def build_scaled_files(data_dir, out_dir, scale):
+    """Replicate the sample CSVs ``scale`` times with shifted ids"""
+    paths = {}
+    for table in TABLES:
+        base = pd.read_csv(f"{data_dir}/{table}.csv")
+        id_columns = ID_COLUMNS[table]
+        step = int(base[id_columns].max().max())
+        copies = []
+        for i in range(scale):
+            copy = base.copy()
+            copy[id_columns] = copy[id_columns] + i * step
+            copies.append(copy)
+        path = os.path.join(out_dir, f"{table}.csv")
+        pd.concat(copies, ignore_index=True).to_csv(path, index=False)
+        paths[table] = path
+    return paths
+
+
+def read_default(table, path):
+    """Baseline: type inference followed by a separate date conversion"""
+    df = pd.read_csv(path)
+    for col in DATE_COLUMNS[table]:
+        df[col] = pd.to_datetime(df[col])
+    return df
+
+
+def time_reader(reader, table, path, repeat):
+    """Return (best seconds, deep memory bytes) for a reader"""
+    best = float("inf")
+    df = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = reader(table, path)
+        best = min(best, time.perf_counter() - start)
+    return best, int(df.memory_usage(deep=True).sum()), len(df)
+
+
+def run_benchmark(data_dir="data/sample", scale=20, repeat=3):
+    """Run the benchmark and return one result row per table"""
+    results = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        paths = build_scaled_files(data_dir, out_dir, scale)
+        for table in TABLES:
+            base_s, base_mem, rows = time_reader(read_default, table, paths[table], repeat)
+            schema_s, schema_mem, _ = time_reader(read_staging_csv, table, paths[table], repeat)
+            results.append(
+                {
+                    "table": table,
+                    "rows": rows,
+                    "default_s": base_s,
+                    "schema_s": schema_s,
+                    "default_mb": base_mem / 1024**2,
+                    "schema_mb": schema_mem / 1024**2,
+                }
+            )
+    return results
+
+
+def print_results(results, scale):
+    """Print benchmark results"""
+    print("\n" + "=" * 78)
+    print(f"📊 CSV PARSING BENCHMARK (scale x{scale}, engine={CSV_ENGINE})")
+    print("=" * 78)
+    print(f"   {'table':12} {'rows':>10} {'default s':>10} {'schema s':>10} "
+          f"{'speedup':>8} {'default MB':>11} {'schema MB':>10}")
+    for r in results:
+        speedup = r["default_s"] / r["schema_s"] if r["schema_s"] else float("inf")
+        print(
+            f"   {r['table']:12} {r['rows']:>10,} {r['default_s']:>10.3f} {r['schema_s']:>10.3f} "
+            f"{speedup:>7.1f}x {r['default_mb']:>11.1f} {r['schema_mb']:>10.1f}"
+        )
+    print("=" * 78 + "\n")
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark staging CSV parsing")
+    parser.add_argument("--data-dir", default="data/sample", help="Directory with the sample CSV files")
+    parser.add_argument("--scale", type=int, default=20, help="How many times to replicate the sample data")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per reader (best is reported)")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.data_dir, args.scale, args.repeat)
+    print_results(results, args.scale)
+
+
+if __name__ == "__main__":
+    main()
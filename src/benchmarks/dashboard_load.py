@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Dashboard Load Test
+Simulates N analysts using dashboards/ecommerce_dashboard.py at once. Each
+simulated session repeatedly loads the page the way the app does: it picks a
+random Time Period (and occasionally exact counts), fans the panel queries out
+on the async pool, then loads the KPIs and the revenue trend on the sync pool,
+and then thinks for a while. The report shows p50/p95/p99 latency per panel
+and for the whole page, throughput, pool wait time and database load (CPU of
+the local postgres processes, plus active sessions sampled from
+pg_stat_activity). Running it before and after a cache, index or aggregate
+change shows the change's effect on tail latency.
+
+Without --cache-mb every page load goes to the database. With it, each
+simulated server (--servers) has its own result cache like a Streamlit
+process, so sessions on different servers do not share cached results.
+
+Usage:
+    python -m src.benchmarks.dashboard_load --users 50 --duration 60
+    python -m src.benchmarks.dashboard_load --users 50 --think 0 --cache-mb 256 --servers 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from src.utils.async_db import async_db
+from src.utils.config import config
+from src.utils.db_connection import db
+from src.utils.frames import FrameCache
+from src.utils.kpis import TIME_PERIODS, panel_queries, revenue_trend, sales_overview
+
+# Active client backends other than the sampler; wait_event is NULL while running on CPU
+ACTIVITY_SQL = """
+    SELECT wait_event_type || ':' || wait_event AS wait_event
+    FROM pg_stat_activity
+    WHERE state = 'active' AND backend_type = 'client backend' AND pid <> pg_backend_pid()
+"""
+
+
+def percentiles(values):
+    """Return p50/p95/p99/max of ``values`` in milliseconds (None when empty)"""
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+    return {'p50': p50, 'p95': p95, 'p99': p99, 'max': max(values) * 1000}
+
+
+def postgres_cpu_seconds(proc_dir='/proc'):
+    """Total user+system CPU seconds of the postgres processes visible in /proc (None if there are none)"""
+    total_ticks = 0
+    found = False
+    for stat_path in Path(proc_dir).glob('[0-9]*/stat'):
+        try:
+            stat = stat_path.read_text()
+        except OSError:
+            continue  # exited since the listing
+        # "pid (comm) state ppid ..." - comm may contain spaces, so split on the last ')'
+        comm = stat[stat.index('(') + 1:stat.rindex(')')]
+        if comm != 'postgres':
+            continue
+        fields = stat[stat.rindex(')') + 2:].split()
+        total_ticks += int(fields[11]) + int(fields[12])  # utime, stime
+        found = True
+    return total_ticks / os.sysconf('SC_CLK_TCK') if found else None
+
+
+class LatencyRecorder:
+    """Thread-safe per-panel latency, pool wait, cache hit and error samples"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.waits = defaultdict(list)
+        self.hits = Counter()
+        self.errors = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, panel, seconds, wait=None):
+        with self._lock:
+            self.latencies[panel].append(seconds)
+            if wait is not None:
+                self.waits[panel].append(wait)
+
+    def hit(self, panel):
+        with self._lock:
+            self.hits[panel] += 1
+
+    def error(self, panel):
+        with self._lock:
+            self.errors[panel] += 1
+
+    def summary(self, panels):
+        """One row per panel: sample counts, hit rate, latency and pool wait percentiles"""
+        rows = []
+        for panel in panels:
+            latencies = self.latencies[panel]
+            waits = self.waits[panel]
+            loads = len(latencies) + self.hits[panel]
+            rows.append({
+                'panel': panel,
+                'queries': len(latencies),
+                'errors': self.errors[panel],
+                'hit_pct': 100.0 * self.hits[panel] / loads if loads else 0.0,
+                **percentiles(latencies),
+                'wait_avg': 1000 * sum(waits) / len(waits) if waits else None,
+                'wait_p99': percentiles(waits)['p99'],
+            })
+        return rows
+
+
+class DbActivitySampler:
+    """Samples database CPU and active sessions in a background thread"""
+
+    def __init__(self, urls, interval=0.5):
+        self.urls = urls
+        self.interval = interval
+        self.samples = 0
+        self.on_cpu = 0
+        self.waiting = 0
+        self.wait_events = Counter()
+        self.cpu_seconds = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._cpu_start = postgres_cpu_seconds()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample_loop, name='db-activity-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self._started
+        cpu_end = postgres_cpu_seconds()
+        if self._cpu_start is not None and cpu_end is not None:
+            self.cpu_seconds = cpu_end - self._cpu_start
+
+    def _sample_loop(self):
+        # Own unpooled connections, so sampling never competes for the pools under test
+        engines = [create_engine(url, poolclass=NullPool) for url in self.urls]
+        connections = [engine.connect().execution_options(isolation_level="AUTOCOMMIT") for engine in engines]
+        try:
+            while not self._stop.wait(self.interval):
+                events = [row.wait_event for conn in connections for row in conn.execute(text(ACTIVITY_SQL))]
+                self.samples += 1
+                self.on_cpu += sum(event is None for event in events)
+                self.waiting += sum(event is not None for event in events)
+                self.wait_events.update(event for event in events if event is not None)
+        finally:
+            for conn in connections:
+                conn.close()
+            for engine in engines:
+                engine.dispose()
+
+
+class DashboardLoadTest:
+    """Replays dashboard page loads for concurrent simulated sessions"""
+
+    def __init__(self, users=50, duration=60, think=5.0, ramp=0.0, cache_mb=0, servers=1,
+                 exact_share=0.05, seed=None):
+        self.users = users
+        self.duration = duration
+        self.think = think
+        self.ramp = ramp
+        self.cache_mb = cache_mb
+        self.servers = servers
+        self.exact_share = exact_share
+        self.seed = seed
+        # One result cache per simulated server process (st.cache_resource / st.cache_data scope)
+        self.frame_caches = [
+            FrameCache(int(cache_mb * 1024 * 1024), ttl=config.DASHBOARD_CACHE_TTL) for _ in range(servers)
+        ] if cache_mb else None
+        self.kpi_caches = [{} for _ in range(servers)]
+        self._kpi_lock = threading.Lock()
+        self.recorder = LatencyRecorder()
+        self.panels = list(panel_queries(TIME_PERIODS["All Time"])) + ['kpis', 'trend', 'page']
+        self.sampler = DbActivitySampler([config.database_url] + list(db.replicas.urls))
+        self.elapsed = 0.0
+        self.client_cpu_seconds = 0.0
+
+    async def _fetch_panel(self, pool, name, sql):
+        """Like AsyncDatabase.fetch_frame, timing the pool acquire separately"""
+        start = time.perf_counter()
+        try:
+            async with async_db.acquire(pool) as conn:
+                acquired = time.perf_counter()
+                statement = await conn.prepare(sql)
+                rows = await statement.fetch()
+                columns = [attribute.name for attribute in statement.get_attributes()]
+        except Exception:
+            self.recorder.error(name)
+            raise
+        self.recorder.record(name, time.perf_counter() - start, acquired - start)
+        return pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns)
+
+    async def _fetch_panels(self, queries):
+        pool = await async_db.read_pool()
+        frames = await asyncio.gather(*(self._fetch_panel(pool, name, sql) for name, sql in queries.items()))
+        return dict(zip(queries.values(), frames))
+
+    def load_panels(self, days, server):
+        """Load every panel like the dashboard's load_panels (cache misses fetched concurrently)"""
+        queries = panel_queries(days)
+        names = {sql: name for name, sql in queries.items()}
+
+        fetched = set()
+
+        def fetch(missing):
+            fetched.update(missing)
+            return async_db.run(self._fetch_panels({names[sql]: sql for sql in missing}))
+
+        if self.frame_caches is None:
+            return fetch(list(queries.values()))
+        frames = self.frame_caches[server].get_or_load_many(queries.values(), fetch)
+        for sql in queries.values():
+            if sql not in fetched:
+                self.recorder.hit(names[sql])
+        return frames
+
+    def _timed_read(self, name, load):
+        """Run ``load(conn)`` on a read connection, recording latency and pool wait"""
+        start = time.perf_counter()
+        try:
+            with db.read_connection() as conn:
+                acquired = time.perf_counter()
+                result = load(conn)
+        except Exception:
+            self.recorder.error(name)
+            raise
+        self.recorder.record(name, time.perf_counter() - start, acquired - start)
+        return result
+
+    def load_kpis(self, days, exact, server):
+        """KPIs as the dashboard loads them (st.cache_data with a TTL when caching)"""
+        key = (days, exact)
+        if self.frame_caches is not None:
+            with self._kpi_lock:
+                cached = self.kpi_caches[server].get(key)
+            if cached and time.time() - cached[0] <= config.DASHBOARD_CACHE_TTL:
+                self.recorder.hit('kpis')
+                return cached[1]
+        kpis = self._timed_read('kpis', lambda conn: sales_overview(conn, days, exact=exact))
+        if self.frame_caches is not None:
+            with self._kpi_lock:
+                self.kpi_caches[server][key] = (time.time(), kpis)
+        return kpis
+
+    def load_trend(self, days, server):
+        """Revenue trend as the dashboard loads it"""
+        def load(conn):
+            return revenue_trend(conn, days, max_points=config.DASHBOARD_TREND_POINTS)[0]
+
+        if self.frame_caches is None:
+            return self._timed_read('trend', load)
+        key = ('revenue_trend', days, config.DASHBOARD_TREND_POINTS)
+        if self.frame_caches[server].get(key) is not None:
+            self.recorder.hit('trend')
+        return self.frame_caches[server].get_or_load(key, lambda: self._timed_read('trend', load))
+
+    def page_load(self, rng, server):
+        """One dashboard render with random filters"""
+        days = rng.choice(list(TIME_PERIODS.values()))
+        exact = rng.random() < self.exact_share
+        start = time.perf_counter()
+        try:
+            self.load_panels(days, server)
+            self.load_kpis(days, exact, server)
+            self.load_trend(days, server)
+        except Exception:
+            self.recorder.error('page')
+            return
+        self.recorder.record('page', time.perf_counter() - start)
+
+    def _session(self, user, deadline):
+        rng = random.Random(None if self.seed is None else self.seed + user)
+        server = user % self.servers
+        time.sleep(self.ramp * user / self.users)
+        while time.perf_counter() < deadline:
+            self.page_load(rng, server)
+            if self.think:
+                time.sleep(min(rng.expovariate(1 / self.think), max(0.0, deadline - time.perf_counter())))
+
+    def run(self):
+        """Run every session until ``duration`` has passed; returns the summary rows"""
+        # Open the pools first so connection setup is not counted as load
+        async_db.run(async_db.read_pool())
+        db.test_connection()
+
+        self.sampler.start()
+        client_cpu = time.process_time()
+        start = time.perf_counter()
+        deadline = start + self.duration
+        sessions = [
+            threading.Thread(target=self._session, args=(user, deadline), name=f'session-{user}', daemon=True)
+            for user in range(self.users)
+        ]
+        for session in sessions:
+            session.start()
+        for session in sessions:
+            session.join()
+        self.elapsed = time.perf_counter() - start
+        self.client_cpu_seconds = time.process_time() - client_cpu
+        self.sampler.stop()
+        return self.recorder.summary(self.panels)
+
+    def to_dict(self):
+        """Summary for --output, to compare runs"""
+        sampler = self.sampler
+        pages = len(self.recorder.latencies['page'])
+        return {
+            'users': self.users,
+            'duration': self.duration,
+            'think': self.think,
+            'cache_mb': self.cache_mb,
+            'servers': self.servers,
+            'pages': pages,
+            'failed_pages': self.recorder.errors['page'],
+            'pages_per_second': pages / self.elapsed if self.elapsed else 0.0,
+            'db_cpu_cores': sampler.cpu_seconds / sampler.elapsed if sampler.cpu_seconds is not None else None,
+            'active_on_cpu': sampler.on_cpu / sampler.samples if sampler.samples else 0.0,
+            'active_waiting': sampler.waiting / sampler.samples if sampler.samples else 0.0,
+            'panels': self.recorder.summary(self.panels),
+        }
+
+    def print_report(self):
+        """Print the latency table, throughput and database load"""
+        def ms(value):
+            return f"{value:>8.1f}" if value is not None else f"{'-':>8}"
+
+        summary = self.to_dict()
+        cache = f"{self.cache_mb:g} MB cache x {self.servers} server(s)" if self.frame_caches else "no cache"
+        print("\n" + "=" * 100)
+        print(f"🔥 DASHBOARD LOAD TEST ({self.users} users, think {self.think:g}s, "
+              f"{self.elapsed:.0f}s, {cache})")
+        print("=" * 100)
+        print(f"   {'panel':10} {'queries':>8} {'errors':>7} {'hit %':>6} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'max ms':>8} {'wait avg':>9} {'wait p99':>9}")
+        for row in summary['panels']:
+            if row['panel'] == 'page':
+                print("   " + "-" * 94)
+            hit_pct = f"{row['hit_pct']:>5.0f}%" if row['panel'] != 'page' else f"{'-':>6}"
+            print(f"   {row['panel']:10} {row['queries']:>8,} {row['errors']:>7,} {hit_pct} "
+                  f"{ms(row['p50'])} {ms(row['p95'])} {ms(row['p99'])} {ms(row['max'])} "
+                  f"{ms(row['wait_avg'])} {ms(row['wait_p99'])}")
+
+        queries = sum(row['queries'] for row in summary['panels'] if row['panel'] != 'page')
+        print(f"\n   Throughput:   {summary['pages_per_second']:,.1f} pages/s, "
+              f"{queries / self.elapsed if self.elapsed else 0:,.1f} queries/s "
+              f"({summary['failed_pages']:,} failed pages)")
+        profile = config.workload_profile(db.workload)
+        print(f"   Pools:        {db.workload} profile: sync {profile['pool_size']} (max {profile['max_concurrency']}), "
+              f"async max {min(async_db.max_size, profile['max_concurrency'])} (wait = time to get a connection)")
+
+        cores = os.cpu_count() or 1
+        if summary['db_cpu_cores'] is not None:
+            print(f"   DB CPU:       {summary['db_cpu_cores']:.2f} cores "
+                  f"({summary['db_cpu_cores'] / cores:.0%} of {cores}, local postgres processes)")
+        else:
+            print("   DB CPU:       n/a (no postgres processes visible in /proc)")
+        waits = self.sampler.wait_events
+        top_waits = ", ".join(f"{event} {count / self.sampler.samples:.1f}"
+                              for event, count in waits.most_common(3)) if waits else "none"
+        print(f"   DB sessions:  {summary['active_on_cpu']:.1f} active on CPU, "
+              f"{summary['active_waiting']:.1f} waiting (top waits: {top_waits})")
+        print(f"   Client CPU:   {self.client_cpu_seconds / self.elapsed:.2f} cores (the load generator itself)")
+        print("=" * 100 + "\n")
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Load-test the dashboard queries with concurrent simulated sessions")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent simulated sessions")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run")
+    parser.add_argument("--think", type=float, default=5.0,
+                        help="Mean think time between page loads in seconds (0 = back to back)")
+    parser.add_argument("--ramp", type=float, default=0.0,
+                        help="Seconds over which sessions start (0 = everyone at once)")
+    parser.add_argument("--cache-mb", type=float, default=0,
+                        help="Result cache per server in MB, like DASHBOARD_CACHE_MB (0 = every load hits the DB)")
+    parser.add_argument("--servers", type=int, default=1, help="Simulated dashboard server processes (one cache each)")
+    parser.add_argument("--exact-share", type=float, default=0.05,
+                        help="Share of page loads with exact distinct counts")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for the filter choices")
+    parser.add_argument("--output", type=Path, default=None, help="Also write the summary as JSON")
+    args = parser.parse_args()
+
+    db.use_workload('interactive')
+    load_test = DashboardLoadTest(
+        users=args.users, duration=args.duration, think=args.think, ramp=args.ramp,
+        cache_mb=args.cache_mb, servers=args.servers, exact_share=args.exact_share, seed=args.seed,
+    )
+    load_test.run()
+    load_test.print_report()
+    if args.output:
+        args.output.write_text(json.dumps(load_test.to_dict(), indent=2))
+        print(f"   Summary written to {args.output}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Wide Table Benchmark
+Compares dashboard-style analytical queries written as star-schema joins
+against the same queries on marts.order_lines_wide, and checks that both
+return the same results.
+
+Usage:
+    python -m src.benchmarks.wide_table --repeat 20 --days 3650
+"""
+
+import argparse
+import statistics
+import time
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from src.utils.db_connection import db
+
+# name -> (star-schema join query, wide-table query)
+QUERIES = {
+    "revenue by category": (
+        """
+        SELECT p.category, SUM(fi.total_price) AS revenue, COUNT(DISTINCT fi.order_key) AS orders
+        FROM marts.dim_products p
+        JOIN marts.fact_order_items fi ON p.product_key = fi.product_key
+        JOIN marts.fact_orders fo ON fi.order_key = fo.order_key
+        WHERE fo.order_date >= CURRENT_DATE - :days * INTERVAL '1 day' AND fo.status = 'completed'
+        GROUP BY p.category
+        """,
+        """
+        SELECT category, SUM(total_price) AS revenue, COUNT(DISTINCT order_key) AS orders
+        FROM marts.order_lines_wide
+        WHERE order_date >= CURRENT_DATE - :days * INTERVAL '1 day' AND status = 'completed'
+        GROUP BY category
+        """,
+    ),
+    "top 10 products": (
+        """
+        SELECT p.product_name, p.category, SUM(fi.total_price) AS revenue, SUM(fi.quantity) AS units_sold
+        FROM marts.dim_products p
+        JOIN marts.fact_order_items fi ON p.product_key = fi.product_key
+        JOIN marts.fact_orders fo ON fi.order_key = fo.order_key
+        WHERE fo.order_date >= CURRENT_DATE - :days * INTERVAL '1 day' AND fo.status = 'completed'
+        GROUP BY p.product_key, p.product_name, p.category
+        ORDER BY revenue DESC, p.product_name
+        LIMIT 10
+        """,
+        """
+        SELECT product_name, category, SUM(total_price) AS revenue, SUM(quantity) AS units_sold
+        FROM marts.order_lines_wide
+        WHERE order_date >= CURRENT_DATE - :days * INTERVAL '1 day' AND status = 'completed'
+        GROUP BY product_key, product_name, category
+        ORDER BY revenue DESC, product_name
+        LIMIT 10
+        """,
+    ),
+    "revenue by country and month": (
+        """
+        SELECT c.country, d.year, d.month, SUM(fi.total_price) AS revenue
+        FROM marts.fact_order_items fi
+        JOIN marts.fact_orders fo ON fi.order_key = fo.order_key
+        JOIN marts.dim_customers c ON fo.customer_key = c.customer_key
+        JOIN marts.dim_date d ON fo.order_date_key = d.date_key
+        WHERE fo.order_date >= CURRENT_DATE - :days * INTERVAL '1 day' AND fo.status = 'completed'
+        GROUP BY c.country, d.year, d.month
+        """,
+        """
+        SELECT country, year, month, SUM(total_price) AS revenue
+        FROM marts.order_lines_wide
+        WHERE order_date >= CURRENT_DATE - :days * INTERVAL '1 day' AND status = 'completed'
+        GROUP BY country, year, month
+        """,
+    ),
+    "segment x weekend profit": (
+        """
+        SELECT c.customer_segment, d.is_weekend, p.category,
+               COUNT(DISTINCT c.customer_key) AS customers, SUM(fi.profit) AS profit
+        FROM marts.fact_order_items fi
+        JOIN marts.fact_orders fo ON fi.order_key = fo.order_key
+        JOIN marts.dim_customers c ON fo.customer_key = c.customer_key
+        JOIN marts.dim_products p ON fi.product_key = p.product_key
+        JOIN marts.dim_date d ON fo.order_date_key = d.date_key
+        WHERE fo.order_date >= CURRENT_DATE - :days * INTERVAL '1 day' AND fo.status = 'completed'
+        GROUP BY c.customer_segment, d.is_weekend, p.category
+        """,
+        """
+        SELECT customer_segment, is_weekend, category,
+               COUNT(DISTINCT customer_key) AS customers, SUM(profit) AS profit
+        FROM marts.order_lines_wide
+        WHERE order_date >= CURRENT_DATE - :days * INTERVAL '1 day' AND status = 'completed'
+        GROUP BY customer_segment, is_weekend, category
+        """,
+    ),
+}
+
+
+def time_query(conn, query, params, repeat):
+    """Return (median seconds, rows) for a query"""
+    statement = text(query)
+    timings = []
+    rows = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(statement, params).all()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), rows
+
+
+def normalise(rows):
+    """Make result sets comparable regardless of row order"""
+    return sorted(tuple(round(v, 2) if isinstance(v, Decimal) else v for v in row) for row in rows)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark star-schema joins against marts.order_lines_wide")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query (median is reported)")
+    parser.add_argument("--days", type=int, default=3650, help="Trailing window of order dates to query")
+    args = parser.parse_args()
+
+    db.use_workload('interactive')
+
+    params = {"days": args.days}
+    line_count = db.get_table_count("marts", "order_lines_wide")
+
+    print("\n" + "=" * 78)
+    print(f"⏱️  JOIN vs WIDE TABLE (median of {args.repeat}, {line_count:,} order lines, last {args.days} days)")
+    print("=" * 78)
+    print(f"   {'query':30} {'join':>10} {'wide':>10} {'speedup':>9}  same result")
+
+    with db.get_connection() as conn:
+        for name, (join_query, wide_query) in QUERIES.items():
+            # Warm both paths so the comparison is not dominated by cold cache reads
+            conn.execute(text(join_query), params).all()
+            conn.execute(text(wide_query), params).all()
+
+            join_seconds, join_rows = time_query(conn, join_query, params, args.repeat)
+            wide_seconds, wide_rows = time_query(conn, wide_query, params, args.repeat)
+            same = "✓" if normalise(join_rows) == normalise(wide_rows) else "✗"
+            print(
+                f"   {name:30} {join_seconds * 1000:>8.2f}ms {wide_seconds * 1000:>8.2f}ms "
+                f"{join_seconds / wide_seconds:>8.2f}x  {same}"
+            )
+    print("=" * 78 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,112 +1,127 @@
-import pandas as pd
 from datetime import datetime
+from pathlib import Path
+from sqlalchemy import text
+from src.loaders.schemas import STAGING_KEYS, read_staging_csv
 from src.utils.db_connection import db
+from src.utils.python_profiler import add_profile_arguments, profile_python, python_profiler
+import argparse
+import io
 import logging
 import os
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+STAGING_DDL_PATH = Path(__file__).resolve().parents[2] / 'sql' / 'ddl' / '02_create_staging_tables.sql'
+
+# Bookkeeping columns that do not count as a change to the row
+METADATA_COLUMNS = ('load_timestamp', 'source_file')
+
+def copy_frame(conn, table, df):
+    """Bulk-load a DataFrame into an existing table with COPY"""
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    
+    columns = ', '.join(df.columns)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
 class CSVLoader:
     """Load CSV files into PostgreSQL staging tables"""
     
+    # Staging tables in load order; each has a matching load_<table> method
+    TABLES = ['customers', 'products', 'orders', 'order_items']
+    
     def __init__(self, schema='staging'):
         self.schema = schema
         logger.info(f"CSVLoader initialized for schema: {schema}")
     
-    def load_customers(self, csv_path='data/sample/customers.csv'):
-        """Load customers from CSV to staging table"""
-        logger.info(f"Loading customers from {csv_path}...")
+    def ensure_tables(self):
+        """Create the staging tables (with their primary keys) if they do not exist yet"""
+        with db.get_connection() as conn:
+            # Raw cursor without parameters, so the '%' in format() needs no escaping
+            cursor = conn.connection.cursor()
+            try:
+                cursor.execute(STAGING_DDL_PATH.read_text())
+            finally:
+                cursor.close()
+    
+    def upsert(self, table, df, conn=None):
+        """Merge rows into a staging table, touching only rows whose contents changed
         
-        # Read CSV
-        df = pd.read_csv(csv_path)
+        The frame is COPY'd into a temporary table and merged with
+        INSERT ... ON CONFLICT DO UPDATE; rows identical to the stored ones are
+        skipped. Runs in its own transaction unless ``conn`` is already in one.
+        Returns (inserted, updated).
+        """
+        if conn is None:
+            with db.engine.connect().execution_options(isolation_level="READ COMMITTED") as conn:
+                with conn.begin():
+                    return self.upsert(table, df, conn)
         
-        # Add metadata columns
-        df['load_timestamp'] = datetime.now()
-        df['source_file'] = os.path.basename(csv_path)
-
-        # Load to database
-        with db.get_connection() as conn:
-            df.to_sql(
-                'customers',
-                conn,
-                schema=self.schema,
-                if_exists='append',  # Use 'append' for incremental loads
-                index=False,
-                method='multi',
-                chunksize=1000
-            )
+        keys = STAGING_KEYS[table]
+        df = df.drop_duplicates(keys, keep='last')
+        columns = list(df.columns)
+        compared = [col for col in columns if col not in keys and col not in METADATA_COLUMNS]
+        target = f"{self.schema}.{table}"
+        temp = f"tmp_upsert_{table}"
         
-        logger.info(f"✓ Loaded {len(df):,} customers")
-        return len(df)
+        conn.exec_driver_sql(f"CREATE TEMP TABLE {temp} (LIKE {target} INCLUDING DEFAULTS) ON COMMIT DROP")
+        copy_frame(conn, temp, df)
+        
+        result = conn.execute(text(f"""
+            INSERT INTO {target} AS t ({', '.join(columns)})
+            SELECT {', '.join(columns)} FROM {temp}
+            ON CONFLICT ({', '.join(keys)}) DO UPDATE SET
+                {', '.join(f"{col} = EXCLUDED.{col}" for col in columns if col not in keys)}
+            WHERE ({', '.join(f"t.{col}" for col in compared)})
+                IS DISTINCT FROM ({', '.join(f"EXCLUDED.{col}" for col in compared)})
+            RETURNING (xmax = 0) AS inserted
+        """))
+        flags = result.scalars().all()
+        conn.exec_driver_sql(f"DROP TABLE {temp}")
+        
+        inserted = sum(flags)
+        return inserted, len(flags) - inserted
     
-    def load_products(self, csv_path='data/sample/products.csv'):
-        """Load products from CSV to staging table"""
-        logger.info(f"Loading products from {csv_path}...")
+    def load_table(self, table, csv_path, label=None):
+        """Read a staging CSV file and upsert it into its staging table"""
+        label = label or table
+        logger.info(f"Loading {label} from {csv_path}...")
+        
+        # Read CSV with the explicit staging schema
+        df = read_staging_csv(table, csv_path)
         
-        df = pd.read_csv(csv_path)
+        # Add metadata columns
         df['load_timestamp'] = datetime.now()
+        if table == 'customers':
+            df['source_file'] = os.path.basename(csv_path)
         
-        with db.get_connection() as conn:
-            df.to_sql(
-                'products',
-                conn,
-                schema=self.schema,
-                if_exists='replace',
-                index=False,
-                method='multi',
-                chunksize=1000
-            )
+        # Re-running a load is idempotent: unchanged rows are left alone
+        inserted, updated = self.upsert(table, df)
         
-        logger.info(f"✓ Loaded {len(df):,} products")
+        logger.info(f"✓ Loaded {len(df):,} {label} ({inserted:,} new, {updated:,} changed)")
         return len(df)
     
+    def load_customers(self, csv_path='data/sample/customers.csv'):
+        """Load customers from CSV to staging table"""
+        return self.load_table('customers', csv_path)
+    
+    def load_products(self, csv_path='data/sample/products.csv'):
+        """Load products from CSV to staging table"""
+        return self.load_table('products', csv_path)
+    
     def load_orders(self, csv_path='data/sample/orders.csv'):
         """Load orders from CSV to staging table"""
-        logger.info(f"Loading orders from {csv_path}...")
-        
-        df = pd.read_csv(csv_path)
-        df['load_timestamp'] = datetime.now()
-        df['order_date'] = pd.to_datetime(df['order_date'])
-        
-        with db.get_connection() as conn:
-            df.to_sql(
-                'orders',
-                conn,
-                schema=self.schema,
-                if_exists='replace',
-                index=False,
-                method='multi',
-                chunksize=1000
-            )
-        
-        logger.info(f"✓ Loaded {len(df):,} orders")
-        return len(df)
+        return self.load_table('orders', csv_path)
     
     def load_order_items(self, csv_path='data/sample/order_items.csv'):
         """Load order items from CSV to staging table"""
-        logger.info(f"Loading order items from {csv_path}...")
-        
-        df = pd.read_csv(csv_path)
-        df['load_timestamp'] = datetime.now()
-        
-        # Remove order_item_id to let database auto-generate it
-        if 'order_item_id' in df.columns:
-            df = df.drop('order_item_id', axis=1)
-        
-        with db.get_connection() as conn:
-            df.to_sql(
-                'order_items',
-                conn,
-                schema=self.schema,
-                if_exists='replace',
-                index=False,
-                method='multi',
-                chunksize=1000
-            )
-        
-        logger.info(f"✓ Loaded {len(df):,} order items")
-        return len(df)
+        return self.load_table('order_items', csv_path, label='order items')
     
     def load_all(self, data_dir='data/sample'):
         """Load all CSV files to staging tables"""
@@ -117,10 +132,13 @@ class CSVLoader:
         results = {}
         
         try:
-            results['customers'] = self.load_customers(f"{data_dir}/customers.csv")
-            results['products'] = self.load_products(f"{data_dir}/products.csv")
-            results['orders'] = self.load_orders(f"{data_dir}/orders.csv")
-            results['order_items'] = self.load_order_items(f"{data_dir}/order_items.csv")
+            if self.schema == 'staging':
+                self.ensure_tables()
+            
+            for table in self.TABLES:
+                load = getattr(self, f"load_{table}")
+                with python_profiler.stage(f"load_{table}"):
+                    results[table] = load(f"{data_dir}/{table}.csv")
             
             print("\n" + "=" * 60)
             print("📊 LOAD SUMMARY")
@@ -138,12 +156,19 @@ class CSVLoader:
 
 def main():
     """Main function to run the loader"""
+    parser = argparse.ArgumentParser(description="Load the sample CSV files into the staging tables")
+    parser.add_argument('--data-dir', default='data/sample', help="Directory containing the input CSV files")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    
+    db.use_workload('etl')
     loader = CSVLoader()
-    loader.load_all()
+    with profile_python('loader', args.profile, args.profile_dir, args.profile_memory):
+        loader.load_all(args.data_dir)
     
     # Verify data in database
     print("\n📋 Verifying data in database...")
-    for table in ['customers', 'products', 'orders', 'order_items']:
+    for table in CSVLoader.TABLES:
         count = db.get_table_count('staging', table)
         print(f"   staging.{table:15} {count:>10,} rows")
 
@@ -0,0 +1,105 @@
+"""
+Column schemas for the staging CSV files.
+
+Each schema mirrors the matching table in sql/ddl/02_create_staging_tables.sql
+so that files are parsed straight into compact dtypes (int32 keys, categorical
+low-cardinality labels, Arrow-backed strings) and type drift is caught while
+reading instead of on INSERT.
+"""
+
+import importlib.util
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Detect pyarrow without importing it; pandas imports it on first use
+if importlib.util.find_spec("pyarrow") is not None:
+    CSV_ENGINE = "pyarrow"
+    STRING_DTYPE = "string[pyarrow]"
+else:  # pragma: no cover - pyarrow is in requirements.txt
+    CSV_ENGINE = "c"
+    STRING_DTYPE = "string"
+
+# column -> pandas dtype; date/timestamp columns are listed in DATE_COLUMNS
+STAGING_SCHEMAS = {
+    "customers": {
+        "customer_id": "int32",  # INTEGER PRIMARY KEY
+        "first_name": STRING_DTYPE,  # VARCHAR(100)
+        "last_name": STRING_DTYPE,  # VARCHAR(100)
+        "email": STRING_DTYPE,  # VARCHAR(255)
+        "registration_date": "datetime64[ns]",  # DATE
+        "country": "category",  # VARCHAR(100)
+    },
+    "products": {
+        "product_id": "int32",  # INTEGER PRIMARY KEY
+        "product_name": STRING_DTYPE,  # VARCHAR(255)
+        "category": "category",  # VARCHAR(100)
+        "price": "float64",  # DECIMAL(10, 2)
+        "cost": "float64",  # DECIMAL(10, 2)
+    },
+    "orders": {
+        "order_id": "int32",  # INTEGER PRIMARY KEY
+        "customer_id": "int32",  # INTEGER
+        "order_date": "datetime64[ns]",  # TIMESTAMP
+        "status": "category",  # VARCHAR(50)
+    },
+    "order_items": {
+        "order_item_id": "int32",  # SERIAL PRIMARY KEY
+        "order_id": "int32",  # INTEGER
+        "product_id": "int32",  # INTEGER
+        "quantity": "int32",  # INTEGER
+        "unit_price": "float64",  # DECIMAL(10, 2)
+    },
+}
+
+# Primary key of each staging table, used to merge reloaded rows (see CSVLoader.upsert)
+STAGING_KEYS = {
+    "customers": ["customer_id"],
+    "products": ["product_id"],
+    "orders": ["order_id"],
+    "order_items": ["order_item_id"],
+}
+
+DATE_COLUMNS = {
+    "customers": ["registration_date"],
+    "products": [],
+    "orders": ["order_date"],
+    "order_items": [],
+}
+
+
+class SchemaError(ValueError):
+    """Raised when a CSV file does not match its staging schema"""
+
+
+def read_staging_csv(table, csv_path, engine=None):
+    """Read a staging CSV file using the explicit schema for ``table``"""
+    schema = STAGING_SCHEMAS[table]
+    date_columns = DATE_COLUMNS[table]
+
+    header = pd.read_csv(csv_path, nrows=0).columns.tolist()
+    missing = [col for col in schema if col not in header]
+    unexpected = [col for col in header if col not in schema]
+    if missing or unexpected:
+        raise SchemaError(f"{csv_path} does not match staging.{table} schema (missing={missing}, unexpected={unexpected})")
+
+    dtype = {col: dt for col, dt in schema.items() if col not in date_columns}
+
+    try:
+        df = pd.read_csv(
+            csv_path,
+            engine=engine or CSV_ENGINE,
+            usecols=list(schema),
+            dtype=dtype,
+            parse_dates=date_columns or False,
+        )
+    except (ValueError, TypeError) as e:
+        raise SchemaError(f"Type drift in {csv_path} for staging.{table}: {e}") from e
+
+    for col in date_columns:
+        if not pd.api.types.is_datetime64_any_dtype(df[col]):
+            raise SchemaError(f"Type drift in {csv_path} for staging.{table}: column '{col}' is not a valid date")
+
+    return df[list(schema)]
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Micro-batch Streaming Ingestion
+Watches data/raw for new order / order item files, ingests each micro-batch
+into staging and incrementally upserts the affected facts, daily aggregates
+and customer RFM/cohort marts in one transaction, then moves the files to
+data/processed.
+
+Files must be named orders*.csv / order_items*.csv with the staging CSV schema.
+Writers should create them under a temporary name (e.g. a leading '.') and
+rename when complete; files still being modified are also skipped until they
+have been stable for --settle seconds. Items for one order are expected to
+arrive in the same file.
+
+A batch that fails on a transient database error (lost connection, deadlock,
+serialization failure, lock timeout) stays in the inbox and is retried with
+exponential backoff; its files go to data/processed/failed only after
+--max-attempts tries, or straight away on errors the same data would hit again.
+
+Usage:
+    python -m src.loaders.stream_ingest --max-batch-files 20 --max-latency 5
+"""
+
+import argparse
+import logging
+import shutil
+import statistics
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import exc, text
+
+from src.loaders.csv_to_postgres import CSVLoader
+from src.loaders.schemas import read_staging_csv
+from src.transformers.customer_analytics import CustomerAnalyticsLoader
+from src.transformers.key_lookup import UNKNOWN_KEY, KeyLookup
+from src.transformers.load_dimensions import DimensionLoader
+from src.transformers.load_facts import FactLoader
+from src.utils.db_connection import db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# SQLSTATEs worth retrying with the same data: serialization failure, deadlock,
+# lock timeout, and the server shutting down or restarting (e.g. a failover)
+TRANSIENT_SQLSTATES = {'40001', '40P01', '55P03', '57P01', '57P02', '57P03'}
+
+
+def is_transient(error):
+    """Whether a failed batch may succeed if retried unchanged"""
+    if isinstance(error, exc.DBAPIError):
+        if error.connection_invalidated or isinstance(error, exc.OperationalError):
+            return True
+        return getattr(error.orig, 'pgcode', None) in TRANSIENT_SQLSTATES
+    return False
+
+
+class MicroBatchIngestor:
+    """Ingest order / order item files from an inbox directory in micro-batches"""
+
+    FILE_PATTERNS = {
+        'orders': 'orders*.csv',
+        'order_items': 'order_items*.csv',
+    }
+
+    # Producers (e.g. the order firehose) pause while this marker exists in the inbox
+    BACKPRESSURE_MARKER = '.backpressure'
+
+    def __init__(
+        self,
+        inbox='data/raw',
+        processed_dir='data/processed',
+        poll_interval=1.0,
+        max_batch_files=20,
+        max_batch_rows=50_000,
+        max_latency=5.0,
+        settle_seconds=0.5,
+        max_pending_files=200,
+        max_attempts=8,
+        retry_backoff=1.0,
+        max_retry_backoff=60.0,
+    ):
+        self.inbox = Path(inbox)
+        self.processed_dir = Path(processed_dir)
+        self.failed_dir = self.processed_dir / 'failed'
+        self.poll_interval = poll_interval
+        self.max_batch_files = max_batch_files
+        self.max_batch_rows = max_batch_rows
+        self.max_latency = max_latency
+        self.settle_seconds = settle_seconds
+        self.max_pending_files = max_pending_files
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.attempts = {}  # path -> failed transient attempts so far
+        self.retry_at = 0.0  # time.monotonic() before which the inbox is not retried
+        self.backpressure = False
+        self.latencies = []
+        self.batches = 0
+        self.rows = 0
+        self.staging_loader = CSVLoader()
+        self.dim_loader = DimensionLoader()
+        self.fact_loader = FactLoader()
+        self.customer_analytics = CustomerAnalyticsLoader()
+        self.key_lookup = KeyLookup()
+        if self.fact_loader.compact_facts:
+            self.fact_loader.ensure_compact_facts()
+
+        self.processed_dir.mkdir(parents=True, exist_ok=True)
+        logger.info(f"MicroBatchIngestor watching {self.inbox} "
+                    f"(max {max_batch_files} files / {max_batch_rows:,} rows / {max_latency}s per batch)")
+
+    def scan(self):
+        """Return complete files waiting in the inbox as (table, path, arrived_at), oldest first"""
+        now = time.time()
+        pending = []
+        for table, pattern in self.FILE_PATTERNS.items():
+            for path in self.inbox.glob(pattern):
+                if table == 'orders' and path.name.startswith('order_items'):
+                    continue
+                arrived_at = path.stat().st_mtime
+                if now - arrived_at < self.settle_seconds:
+                    continue  # still being written
+                pending.append((table, path, arrived_at))
+        pending.sort(key=lambda item: item[2])
+        return pending
+
+    def update_backpressure(self, pending_count):
+        """Raise the back-pressure marker when the backlog is too large, clear it once it halves"""
+        marker = self.inbox / self.BACKPRESSURE_MARKER
+        if not self.backpressure and pending_count >= self.max_pending_files:
+            self.backpressure = True
+            marker.touch()
+            logger.warning(f"⚠️  Back-pressure on: {pending_count} files pending")
+        elif self.backpressure and pending_count <= self.max_pending_files // 2:
+            self.backpressure = False
+            marker.unlink(missing_ok=True)
+            logger.info(f"✓ Back-pressure off: {pending_count} files pending")
+
+    def batch_ready(self, pending):
+        """Flush when the batch is full or the oldest file has waited max_latency"""
+        if not pending:
+            return False
+        oldest_wait = time.time() - pending[0][2]
+        return len(pending) >= self.max_batch_files or oldest_wait >= self.max_latency or self.backpressure
+
+    def read_batch(self, pending):
+        """Read files in arrival order up to the batch size limits"""
+        frames = {'orders': [], 'order_items': []}
+        files = []
+        rows = 0
+        for table, path, arrived_at in pending[:self.max_batch_files]:
+            try:
+                df = read_staging_csv(table, path)
+            except Exception as e:
+                logger.error(f"✗ Rejected {path.name}: {e}")
+                self.move(path, self.failed_dir)
+                continue
+            frames[table].append(df)
+            files.append((table, path, arrived_at))
+            rows += len(df)
+            if rows >= self.max_batch_rows:
+                break
+        return frames, files, rows
+
+    def load_staging(self, conn, table, frames):
+        """Upsert the batch's rows into staging; an order's items are replaced as a whole"""
+        if not frames:
+            return set()
+
+        df = pd.concat(frames, ignore_index=True)
+        df['load_timestamp'] = datetime.now()
+
+        order_ids = set(df['order_id'].astype(int).tolist())
+        if table == 'order_items':
+            # Items no longer listed for an order were removed from it
+            conn.execute(
+                text("DELETE FROM staging.order_items "
+                     "WHERE order_id = ANY(:order_ids) AND order_item_id <> ALL(:item_ids)"),
+                {'order_ids': list(order_ids), 'item_ids': df['order_item_id'].astype(int).tolist()}
+            )
+        self.staging_loader.upsert(table, df, conn)
+        return order_ids
+
+    def ingest(self, frames):
+        """Load one micro-batch and refresh the affected facts and aggregates atomically"""
+        conn = db.engine.connect().execution_options(isolation_level="READ COMMITTED")
+        try:
+            with conn.begin():
+                order_ids = self.load_staging(conn, 'orders', frames['orders'])
+                order_ids |= self.load_staging(conn, 'order_items', frames['order_items'])
+
+                # Days and customers the affected orders belonged to before this batch (both can change)
+                previous = conn.execute(
+                    text("SELECT order_date_key, customer_key FROM marts.fact_orders WHERE order_id = ANY(:order_ids)"),
+                    {'order_ids': list(order_ids)}
+                ).all()
+                previous_days = {row.order_date_key for row in previous}
+                previous_customers = {row.customer_key for row in previous}
+
+                self.dim_loader.add_missing_dates(conn, order_ids)
+                days = self.fact_loader.upsert_fact_orders(conn, order_ids)
+                self.fact_loader.upsert_fact_order_items(conn, order_ids)
+                if self.fact_loader.order_lines_wide:
+                    self.fact_loader.upsert_order_lines_wide(conn, order_ids)
+                if self.fact_loader.compact_facts:
+                    self.fact_loader.upsert_compact_facts(conn, order_ids)
+                self.fact_loader.refresh_agg_daily_sales(conn, days | previous_days)
+
+                # Customers of the re-sent orders, resolved from the cached key maps
+                # (orders only touched through their items keep their previous customer)
+                self.key_lookup.sync(conn)
+                customers = set()
+                if frames['orders']:
+                    customer_ids = pd.concat(frames['orders'])['customer_id']
+                    customers = set(self.key_lookup.resolve('customer', customer_ids).tolist())
+                if frames['order_items']:
+                    product_ids = pd.concat(frames['order_items'])['product_id']
+                    unknown = int((self.key_lookup.resolve('product', product_ids) == UNKNOWN_KEY).sum())
+                    if unknown:
+                        logger.warning(f"⚠️  {unknown:,} order items reference products not in dim_products "
+                                       f"(loaded against the unknown member)")
+                self.customer_analytics.refresh_customers(conn, previous_customers | customers)
+        finally:
+            conn.close()
+        return order_ids
+
+    def move(self, path, destination):
+        """Move a file out of the inbox"""
+        destination.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(path), str(destination / path.name))
+
+    def process_batch(self, pending):
+        """Read, ingest and archive one batch; returns the number of files handled"""
+        frames, files, rows = self.read_batch(pending)
+        if not files:
+            return 0
+
+        start = time.perf_counter()
+        try:
+            order_ids = self.ingest(frames)
+        except Exception as e:
+            if not is_transient(e):
+                logger.error(f"✗ Batch failed, moving {len(files)} files to {self.failed_dir}: {e}")
+                for _, path, _ in files:
+                    self.move(path, self.failed_dir)
+                return len(files)
+            return self.retry_later(files, e)
+
+        self.retry_at = 0.0
+        visible_at = time.time()
+        for _, path, _ in files:
+            self.attempts.pop(path, None)
+            self.move(path, self.processed_dir)
+
+        latencies = [visible_at - arrived_at for _, _, arrived_at in files]
+        self.latencies.extend(latencies)
+        self.batches += 1
+        self.rows += rows
+        logger.info(
+            f"✓ Batch {self.batches}: {len(files)} files, {rows:,} rows, {len(order_ids):,} orders "
+            f"in {time.perf_counter() - start:.2f}s | arrival→visible max {max(latencies):.2f}s"
+        )
+        return len(files)
+
+    def retry_later(self, files, error):
+        """Leave a batch that hit a transient error in the inbox for a later retry
+
+        Files that ran out of attempts are moved to failed/; returns how many.
+        """
+        exhausted = []
+        for _, path, _ in files:
+            self.attempts[path] = self.attempts.get(path, 0) + 1
+            if self.attempts[path] >= self.max_attempts:
+                exhausted.append(path)
+
+        attempt = max(self.attempts[path] for _, path, _ in files)
+        backoff = min(self.retry_backoff * 2 ** (attempt - 1), self.max_retry_backoff)
+        self.retry_at = time.monotonic() + backoff
+        logger.warning(f"⚠️  Batch hit a transient error (attempt {attempt}/{self.max_attempts}), "
+                       f"retrying in {backoff:g}s: {error}")
+
+        if exhausted:
+            logger.error(f"✗ Giving up after {self.max_attempts} attempts, "
+                         f"moving {len(exhausted)} files to {self.failed_dir}")
+            for path in exhausted:
+                self.attempts.pop(path)
+                self.move(path, self.failed_dir)
+        return len(exhausted)
+
+    def run(self, once=False):
+        """Poll the inbox until interrupted (or until it is empty with once=True)"""
+        try:
+            while True:
+                pending = self.scan()
+                self.update_backpressure(len(pending))
+
+                if once and not pending:
+                    break
+                wait = self.retry_at - time.monotonic()
+                if wait > 0:
+                    time.sleep(min(wait, self.poll_interval))
+                    continue
+                if once or self.batch_ready(pending):
+                    self.process_batch(pending)
+                    continue
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            logger.info("Stopping ingestion...")
+        finally:
+            (self.inbox / self.BACKPRESSURE_MARKER).unlink(missing_ok=True)
+            self.print_summary()
+
+    def print_summary(self):
+        """Print throughput and end-to-end latency"""
+        print("\n" + "=" * 60)
+        print("📊 STREAMING INGESTION SUMMARY")
+        print("=" * 60)
+        print(f"   Batches:          {self.batches:>10,}")
+        print(f"   Rows ingested:    {self.rows:>10,}")
+        if self.latencies:
+            ordered = sorted(self.latencies)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            print(f"   Latency p50:      {statistics.median(ordered):>10.2f}s (file arrival → visible in marts)")
+            print(f"   Latency p95:      {p95:>10.2f}s")
+            print(f"   Latency max:      {ordered[-1]:>10.2f}s")
+        print("=" * 60 + "\n")
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Ingest order files from data/raw in micro-batches")
+    parser.add_argument('--inbox', default='data/raw', help="Directory to watch")
+    parser.add_argument('--processed-dir', default='data/processed', help="Where ingested files are moved")
+    parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds between inbox scans")
+    parser.add_argument('--max-batch-files', type=int, default=20, help="Maximum files per micro-batch")
+    parser.add_argument('--max-batch-rows', type=int, default=50_000, help="Maximum rows per micro-batch")
+    parser.add_argument('--max-latency', type=float, default=5.0,
+                        help="Flush a partial batch once its oldest file has waited this many seconds")
+    parser.add_argument('--settle', type=float, default=0.5,
+                        help="Ignore files modified within this many seconds")
+    parser.add_argument('--max-pending-files', type=int, default=200,
+                        help="Backlog size that raises the back-pressure marker")
+    parser.add_argument('--max-attempts', type=int, default=8,
+                        help="Tries per file on transient database errors before it is moved to failed/")
+    parser.add_argument('--retry-backoff', type=float, default=1.0,
+                        help="Seconds before the first retry (doubles per attempt, up to 60s)")
+    parser.add_argument('--once', action='store_true', help="Drain the inbox and exit")
+    args = parser.parse_args()
+
+    db.use_workload('etl')
+    ingestor = MicroBatchIngestor(
+        inbox=args.inbox,
+        processed_dir=args.processed_dir,
+        poll_interval=args.poll_interval,
+        max_batch_files=args.max_batch_files,
+        max_batch_rows=args.max_batch_rows,
+        max_latency=args.max_latency,
+        settle_seconds=args.settle,
+        max_pending_files=args.max_pending_files,
+        max_attempts=args.max_attempts,
+        retry_backoff=args.retry_backoff,
+    )
+    ingestor.run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Blue/green rebuild of the marts schema
+A full refresh that never makes readers wait: dimensions and facts are built
+into a shadow schema (marts_build, created from the same DDL scripts as marts),
+validated there, and only then swapped with the live schema by two renames in
+one short transaction:
+
+    marts        -> marts_previous   (kept for instant rollback)
+    marts_build  -> marts
+
+Renaming a schema does not lock its tables, so the swap does not wait for
+running queries (they finish on the tables they started on) and new queries
+see the complete new version. ``rollback`` swaps marts_previous back in the
+same way. The previous version is dropped at the start of the next rebuild.
+
+Stream ingestion writes to the live marts: pause it during a rebuild, or the
+micro-batches it applies meanwhile are only in staging (and in the next
+rebuild) after the swap.
+
+Usage:
+    python -m src.transformers.blue_green             # rebuild from staging and swap
+    python -m src.transformers.blue_green --rollback  # swap the previous version back
+"""
+
+import argparse
+import logging
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+
+from src.transformers.load_dimensions import DimensionLoader
+from src.transformers.load_facts import FactLoader
+from src.utils.config import config
+from src.utils.db_connection import db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LIVE_SCHEMA = 'marts'
+SHADOW_SCHEMA = 'marts_build'
+PREVIOUS_SCHEMA = 'marts_previous'
+
+DDL_DIR = Path(__file__).resolve().parents[2] / 'sql' / 'ddl'
+MART_DDL_PATHS = [
+    DDL_DIR / '03_create_marts_tables.sql',
+    DDL_DIR / '05_create_holidays.sql',
+    DDL_DIR / '06_create_compact_facts.sql',
+]
+
+
+class MartValidationError(ValueError):
+    """The shadow marts failed data-quality validation (the live marts are unchanged)"""
+
+
+def schema_ddl(path, schema):
+    """A marts DDL script with its tables created in ``schema`` instead"""
+    return path.read_text().replace(f'{LIVE_SCHEMA}.', f'{schema}.')
+
+
+class BlueGreenRebuild:
+    """Build the marts in a shadow schema, validate, and swap it in atomically"""
+
+    def __init__(self, lock_timeout='5s'):
+        # Bounds how long DROP SCHEMA may wait for queries still reading a retired version
+        self.lock_timeout = lock_timeout
+
+    @staticmethod
+    def schema_exists(conn, schema):
+        return conn.execute(
+            text("SELECT EXISTS (SELECT 1 FROM pg_namespace WHERE nspname = :schema)"), {'schema': schema}
+        ).scalar()
+
+    def drop_schema(self, conn, schema):
+        """Drop a retired or half-built version (waits at most lock_timeout for its readers)"""
+        conn.execute(text(f"SET lock_timeout = '{self.lock_timeout}'"))
+        try:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        finally:
+            conn.execute(text("RESET lock_timeout"))
+
+    def create_shadow(self):
+        """Create an empty shadow schema with the live tables, indexes and holiday list"""
+        with db.get_connection() as conn:
+            self.drop_schema(conn, PREVIOUS_SCHEMA)
+            self.drop_schema(conn, SHADOW_SCHEMA)
+            conn.execute(text(f"CREATE SCHEMA {SHADOW_SCHEMA}"))
+            for path in MART_DDL_PATHS:
+                conn.exec_driver_sql(schema_ddl(path, SHADOW_SCHEMA))
+
+            # Carry over edits to the live holiday list
+            if conn.execute(text(f"SELECT to_regclass('{LIVE_SCHEMA}.holidays') IS NOT NULL")).scalar():
+                conn.execute(text(f"""
+                    TRUNCATE TABLE {SHADOW_SCHEMA}.holidays;
+                    INSERT INTO {SHADOW_SCHEMA}.holidays (holiday_date, holiday_name)
+                    SELECT holiday_date, holiday_name FROM {LIVE_SCHEMA}.holidays;
+                """))
+        logger.info(f"✓ Created shadow schema {SHADOW_SCHEMA}")
+
+    def build(self):
+        """Load every dimension and fact table into the shadow schema"""
+        results = {}
+        results.update(DimensionLoader(schema=SHADOW_SCHEMA).load_all_dimensions())
+        results.update(FactLoader(schema=SHADOW_SCHEMA).load_all_facts())
+        return results
+
+    def validate(self):
+        """Run the mart data-quality rules against the shadow schema"""
+        from src.utils.data_quality import DataQualityEngine, default_rules
+
+        rules = {
+            table: table_rules for table, table_rules in default_rules(SHADOW_SCHEMA).items()
+            if table.startswith(f'{SHADOW_SCHEMA}.')
+        }
+        report = DataQualityEngine(rules=rules, mode=config.DQ_MODE).run()
+        report.print_report()
+        if not report.passed:
+            issues = [f"{r['table']}: {r['rule']}" for r in report.failures]
+            raise MartValidationError(f"Shadow marts failed validation, not swapping: {issues}")
+        logger.info(f"✓ Shadow schema {SHADOW_SCHEMA} passed validation")
+        return report
+
+    def swap(self):
+        """Make the shadow schema live in one transaction; the old one becomes marts_previous"""
+        start = time.perf_counter()
+        conn = db.engine.connect().execution_options(isolation_level="READ COMMITTED")
+        try:
+            with conn.begin():
+                if self.schema_exists(conn, LIVE_SCHEMA):
+                    conn.execute(text(f"ALTER SCHEMA {LIVE_SCHEMA} RENAME TO {PREVIOUS_SCHEMA}"))
+                conn.execute(text(f"ALTER SCHEMA {SHADOW_SCHEMA} RENAME TO {LIVE_SCHEMA}"))
+        finally:
+            conn.close()
+        logger.info(f"✓ Swapped {SHADOW_SCHEMA} live in {(time.perf_counter() - start) * 1000:.1f} ms "
+                    f"(previous version kept as {PREVIOUS_SCHEMA})")
+
+    def rollback(self):
+        """Swap the previous version back in; the rolled-back one is kept as marts_build"""
+        with db.get_connection() as conn:
+            if not self.schema_exists(conn, PREVIOUS_SCHEMA):
+                logger.error(f"✗ No previous version ({PREVIOUS_SCHEMA}) to roll back to")
+                return False
+            self.drop_schema(conn, SHADOW_SCHEMA)
+
+        conn = db.engine.connect().execution_options(isolation_level="READ COMMITTED")
+        try:
+            with conn.begin():
+                conn.execute(text(f"ALTER SCHEMA {LIVE_SCHEMA} RENAME TO {SHADOW_SCHEMA}"))
+                conn.execute(text(f"ALTER SCHEMA {PREVIOUS_SCHEMA} RENAME TO {LIVE_SCHEMA}"))
+        finally:
+            conn.close()
+        logger.info(f"✓ Rolled back to the previous marts (rolled-back version kept as {SHADOW_SCHEMA})")
+        return True
+
+    def run(self):
+        """Full refresh: create, build and validate the shadow schema, then swap it live"""
+        print("\n" + "=" * 60)
+        print("🔄 BLUE/GREEN MART REBUILD")
+        print("=" * 60 + "\n")
+
+        self.create_shadow()
+        results = self.build()
+        self.validate()
+        self.swap()
+
+        print("\n" + "=" * 60)
+        print(f"✅ MARTS REBUILT AND SWAPPED LIVE ({sum(results.values()):,} rows)")
+        print("=" * 60 + "\n")
+        return results
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Rebuild the marts in a shadow schema and swap it live")
+    parser.add_argument(
+        '--rollback',
+        action='store_true',
+        help=f"Swap {PREVIOUS_SCHEMA} back in as {LIVE_SCHEMA}"
+    )
+    args = parser.parse_args()
+
+    db.use_workload('etl')
+    rebuild = BlueGreenRebuild()
+    if args.rollback:
+        raise SystemExit(0 if rebuild.rollback() else 1)
+    rebuild.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Customer Analytics: RFM scores and monthly cohort retention
+Streams completed orders from marts.fact_orders in chunks and computes both
+marts with vectorised pandas group-bys:
+
+* marts.customer_rfm: first/last order date, frequency and monetary value per
+  customer, with 1-5 recency/frequency/monetary scores (quintiles over all
+  customers, recency measured from the latest order in the warehouse) and a
+  segment derived from the R and F scores.
+* marts.cohort_retention: for each first-order month, the share of the cohort
+  that ordered again 0, 1, 2, ... months later.
+
+Every full scoring pass also stores the quintile cutoffs it produced in
+marts.customer_rfm_cutoffs. The incremental path (refresh_customers) re-reads
+the orders of the given customers, updates the aggregates of customers that
+already have scores (keeping those scores) and scores new customers against
+the stored cutoffs. Re-ranking everyone (rescore) is a full pass over
+customer_rfm, so it only runs once rescore_every customers changed or
+rescore_interval seconds passed since the last pass. The cohorts those
+customers belong to are recomputed every time, which re-streams all orders
+of those cohorts' customers.
+
+Usage:
+    python -m src.transformers.customer_analytics
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from src.loaders.csv_to_postgres import copy_frame
+from src.utils.db_connection import db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# {where} narrows the orders streamed (incremental path); the unknown member
+# (-1) is not a customer
+ORDERS_QUERY = """
+    SELECT f.customer_key, f.order_date, f.total_amount
+    FROM {schema}.fact_orders f
+    WHERE f.status = 'completed' AND f.customer_key IS NOT NULL AND f.customer_key <> -1 {where}
+"""
+
+RFM_COLUMNS = [
+    'customer_key', 'first_order_date', 'last_order_date', 'frequency', 'monetary',
+    'recency_days', 'r_score', 'f_score', 'm_score', 'rfm_segment', 'cohort_month',
+]
+SCORE_COLUMNS = ['recency_days', 'r_score', 'f_score', 'm_score', 'rfm_segment']
+AGGREGATE_COLUMNS = ['customer_key', 'first_order_date', 'last_order_date', 'frequency', 'monetary', 'cohort_month']
+CUTOFF_COLUMNS = ['score', 'recency_days', 'frequency', 'monetary', 'as_of']
+COHORT_COLUMNS = ['cohort_month', 'months_since', 'active_customers', 'cohort_size', 'retention_rate']
+
+
+def aggregate_orders(chunks):
+    """Reduce streamed order chunks to per-customer aggregates and active months
+
+    Returns (aggregates indexed by customer_key, unique customer/month pairs).
+    Each chunk is reduced on its own, so memory grows with customers, not orders.
+    """
+    partials = []
+    months = []
+    for chunk in chunks:
+        chunk['total_amount'] = chunk['total_amount'].astype('float64')
+        partials.append(chunk.groupby('customer_key').agg(
+            first_order_date=('order_date', 'min'),
+            last_order_date=('order_date', 'max'),
+            frequency=('order_date', 'size'),
+            monetary=('total_amount', 'sum'),
+        ))
+        month = chunk['order_date'].dt.to_period('M')
+        months.append(pd.DataFrame({'customer_key': chunk['customer_key'], 'month': month}).drop_duplicates())
+
+    if not partials:
+        empty = pd.DataFrame(columns=['first_order_date', 'last_order_date', 'frequency', 'monetary'])
+        return empty.rename_axis('customer_key'), pd.DataFrame(columns=['customer_key', 'month'])
+
+    aggregates = pd.concat(partials).groupby(level=0).agg(
+        first_order_date=('first_order_date', 'min'),
+        last_order_date=('last_order_date', 'max'),
+        frequency=('frequency', 'sum'),
+        monetary=('monetary', 'sum'),
+    )
+    aggregates['cohort_month'] = aggregates['first_order_date'].dt.to_period('M')
+    activity = pd.concat(months, ignore_index=True).drop_duplicates()
+    return aggregates, activity
+
+
+def _quintile(values):
+    """1-5 score by percentile rank; equal values get equal scores"""
+    return np.ceil(values.rank(method='average', pct=True) * 5).clip(1, 5).astype('int16')
+
+
+def _segment(r, f):
+    """Segment name from R and F scores"""
+    return np.select(
+        [(r >= 4) & (f >= 4), (r >= 3) & (f >= 3), r >= 4, (r <= 2) & (f >= 3), (r <= 2) & (f <= 2)],
+        ['Champions', 'Loyal', 'Promising', 'At Risk', 'Hibernating'],
+        default='Needs Attention',
+    )
+
+
+def score_rfm(aggregates):
+    """Add recency_days, R/F/M quintile scores and a segment to customer aggregates"""
+    scored = aggregates.copy()
+    as_of = scored['last_order_date'].max().normalize()
+    scored['recency_days'] = (as_of - scored['last_order_date'].dt.normalize()).dt.days.astype('int32')
+    scored['r_score'] = _quintile(-scored['recency_days'])
+    scored['f_score'] = _quintile(scored['frequency'])
+    scored['m_score'] = _quintile(scored['monetary'])
+    scored['rfm_segment'] = _segment(scored['r_score'], scored['f_score'])
+    return scored
+
+
+def quintile_cutoffs(scored):
+    """Thresholds reaching each score of 2-5 in a scored population
+
+    Highest recency_days and lowest frequency/monetary with that score (NaN when
+    no customer got it), plus the as-of date recency was measured from.
+    """
+    cutoffs = pd.DataFrame(index=pd.RangeIndex(2, 6, name='score'))
+    cutoffs['recency_days'] = scored.groupby('r_score')['recency_days'].max().astype('Int64')
+    cutoffs['frequency'] = scored.groupby('f_score')['frequency'].min().astype('Int64')
+    cutoffs['monetary'] = scored.groupby('m_score')['monetary'].min().round(2)
+    cutoffs['as_of'] = scored['last_order_date'].max().normalize()
+    return cutoffs
+
+
+def _score_against(values, cutoffs, higher_is_better=True):
+    """Highest score whose cutoff the value reaches (1 when it reaches none)"""
+    scores = pd.Series(1, index=values.index, dtype='int16')
+    for score, cutoff in cutoffs.dropna().sort_index().items():
+        scores[values >= cutoff if higher_is_better else values <= cutoff] = score
+    return scores
+
+
+def score_with_cutoffs(aggregates, cutoffs):
+    """Score customer aggregates against stored cutoffs instead of re-ranking everyone
+
+    Gives the same scores as score_rfm for customers of the population the
+    cutoffs came from; orders after the stored as-of date count as recency 0.
+    """
+    scored = aggregates.copy()
+    last_order = scored['last_order_date'].dt.normalize()
+    as_of = pd.Timestamp(cutoffs['as_of'].max())
+    scored['recency_days'] = (last_order.clip(lower=as_of) - last_order).dt.days.astype('int32')
+    scored['r_score'] = _score_against(scored['recency_days'], cutoffs['recency_days'], higher_is_better=False)
+    scored['f_score'] = _score_against(scored['frequency'], cutoffs['frequency'])
+    scored['m_score'] = _score_against(scored['monetary'], cutoffs['monetary'])
+    scored['rfm_segment'] = _segment(scored['r_score'], scored['f_score'])
+    return scored
+
+
+def cohort_matrix(aggregates, activity):
+    """Monthly cohort retention from per-customer cohorts and active months"""
+    if activity.empty:
+        return pd.DataFrame(columns=COHORT_COLUMNS)
+
+    active = activity.merge(aggregates[['cohort_month']], left_on='customer_key', right_index=True)
+    cohort = active['cohort_month']
+    active['months_since'] = (
+        (active['month'].dt.year - cohort.dt.year) * 12 + (active['month'].dt.month - cohort.dt.month)
+    )
+
+    matrix = (
+        active.groupby(['cohort_month', 'months_since'])['customer_key']
+        .nunique()
+        .rename('active_customers')
+        .reset_index()
+    )
+    sizes = aggregates.groupby('cohort_month').size().rename('cohort_size')
+    matrix = matrix.merge(sizes, left_on='cohort_month', right_index=True)
+    matrix['retention_rate'] = (matrix['active_customers'] / matrix['cohort_size']).round(4)
+    matrix['cohort_month'] = matrix['cohort_month'].dt.to_timestamp().dt.date
+    return matrix[COHORT_COLUMNS]
+
+
+def _rfm_frame(scored, columns=RFM_COLUMNS):
+    """Shape scored aggregates for marts.customer_rfm"""
+    frame = scored.reset_index()
+    frame['monetary'] = frame['monetary'].round(2)
+    frame['cohort_month'] = frame['cohort_month'].dt.to_timestamp().dt.date
+    return frame[columns]
+
+
+class CustomerAnalyticsLoader:
+    """Build and incrementally maintain the RFM and cohort retention marts"""
+
+    def __init__(self, chunksize=200_000, schema='marts', rescore_every=1_000, rescore_interval=3600):
+        self.chunksize = chunksize
+        self.schema = schema
+        self.rescore_every = rescore_every
+        self.rescore_interval = rescore_interval
+
+    def stream_orders(self, conn, where='', params=None):
+        """Yield completed orders in chunks"""
+        return pd.read_sql(
+            ORDERS_QUERY.format(schema=self.schema, where=where), conn, params=params or {},
+            chunksize=self.chunksize, parse_dates=['order_date'],
+        )
+
+    def load_all(self):
+        """Rebuild customer_rfm and cohort_retention from fact_orders"""
+        logger.info("Loading customer_rfm and cohort_retention...")
+
+        conn = db.engine.connect().execution_options(isolation_level="READ COMMITTED")
+        try:
+            with conn.begin():
+                aggregates, activity = aggregate_orders(self.stream_orders(conn))
+                rfm = _rfm_frame(score_rfm(aggregates)) if len(aggregates) else pd.DataFrame(columns=RFM_COLUMNS)
+                cohorts = cohort_matrix(aggregates, activity)
+
+                conn.execute(text(f"TRUNCATE TABLE {self.schema}.customer_rfm, {self.schema}.cohort_retention"))
+                copy_frame(conn, f'{self.schema}.customer_rfm', rfm)
+                copy_frame(conn, f'{self.schema}.cohort_retention', cohorts)
+                if len(rfm):
+                    self.save_cutoffs(conn, quintile_cutoffs(rfm))
+        finally:
+            conn.close()
+
+        logger.info(f"✓ Loaded {len(rfm):,} customers to customer_rfm, {len(cohorts):,} cells to cohort_retention")
+        return {'customer_rfm': len(rfm), 'cohort_retention': len(cohorts)}
+
+    def save_cutoffs(self, conn, cutoffs):
+        """Replace the stored quintile cutoffs (scored_at marks the last full scoring pass)"""
+        conn.execute(text(f"DELETE FROM {self.schema}.customer_rfm_cutoffs"))
+        copy_frame(conn, f'{self.schema}.customer_rfm_cutoffs', cutoffs.reset_index()[CUTOFF_COLUMNS])
+
+    def load_cutoffs(self, conn):
+        """Stored quintile cutoffs indexed by score (empty before the first full scoring pass)"""
+        return pd.read_sql(
+            f"SELECT {', '.join(CUTOFF_COLUMNS)} FROM {self.schema}.customer_rfm_cutoffs",
+            conn, index_col='score', parse_dates=['as_of'],
+        ).astype({'monetary': 'float64'})
+
+    def rescore_due(self, conn):
+        """Whether rescore_every customers changed or rescore_interval seconds passed since the last rescore"""
+        due = conn.execute(text(f"""
+            SELECT scored_at IS NULL
+                OR CURRENT_TIMESTAMP - scored_at >= make_interval(secs => :interval)
+                OR (SELECT COUNT(*) FROM {self.schema}.customer_rfm r WHERE r.updated_at > scored_at) >= :every
+            FROM (SELECT MIN(scored_at) AS scored_at FROM {self.schema}.customer_rfm_cutoffs) c
+        """), {'interval': self.rescore_interval, 'every': self.rescore_every}).scalar()
+        return bool(due)
+
+    def rescore(self, conn):
+        """Recompute scores for all customers and update rows whose scores changed
+
+        Reads and re-ranks the whole of customer_rfm, so the incremental path
+        only runs it when rescore_due() (see refresh_customers).
+        """
+        current = pd.read_sql(
+            "SELECT customer_key, last_order_date, frequency, monetary, "
+            + ", ".join(SCORE_COLUMNS) + f" FROM {self.schema}.customer_rfm",
+            conn, index_col='customer_key', parse_dates=['last_order_date'],
+        )
+        if current.empty:
+            return 0
+
+        current['monetary'] = current['monetary'].astype('float64')
+        scored = score_rfm(current)
+        self.save_cutoffs(conn, quintile_cutoffs(scored))
+        changed = (scored[SCORE_COLUMNS] != current[SCORE_COLUMNS]).any(axis=1)
+        updates = scored.loc[changed, SCORE_COLUMNS].reset_index()
+        if updates.empty:
+            return 0
+
+        conn.execute(text(
+            "CREATE TEMP TABLE tmp_rfm_scores (customer_key INTEGER, recency_days INTEGER, r_score SMALLINT, "
+            "f_score SMALLINT, m_score SMALLINT, rfm_segment VARCHAR(30)) ON COMMIT DROP"
+        ))
+        copy_frame(conn, 'tmp_rfm_scores', updates)
+        conn.execute(text(f"""
+            UPDATE {self.schema}.customer_rfm r
+            SET recency_days = s.recency_days, r_score = s.r_score, f_score = s.f_score,
+                m_score = s.m_score, rfm_segment = s.rfm_segment, updated_at = CURRENT_TIMESTAMP
+            FROM tmp_rfm_scores s
+            WHERE r.customer_key = s.customer_key
+        """))
+        conn.execute(text("DROP TABLE tmp_rfm_scores"))
+        return len(updates)
+
+    def refresh_customers(self, conn, customer_keys):
+        """Update both marts for customers with new or changed orders (incremental path)
+
+        Customers that already have scores keep them and only get their order
+        aggregates updated; new customers are scored against the stored
+        cutoffs. Everyone is re-ranked when rescore_due(). The customers'
+        cohorts are recomputed on every call, at the cost of streaming every
+        order of those cohorts.
+        """
+        customer_keys = [int(key) for key in customer_keys if key is not None]
+        if not customer_keys:
+            return 0
+
+        previous_cohorts = set(conn.execute(
+            text(f"SELECT DISTINCT cohort_month FROM {self.schema}.customer_rfm WHERE customer_key = ANY(:keys)"),
+            {'keys': customer_keys}
+        ).scalars())
+
+        aggregates, _ = aggregate_orders(
+            self.stream_orders(conn, 'AND f.customer_key = ANY(%(keys)s)', {'keys': customer_keys})
+        )
+        scored_keys = set(conn.execute(
+            text(f"SELECT customer_key FROM {self.schema}.customer_rfm "
+                 "WHERE customer_key = ANY(:keys) AND rfm_segment IS NOT NULL"),
+            {'keys': customer_keys}
+        ).scalars())
+        known = aggregates.index.isin(list(scored_keys))
+
+        # Customers without completed orders any more, and any unscored rows, are rewritten below
+        conn.execute(
+            text(f"DELETE FROM {self.schema}.customer_rfm WHERE customer_key = ANY(:keys)"),
+            {'keys': [key for key in customer_keys if key not in scored_keys or key not in aggregates.index]}
+        )
+        if known.any():
+            conn.execute(text(
+                "CREATE TEMP TABLE tmp_rfm_aggregates (customer_key INTEGER, first_order_date TIMESTAMP, "
+                "last_order_date TIMESTAMP, frequency INTEGER, monetary DECIMAL(14, 2), cohort_month DATE) "
+                "ON COMMIT DROP"
+            ))
+            copy_frame(conn, 'tmp_rfm_aggregates', _rfm_frame(aggregates[known], AGGREGATE_COLUMNS))
+            conn.execute(text(f"""
+                UPDATE {self.schema}.customer_rfm r
+                SET first_order_date = a.first_order_date, last_order_date = a.last_order_date,
+                    frequency = a.frequency, monetary = a.monetary, cohort_month = a.cohort_month,
+                    updated_at = CURRENT_TIMESTAMP
+                FROM tmp_rfm_aggregates a
+                WHERE r.customer_key = a.customer_key
+            """))
+            conn.execute(text("DROP TABLE tmp_rfm_aggregates"))
+        if (~known).any():
+            cutoffs = self.load_cutoffs(conn)
+            if len(cutoffs):
+                rfm = score_with_cutoffs(aggregates[~known], cutoffs)
+            else:
+                # No full scoring pass yet: rank among themselves until rescore() runs below
+                rfm = score_rfm(aggregates[~known])
+            copy_frame(conn, f'{self.schema}.customer_rfm', _rfm_frame(rfm))
+
+        if self.rescore_due(conn):
+            updated = self.rescore(conn)
+            logger.info(f"✓ Rescored customer_rfm ({updated:,} rows changed)")
+
+        # Recompute the cohorts these customers left or joined
+        cohorts = set(previous_cohorts)
+        if len(aggregates):
+            cohorts |= set(aggregates['cohort_month'].dt.to_timestamp().dt.date)
+        cohort_customers = (
+            f"AND f.customer_key IN (SELECT customer_key FROM {self.schema}.customer_rfm "
+            "WHERE cohort_month = ANY(%(cohorts)s))"
+        )
+        cohort_aggregates, activity = aggregate_orders(
+            self.stream_orders(conn, cohort_customers, {'cohorts': list(cohorts)})
+        )
+        conn.execute(
+            text(f"DELETE FROM {self.schema}.cohort_retention WHERE cohort_month = ANY(:cohorts)"), {'cohorts': list(cohorts)}
+        )
+        copy_frame(conn, f'{self.schema}.cohort_retention', cohort_matrix(cohort_aggregates, activity))
+        return len(customer_keys)
+
+
+if __name__ == "__main__":
+    db.use_workload('etl')
+    CustomerAnalyticsLoader().load_all()
@@ -0,0 +1,144 @@
+"""
+Surrogate-key lookup cache for Python-side fact builds.
+
+Loads the natural-key -> surrogate-key mapping of each dimension once into a
+pair of sorted NumPy arrays (int64 ids, int32 keys: 12 bytes per member) and
+resolves whole batches of natural ids with one vectorised ``np.searchsorted``,
+instead of joining to the dimension tables on every micro-batch.
+
+Ids that are not (yet) in a dimension resolve to the unknown member
+(UNKNOWN_KEY), a placeholder row that DimensionLoader inserts in each
+dimension, so facts for late-arriving dimension members are kept rather than
+dropped. ``sync`` picks up dimension changes incrementally: SERIAL keys only
+grow, so new members are the rows above the highest cached key, and a rebuilt
+dimension (TRUNCATE + reload) is detected by its row count and reloaded.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Surrogate key of the "unknown member" row in every dimension
+UNKNOWN_KEY = -1
+
+# Sentinel for missing (NULL) natural ids; never matches a real id
+_MISSING_ID = np.iinfo(np.int64).min
+
+# dimension -> (table, natural key column, surrogate key column)
+DIMENSIONS = {
+    'customer': ('marts.dim_customers', 'customer_id', 'customer_key'),
+    'product': ('marts.dim_products', 'product_id', 'product_key'),
+}
+
+
+def _as_ids(ids):
+    """Natural ids as an int64 array (NULLs become a sentinel that never matches)"""
+    return pd.array(ids, dtype='Int64').to_numpy(dtype=np.int64, na_value=_MISSING_ID)
+
+
+class KeyMap:
+    """Natural id -> surrogate key mapping held in sorted NumPy arrays"""
+
+    def __init__(self, ids=(), keys=(), unknown_key=UNKNOWN_KEY):
+        self.unknown_key = unknown_key
+        self.ids = np.empty(0, dtype=np.int64)
+        self.keys = np.empty(0, dtype=np.int32)
+        self.update(ids, keys)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + self.keys.nbytes
+
+    @property
+    def max_key(self):
+        """Highest surrogate key held (0 when empty)"""
+        return int(self.keys.max()) if len(self.keys) else 0
+
+    def update(self, ids, keys):
+        """Add or replace mappings; the new key wins for an id that is already mapped"""
+        ids = np.concatenate([_as_ids(ids), self.ids])
+        keys = np.concatenate([np.asarray(keys, dtype=np.int32), self.keys])
+        # np.unique keeps the first occurrence of each id, i.e. the new mapping
+        self.ids, first = np.unique(ids, return_index=True)
+        self.keys = keys[first]
+
+    def resolve(self, ids):
+        """Surrogate keys for a batch of natural ids (UNKNOWN_KEY where unmapped)"""
+        ids = _as_ids(ids)
+        if not len(self.ids):
+            return np.full(len(ids), self.unknown_key, dtype=np.int32)
+        positions = np.searchsorted(self.ids, ids).clip(max=len(self.ids) - 1)
+        found = self.ids[positions] == ids
+        return np.where(found, self.keys[positions], self.unknown_key).astype(np.int32)
+
+
+class KeyLookup:
+    """Cached surrogate-key maps for the customer and product dimensions"""
+
+    def __init__(self, dimensions=None):
+        self.dimensions = list(dimensions or DIMENSIONS)
+        self.maps = {dimension: KeyMap() for dimension in self.dimensions}
+        self.loaded = False
+        # Ids resolved to the unknown member, per dimension (late-arriving members)
+        self.unknown = dict.fromkeys(self.dimensions, 0)
+
+    def _fetch(self, conn, dimension, min_key=None):
+        """(ids, keys) of a dimension's members, optionally only keys above min_key"""
+        table, id_column, key_column = DIMENSIONS[dimension]
+        where = f"WHERE {key_column} <> {UNKNOWN_KEY}"
+        if min_key is not None:
+            where += f" AND {key_column} > {int(min_key)}"
+        rows = conn.execute(text(f"SELECT {id_column}, {key_column} FROM {table} {where}")).all()
+        return [row[0] for row in rows], [row[1] for row in rows]
+
+    def load(self, conn):
+        """Load every dimension's mapping"""
+        for dimension in self.dimensions:
+            self.maps[dimension] = KeyMap(*self._fetch(conn, dimension))
+        self.loaded = True
+        logger.info("✓ Loaded key lookup: " + ", ".join(
+            f"{len(key_map):,} {dimension}s ({key_map.nbytes / 1024:,.1f} KB)"
+            for dimension, key_map in self.maps.items()
+        ))
+
+    def sync(self, conn):
+        """Pick up dimension changes since the last load/sync; returns new members per dimension"""
+        if not self.loaded:
+            self.load(conn)
+            return {dimension: len(key_map) for dimension, key_map in self.maps.items()}
+
+        added = {}
+        for dimension in self.dimensions:
+            table, _, key_column = DIMENSIONS[dimension]
+            key_map = self.maps[dimension]
+            count, max_key = conn.execute(text(
+                f"SELECT COUNT(*), COALESCE(MAX({key_column}), 0) FROM {table} WHERE {key_column} <> {UNKNOWN_KEY}"
+            )).one()
+            if count == len(key_map) and max_key == key_map.max_key:
+                added[dimension] = 0
+                continue
+
+            ids, keys = self._fetch(conn, dimension, min_key=key_map.max_key)
+            if len(key_map) + len(ids) == count:
+                key_map.update(ids, keys)
+                added[dimension] = len(ids)
+            else:
+                # Rebuilt dimension (keys reassigned): reload it
+                self.maps[dimension] = KeyMap(*self._fetch(conn, dimension))
+                added[dimension] = count
+                logger.info(f"✓ Reloaded {dimension} keys after a dimension rebuild ({count:,} members)")
+        return added
+
+    def resolve(self, dimension, ids):
+        """Surrogate keys for a batch of natural ids (UNKNOWN_KEY for unknown ids)"""
+        keys = self.maps[dimension].resolve(ids)
+        self.unknown[dimension] += int(np.count_nonzero(keys == UNKNOWN_KEY))
+        return keys
@@ -1,23 +1,81 @@
+from datetime import date, timedelta
+from pathlib import Path
 from sqlalchemy import text
+from src.utils.config import config
 from src.utils.db_connection import db
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+HOLIDAYS_DDL_PATH = Path(__file__).resolve().parents[2] / 'sql' / 'ddl' / '05_create_holidays.sql'
+
+DIM_DATE_COLUMNS = """
+    date_key,
+    date,
+    year,
+    quarter,
+    month,
+    month_name,
+    week,
+    day_of_month,
+    day_of_week,
+    day_name,
+    is_weekend,
+    is_holiday
+"""
+
+# One row per calendar day in [:start_date, :end_date]
+DIM_DATE_SELECT = """
+    SELECT
+        TO_CHAR(d, 'YYYYMMDD')::INTEGER as date_key,
+        d::DATE as date,
+        EXTRACT(YEAR FROM d)::INTEGER as year,
+        EXTRACT(QUARTER FROM d)::INTEGER as quarter,
+        EXTRACT(MONTH FROM d)::INTEGER as month,
+        TRIM(TO_CHAR(d, 'Month')) as month_name,
+        EXTRACT(WEEK FROM d)::INTEGER as week,
+        EXTRACT(DAY FROM d)::INTEGER as day_of_month,
+        EXTRACT(DOW FROM d)::INTEGER as day_of_week,
+        TRIM(TO_CHAR(d, 'Day')) as day_name,
+        EXTRACT(DOW FROM d) IN (0, 6) as is_weekend,
+        h.holiday_date IS NOT NULL as is_holiday
+    FROM generate_series(CAST(:start_date AS DATE), CAST(:end_date AS DATE), INTERVAL '1 day') AS d
+    LEFT JOIN {schema}.holidays h ON h.holiday_date = d::DATE
+"""
+
 class DimensionLoader:
     """Load dimension tables from staging data"""
     
+    # Each dimension reads a single staging table, so it can start as soon
+    # as that table is staged (see ETLPipeline.extract_load_and_transform_dimensions)
+    SOURCE_TABLES = {
+        'dim_customers': 'customers',
+        'dim_products': 'products',
+        'dim_date': 'orders',
+    }
+    
+    def __init__(self, schema='marts'):
+        # Target schema: the live marts, or a shadow schema for a blue/green rebuild
+        self.schema = schema
+    
     def load_dim_customers(self):
         """Transform and load customer dimension"""
         logger.info("Loading dim_customers...")
         
-        query = text("""
+        query = text(f"""
             -- Clear existing data
-            TRUNCATE TABLE marts.dim_customers CASCADE;
+            TRUNCATE TABLE {self.schema}.dim_customers CASCADE;
+            
+            -- Unknown member: facts for customers not (yet) in the dimension point here
+            INSERT INTO {self.schema}.dim_customers (
+                customer_key, customer_id, first_name, last_name, full_name,
+                email, country, customer_segment, is_active, is_current
+            )
+            VALUES (-1, -1, 'Unknown', 'Unknown', 'Unknown', 'unknown', 'Unknown', 'Unknown', FALSE, TRUE);
             
-            -- Load customer dimension
-            INSERT INTO marts.dim_customers (
+            -- Load customer dimension (staging is keyed by customer_id, no DISTINCT needed)
+            INSERT INTO {self.schema}.dim_customers (
                 customer_id, 
                 first_name, 
                 last_name, 
@@ -30,7 +88,7 @@ class DimensionLoader:
                 valid_from,
                 is_current
             )
-            SELECT DISTINCT
+            SELECT
                 customer_id,
                 first_name,
                 last_name,
@@ -51,7 +109,7 @@ class DimensionLoader:
         
         with db.get_connection() as conn:
             result = conn.execute(query)
-            count = db.get_table_count('marts', 'dim_customers')
+            count = db.get_table_count(self.schema, 'dim_customers')
             logger.info(f"✓ Loaded {count:,} customers to dim_customers")
             return count
     
@@ -59,12 +117,16 @@ class DimensionLoader:
         """Transform and load product dimension"""
         logger.info("Loading dim_products...")
         
-        query = text("""
+        query = text(f"""
             -- Clear existing data
-            TRUNCATE TABLE marts.dim_products CASCADE;
+            TRUNCATE TABLE {self.schema}.dim_products CASCADE;
 
-            -- Load product dimension
-            INSERT INTO marts.dim_products (
+            -- Unknown member: facts for products not (yet) in the dimension point here
+            INSERT INTO {self.schema}.dim_products (product_key, product_id, product_name, category, is_current)
+            VALUES (-1, -1, 'Unknown', 'Unknown', TRUE);
+
+            -- Load product dimension (staging is keyed by product_id, no DISTINCT needed)
+            INSERT INTO {self.schema}.dim_products (
                 product_id,
                 product_name,
                 category,
@@ -74,7 +136,7 @@ class DimensionLoader:
                 valid_from,
                 is_current
             )
-            SELECT DISTINCT
+            SELECT
                 product_id,
                 product_name,
                 category,
@@ -88,59 +150,93 @@ class DimensionLoader:
         
         with db.get_connection() as conn:
             result = conn.execute(query)
-            count = db.get_table_count('marts', 'dim_products')
+            count = db.get_table_count(self.schema, 'dim_products')
             logger.info(f"✓ Loaded {count:,} products to dim_products")
             return count
     
+    def ensure_holidays(self):
+        """Create and seed the holidays table if it does not exist yet"""
+        with db.get_connection() as conn:
+            conn.exec_driver_sql(HOLIDAYS_DDL_PATH.read_text().replace('marts.', f'{self.schema}.'))
+    
+    def extend_calendar(self, conn, start_date, end_date):
+        """Add the days of [start_date, end_date] that fall outside the current calendar
+        
+        Keeps dim_date contiguous: a date after (before) the calendar extends it
+        from the current last (first) day. Returns the number of days added.
+        """
+        current_start, current_end = conn.execute(
+            text(f"SELECT MIN(date), MAX(date) FROM {self.schema}.dim_date")
+        ).one()
+        
+        if current_start is None:
+            ranges = [(start_date, end_date)]
+        else:
+            ranges = []
+            if start_date < current_start:
+                ranges.append((start_date, current_start - timedelta(days=1)))
+            if end_date > current_end:
+                ranges.append((current_end + timedelta(days=1), end_date))
+        
+        query = text(f"""
+            INSERT INTO {self.schema}.dim_date (""" + DIM_DATE_COLUMNS + """)
+        """ + DIM_DATE_SELECT.format(schema=self.schema) + """
+            ON CONFLICT (date_key) DO NOTHING;
+        """)
+        
+        added = 0
+        for range_start, range_end in ranges:
+            added += conn.execute(query, {'start_date': range_start, 'end_date': range_end}).rowcount
+        return added
+    
     def load_dim_date(self):
-        """Generate and load date dimension"""
+        """Generate the date dimension for the configured calendar range
+        
+        The range is widened to the first/last order date (an index lookup on
+        staging.orders), and days are only added when they fall outside the
+        existing calendar, so the cost depends on the number of days, not orders.
+        """
         logger.info("Loading dim_date...")
         
-        query = text("""
-            -- Clear existing data
-            TRUNCATE TABLE marts.dim_date CASCADE;
-            
-            -- Generate date dimension from order dates
-            INSERT INTO marts.dim_date (
-                date_key,
-                date,
-                year,
-                quarter,
-                month,
-                month_name,
-                week,
-                day_of_month,
-                day_of_week,
-                day_name,
-                is_weekend,
-                is_holiday
-            )
-            SELECT DISTINCT
-                TO_CHAR(order_date::DATE, 'YYYYMMDD')::INTEGER as date_key,
-                order_date::DATE as date,
-                EXTRACT(YEAR FROM order_date)::INTEGER as year,
-                EXTRACT(QUARTER FROM order_date)::INTEGER as quarter,
-                EXTRACT(MONTH FROM order_date)::INTEGER as month,
-                TRIM(TO_CHAR(order_date, 'Month')) as month_name,
-                EXTRACT(WEEK FROM order_date)::INTEGER as week,
-                EXTRACT(DAY FROM order_date)::INTEGER as day_of_month,
-                EXTRACT(DOW FROM order_date)::INTEGER as day_of_week,
-                TRIM(TO_CHAR(order_date, 'Day')) as day_name,
-                CASE 
-                    WHEN EXTRACT(DOW FROM order_date) IN (0, 6) THEN TRUE 
-                    ELSE FALSE 
-                END as is_weekend,
-                FALSE as is_holiday
-            FROM staging.orders
-            ORDER BY date;
-        """)
+        self.ensure_holidays()
+        
+        start_date = date.fromisoformat(config.DIM_DATE_START)
+        end_date = date.fromisoformat(config.DIM_DATE_END)
         
         with db.get_connection() as conn:
-            result = conn.execute(query)
-            count = db.get_table_count('marts', 'dim_date')
-            logger.info(f"✓ Loaded {count:,} dates to dim_date")
+            first_order, last_order = conn.execute(
+                text("SELECT MIN(order_date)::DATE, MAX(order_date)::DATE FROM staging.orders")
+            ).one()
+            if first_order is not None:
+                start_date = min(start_date, first_order)
+                end_date = max(end_date, last_order)
+            
+            added = self.extend_calendar(conn, start_date, end_date)
+            
+            # Pick up edits to marts.holidays
+            conn.execute(text(f"""
+                UPDATE {self.schema}.dim_date d
+                SET is_holiday = EXISTS (SELECT 1 FROM {self.schema}.holidays h WHERE h.holiday_date = d.date)
+                WHERE d.is_holiday IS DISTINCT FROM EXISTS (
+                    SELECT 1 FROM {self.schema}.holidays h WHERE h.holiday_date = d.date
+                )
+            """))
+            
+            count = db.get_table_count(self.schema, 'dim_date')
+            logger.info(f"✓ Loaded {count:,} dates to dim_date ({added:,} new)")
             return count
     
+    def add_missing_dates(self, conn, order_ids):
+        """Extend dim_date to cover the given orders' dates (incremental path)"""
+        first_order, last_order = conn.execute(
+            text("SELECT MIN(order_date)::DATE, MAX(order_date)::DATE FROM staging.orders "
+                 "WHERE order_id = ANY(:order_ids)"),
+            {'order_ids': list(order_ids)}
+        ).one()
+        if first_order is None:
+            return 0
+        return self.extend_calendar(conn, first_order, last_order)
+    
     def load_all_dimensions(self):
         """Load all dimension tables"""
         print("\n" + "=" * 60)
@@ -163,5 +259,6 @@ class DimensionLoader:
         return results
 
 if __name__ == "__main__":
+    db.use_workload('etl')
     loader = DimensionLoader()
     loader.load_all_dimensions()
\ No newline at end of file
@@ -1,23 +1,152 @@
+from pathlib import Path
+
+import pandas as pd
 from sqlalchemy import text
+from src.transformers.customer_analytics import CustomerAnalyticsLoader
+from src.utils.config import config
 from src.utils.db_connection import db
+from src.utils.hyperloglog import HyperLogLog
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+COMPACT_FACTS_DDL_PATH = Path(__file__).resolve().parents[2] / 'sql' / 'ddl' / '06_create_compact_facts.sql'
+
+# Shared by the full rebuild and the incremental (micro-batch) upserts;
+# {where} narrows the source rows to the affected orders and {schema} is the
+# target mart schema (see FactLoader.__init__)
+FACT_ORDERS_SELECT = """
+    SELECT 
+        o.order_id,
+        COALESCE(dc.customer_key, -1) as customer_key,  -- unknown member (key_lookup.UNKNOWN_KEY)
+        TO_CHAR(o.order_date::DATE, 'YYYYMMDD')::INTEGER as order_date_key,
+        o.order_date,
+        o.status,
+        COALESCE(SUM(oi.quantity), 0) AS total_items,
+        COALESCE(SUM(oi.quantity * oi.unit_price), 0) as total_amount,
+        COALESCE(SUM(oi.quantity * dp.cost), 0) as total_cost,
+        COALESCE(SUM(oi.quantity * oi.unit_price) - SUM(oi.quantity * dp.cost), 0) as profit
+    FROM staging.orders o
+    LEFT JOIN {schema}.dim_customers dc ON o.customer_id = dc.customer_id
+    LEFT JOIN staging.order_items oi ON o.order_id = oi.order_id
+    LEFT JOIN staging.products p ON oi.product_id = p.product_id
+    LEFT JOIN {schema}.dim_products dp ON p.product_id = dp.product_id
+    {where}
+    GROUP BY o.order_id, dc.customer_key, o.order_date, o.status
+"""
+
+FACT_ORDER_ITEMS_SELECT = """
+    SELECT 
+        fo.order_key,
+        COALESCE(dp.product_key, -1) as product_key,  -- unknown member (key_lookup.UNKNOWN_KEY)
+        oi.order_id,
+        oi.product_id,
+        oi.quantity,
+        oi.unit_price,
+        oi.quantity * oi.unit_price as total_price,
+        dp.cost as unit_cost,
+        oi.quantity * dp.cost as total_cost,
+        (oi.quantity * oi.unit_price) - (oi.quantity * dp.cost) as profit
+    FROM staging.order_items oi
+    JOIN {schema}.fact_orders fo ON oi.order_id = fo.order_id
+    LEFT JOIN {schema}.dim_products dp ON oi.product_id = dp.product_id
+    {where}
+"""
+
+AGG_DAILY_SALES_SELECT = """
+    SELECT
+        order_date_key as date_key,
+        order_date::DATE as date,
+        status,
+        COUNT(*) as total_orders,
+        COUNT(DISTINCT NULLIF(customer_key, -1)) as unique_customers,
+        COALESCE(SUM(total_items), 0) as total_items,
+        COALESCE(SUM(total_amount), 0) as revenue,
+        COALESCE(SUM(total_cost), 0) as cost,
+        COALESCE(SUM(profit), 0) as profit,
+        CURRENT_TIMESTAMP as updated_at
+    FROM {schema}.fact_orders
+    {where}
+    GROUP BY order_date_key, order_date::DATE, status
+"""
+
+ORDER_LINES_WIDE_COLUMNS = """
+    order_item_key, order_key, order_id, order_date, order_date_key,
+    year, quarter, month, month_name, week, day_of_week, day_name, is_weekend, is_holiday,
+    status, customer_key, customer_id, customer_name, country, customer_segment,
+    product_key, product_id, product_name, category,
+    quantity, unit_price, total_price, unit_cost, total_cost, profit
+"""
+
+ORDER_LINES_WIDE_SELECT = """
+    SELECT
+        fi.order_item_key, fo.order_key, fo.order_id, fo.order_date, fo.order_date_key,
+        d.year, d.quarter, d.month, d.month_name, d.week, d.day_of_week, d.day_name, d.is_weekend, d.is_holiday,
+        fo.status, fo.customer_key, c.customer_id, c.full_name, c.country, c.customer_segment,
+        fi.product_key, p.product_id, p.product_name, p.category,
+        fi.quantity, fi.unit_price, fi.total_price, fi.unit_cost, fi.total_cost, fi.profit
+    FROM {schema}.fact_order_items fi
+    JOIN {schema}.fact_orders fo ON fi.order_key = fo.order_key
+    LEFT JOIN {schema}.dim_date d ON fo.order_date_key = d.date_key
+    LEFT JOIN {schema}.dim_customers c ON fo.customer_key = c.customer_key
+    LEFT JOIN {schema}.dim_products p ON fi.product_key = p.product_key
+    {where}
+    ORDER BY fo.order_date
+"""
+
+# Integer-cents copies of the facts (sql/ddl/06_create_compact_facts.sql);
+# the DECIMAL(_, 2) measures convert to cents exactly
+FACT_ORDERS_COMPACT_COLUMNS = """
+    order_date, created_at, updated_at, total_amount_cents, total_cost_cents, profit_cents,
+    order_key, order_id, customer_key, order_date_key, total_items, status
+"""
+
+FACT_ORDERS_COMPACT_SELECT = """
+    SELECT
+        order_date, created_at, updated_at,
+        (total_amount * 100)::BIGINT, (total_cost * 100)::BIGINT, (profit * 100)::BIGINT,
+        order_key, order_id, customer_key, order_date_key, total_items, status
+    FROM {schema}.fact_orders
+    {where}
+"""
+
+FACT_ORDER_ITEMS_COMPACT_COLUMNS = """
+    total_price_cents, total_cost_cents, profit_cents,
+    order_item_key, order_key, product_key, order_id, product_id,
+    unit_price_cents, unit_cost_cents, quantity
+"""
+
+FACT_ORDER_ITEMS_COMPACT_SELECT = """
+    SELECT
+        (total_price * 100)::BIGINT, (total_cost * 100)::BIGINT, (profit * 100)::BIGINT,
+        order_item_key, order_key, product_key, order_id, product_id,
+        (unit_price * 100)::INTEGER, (unit_cost * 100)::INTEGER, quantity
+    FROM {schema}.fact_order_items
+    {where}
+"""
+
 class FactLoader:
     """Load fact tables from staging data"""
     
+    def __init__(self, order_lines_wide=None, schema='marts', compact_facts=None):
+        # The denormalised order_lines_wide table is optional (ORDER_LINES_WIDE)
+        self.order_lines_wide = config.ORDER_LINES_WIDE if order_lines_wide is None else order_lines_wide
+        # So are the integer-cents copies of the facts (COMPACT_FACTS)
+        self.compact_facts = config.COMPACT_FACTS if compact_facts is None else compact_facts
+        # Target schema: the live marts, or a shadow schema for a blue/green rebuild
+        self.schema = schema
+    
     def load_fact_orders(self):
         """Transform and load orders fact table"""
         logger.info("Loading fact_orders...")
         
-        query = text("""
+        query = text(f"""
             -- Clear existing data
-            TRUNCATE TABLE marts.fact_orders CASCADE;
+            TRUNCATE TABLE {self.schema}.fact_orders CASCADE;
             
             -- Load orders fact
-            INSERT INTO marts.fact_orders (
+            INSERT INTO {self.schema}.fact_orders (
                 order_id,
                 customer_key,
                 order_date_key,
@@ -28,27 +157,11 @@ class FactLoader:
                 total_cost,
                 profit
             )
-            SELECT 
-                o.order_id,
-                dc.customer_key,
-                TO_CHAR(o.order_date::DATE, 'YYYYMMDD')::INTEGER as order_date_key,
-                o.order_date,
-                o.status,
-                COALESCE(SUM(oi.quantity), 0) AS total_items,
-                COALESCE(SUM(oi.quantity * oi.unit_price), 0) as total_amount,
-                COALESCE(SUM(oi.quantity * dp.cost), 0) as total_cost,
-                COALESCE(SUM(oi.quantity * oi.unit_price) - SUM(oi.quantity * dp.cost), 0) as profit
-            FROM staging.orders o
-            LEFT JOIN marts.dim_customers dc ON o.customer_id = dc.customer_id
-            LEFT JOIN staging.order_items oi ON o.order_id = oi.order_id
-            LEFT JOIN staging.products p ON oi.product_id = p.product_id
-            LEFT JOIN marts.dim_products dp ON p.product_id = dp.product_id
-            GROUP BY o.order_id, dc.customer_key, o.order_date, o.status;
-        """)
+        """ + FACT_ORDERS_SELECT.format(schema=self.schema, where="") + ";")
         
         with db.get_connection() as conn:
             result = conn.execute(query)
-            count = db.get_table_count('marts', 'fact_orders')
+            count = db.get_table_count(self.schema, 'fact_orders')
             logger.info(f"✓ Loaded {count:,} orders to fact_orders")
             return count
     
@@ -56,12 +169,12 @@ class FactLoader:
         """Transform and load order items fact table"""
         logger.info("Loading fact_order_items...")
         
-        query = text("""
+        query = text(f"""
             -- Clear existing data
-            TRUNCATE TABLE marts.fact_order_items CASCADE;
+            TRUNCATE TABLE {self.schema}.fact_order_items CASCADE;
             
             -- Load order items fact
-            INSERT INTO marts.fact_order_items (
+            INSERT INTO {self.schema}.fact_order_items (
                 order_key,
                 product_key,
                 order_id,
@@ -73,28 +186,286 @@ class FactLoader:
                 total_cost,
                 profit
             )
-            SELECT 
-                fo.order_key,
-                dp.product_key,
-                oi.order_id,
-                oi.product_id,
-                oi.quantity,
-                oi.unit_price,
-                oi.quantity * oi.unit_price as total_price,
-                dp.cost as unit_cost,
-                oi.quantity * dp.cost as total_cost,
-                (oi.quantity * oi.unit_price) - (oi.quantity * dp.cost) as profit
-            FROM staging.order_items oi
-            JOIN marts.fact_orders fo ON oi.order_id = fo.order_id
-            JOIN marts.dim_products dp ON oi.product_id = dp.product_id;
-        """)
+        """ + FACT_ORDER_ITEMS_SELECT.format(schema=self.schema, where="") + ";")
         
         with db.get_connection() as conn:
             result = conn.execute(query)
-            count = db.get_table_count('marts', 'fact_order_items')
+            count = db.get_table_count(self.schema, 'fact_order_items')
             logger.info(f"✓ Loaded {count:,} items to fact_order_items")
             return count
     
+    def load_agg_daily_sales(self):
+        """Rebuild the daily sales aggregate from fact_orders"""
+        logger.info("Loading agg_daily_sales...")
+        
+        query = text(f"""
+            -- Clear existing data
+            TRUNCATE TABLE {self.schema}.agg_daily_sales;
+            
+            -- Load daily aggregate
+            INSERT INTO {self.schema}.agg_daily_sales (
+                date_key, date, status, total_orders, unique_customers,
+                total_items, revenue, cost, profit, updated_at
+            )
+        """ + AGG_DAILY_SALES_SELECT.format(schema=self.schema, where="") + ";")
+        
+        with db.get_connection() as conn:
+            conn.execute(query)
+            self.build_customer_sketches(conn)
+            count = db.get_table_count(self.schema, 'agg_daily_sales')
+            logger.info(f"✓ Loaded {count:,} rows to agg_daily_sales")
+            return count
+    
+    def load_order_lines_wide(self):
+        """Rebuild the wide order-line table, written in order_date order"""
+        logger.info("Loading order_lines_wide...")
+        
+        query = text(f"""
+            -- Clear existing data
+            TRUNCATE TABLE {self.schema}.order_lines_wide;
+            
+            -- Load wide order lines (sorted so the BRIN index on order_date stays tight)
+            INSERT INTO {self.schema}.order_lines_wide (""" + ORDER_LINES_WIDE_COLUMNS + """)
+        """ + ORDER_LINES_WIDE_SELECT.format(schema=self.schema, where="") + f""";
+            
+            ANALYZE {self.schema}.order_lines_wide;
+        """)
+        
+        with db.get_connection() as conn:
+            conn.execute(query)
+            count = db.get_table_count(self.schema, 'order_lines_wide')
+            logger.info(f"✓ Loaded {count:,} rows to order_lines_wide")
+            return count
+    
+    def ensure_compact_facts(self):
+        """Create the compact fact tables and their compatibility views if they do not exist yet"""
+        with db.get_connection() as conn:
+            conn.exec_driver_sql(COMPACT_FACTS_DDL_PATH.read_text().replace('marts.', f'{self.schema}.'))
+    
+    def load_compact_facts(self):
+        """Rebuild the integer-cents copies of fact_orders and fact_order_items"""
+        logger.info("Loading compact facts...")
+        self.ensure_compact_facts()
+        
+        query = text(f"""
+            -- Clear existing data
+            TRUNCATE TABLE {self.schema}.fact_orders_compact, {self.schema}.fact_order_items_compact;
+            
+            INSERT INTO {self.schema}.fact_orders_compact (""" + FACT_ORDERS_COMPACT_COLUMNS + """)
+        """ + FACT_ORDERS_COMPACT_SELECT.format(schema=self.schema, where="") + f""";
+            
+            INSERT INTO {self.schema}.fact_order_items_compact (""" + FACT_ORDER_ITEMS_COMPACT_COLUMNS + """)
+        """ + FACT_ORDER_ITEMS_COMPACT_SELECT.format(schema=self.schema, where="") + f""";
+            
+            ANALYZE {self.schema}.fact_orders_compact;
+            ANALYZE {self.schema}.fact_order_items_compact;
+        """)
+        
+        with db.get_connection() as conn:
+            conn.execute(query)
+            results = {
+                table: db.get_table_count(self.schema, table)
+                for table in ('fact_orders_compact', 'fact_order_items_compact')
+            }
+            logger.info(f"✓ Loaded {results['fact_orders_compact']:,} orders and "
+                        f"{results['fact_order_items_compact']:,} items to the compact facts")
+            return results
+    
+    def build_customer_sketches(self, conn, date_keys=None):
+        """Store a HyperLogLog sketch of customer keys on each agg_daily_sales row
+        
+        unique_customers is exact per day but cannot be summed across days;
+        the sketches can be merged for any date window instead.
+        """
+        where = "WHERE customer_key IS NOT NULL AND customer_key <> -1"
+        params = {}
+        if date_keys is not None:
+            where += " AND order_date_key = ANY(%(date_keys)s)"
+            params['date_keys'] = list(date_keys)
+        
+        sketches = {}
+        chunks = pd.read_sql(
+            f"SELECT order_date_key, status, customer_key FROM {self.schema}.fact_orders {where}",
+            conn,
+            params=params,
+            chunksize=500_000
+        )
+        for chunk in chunks:
+            for key, customer_keys in chunk.groupby(['order_date_key', 'status'])['customer_key']:
+                sketches.setdefault(key, HyperLogLog()).add_many(customer_keys.to_numpy())
+        
+        if sketches:
+            conn.execute(
+                text(f"""
+                    UPDATE {self.schema}.agg_daily_sales
+                    SET customer_sketch = :sketch
+                    WHERE date_key = :date_key AND status = :status
+                """),
+                [
+                    {'date_key': int(date_key), 'status': status, 'sketch': sketch.to_bytes()}
+                    for (date_key, status), sketch in sketches.items()
+                ]
+            )
+        return len(sketches)
+    
+    def upsert_fact_orders(self, conn, order_ids):
+        """Insert or update fact_orders for the given orders (incremental path)"""
+        query = text(f"""
+            INSERT INTO {self.schema}.fact_orders (
+                order_id,
+                customer_key,
+                order_date_key,
+                order_date,
+                status,
+                total_items,
+                total_amount,
+                total_cost,
+                profit
+            )
+        """ + FACT_ORDERS_SELECT.format(schema=self.schema, where="WHERE o.order_id = ANY(:order_ids)") + """
+            ON CONFLICT (order_id) DO UPDATE SET
+                customer_key = EXCLUDED.customer_key,
+                order_date_key = EXCLUDED.order_date_key,
+                order_date = EXCLUDED.order_date,
+                status = EXCLUDED.status,
+                total_items = EXCLUDED.total_items,
+                total_amount = EXCLUDED.total_amount,
+                total_cost = EXCLUDED.total_cost,
+                profit = EXCLUDED.profit,
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING order_date_key;
+        """)
+        
+        result = conn.execute(query, {'order_ids': list(order_ids)})
+        return {row[0] for row in result}
+    
+    def upsert_fact_order_items(self, conn, order_ids):
+        """Replace fact_order_items rows for the given orders (incremental path)"""
+        conn.execute(
+            text(f"DELETE FROM {self.schema}.fact_order_items WHERE order_id = ANY(:order_ids)"),
+            {'order_ids': list(order_ids)}
+        )
+        query = text(f"""
+            INSERT INTO {self.schema}.fact_order_items (
+                order_key,
+                product_key,
+                order_id,
+                product_id,
+                quantity,
+                unit_price,
+                total_price,
+                unit_cost,
+                total_cost,
+                profit
+            )
+        """ + FACT_ORDER_ITEMS_SELECT.format(schema=self.schema, where="WHERE oi.order_id = ANY(:order_ids)") + ";")
+        
+        result = conn.execute(query, {'order_ids': list(order_ids)})
+        return result.rowcount
+    
+    def upsert_order_lines_wide(self, conn, order_ids):
+        """Replace order_lines_wide rows for the given orders (incremental path)"""
+        conn.execute(
+            text(f"DELETE FROM {self.schema}.order_lines_wide WHERE order_id = ANY(:order_ids)"),
+            {'order_ids': list(order_ids)}
+        )
+        query = text(f"""
+            INSERT INTO {self.schema}.order_lines_wide (""" + ORDER_LINES_WIDE_COLUMNS + """)
+        """ + ORDER_LINES_WIDE_SELECT.format(schema=self.schema, where="WHERE fo.order_id = ANY(:order_ids)") + ";")
+        
+        result = conn.execute(query, {'order_ids': list(order_ids)})
+        return result.rowcount
+    
+    def upsert_compact_facts(self, conn, order_ids):
+        """Replace the compact fact rows for the given orders (incremental path)"""
+        params = {'order_ids': list(order_ids)}
+        for table, columns, select in (
+            ('fact_orders_compact', FACT_ORDERS_COMPACT_COLUMNS, FACT_ORDERS_COMPACT_SELECT),
+            ('fact_order_items_compact', FACT_ORDER_ITEMS_COMPACT_COLUMNS, FACT_ORDER_ITEMS_COMPACT_SELECT),
+        ):
+            conn.execute(text(f"DELETE FROM {self.schema}.{table} WHERE order_id = ANY(:order_ids)"), params)
+            conn.execute(text(
+                f"INSERT INTO {self.schema}.{table} ({columns}) "
+                + select.format(schema=self.schema, where="WHERE order_id = ANY(:order_ids)")
+            ), params)
+    
+    def fact_partitions(self):
+        """Monthly [start, end) order-date ranges covering staging.orders
+        
+        Each range is loaded by load_fact_slice, so months can run in parallel
+        (one task per month in the Airflow DAG).
+        """
+        with db.get_connection() as conn:
+            rows = conn.execute(text("""
+                SELECT DISTINCT
+                    date_trunc('month', order_date)::DATE AS start_date,
+                    (date_trunc('month', order_date) + INTERVAL '1 month')::DATE AS end_date
+                FROM staging.orders
+                WHERE order_date IS NOT NULL
+                ORDER BY start_date
+            """)).all()
+        return [{'start_date': row.start_date.isoformat(), 'end_date': row.end_date.isoformat()} for row in rows]
+    
+    def load_fact_slice(self, start_date, end_date):
+        """Upsert the facts of orders placed in [start_date, end_date) in one transaction"""
+        conn = db.engine.connect().execution_options(isolation_level="READ COMMITTED")
+        try:
+            with conn.begin():
+                order_ids = conn.execute(
+                    text("SELECT order_id FROM staging.orders "
+                         "WHERE order_date >= :start_date AND order_date < :end_date"),
+                    {'start_date': start_date, 'end_date': end_date}
+                ).scalars().all()
+                items = 0
+                if order_ids:
+                    self.upsert_fact_orders(conn, order_ids)
+                    items = self.upsert_fact_order_items(conn, order_ids)
+                    if self.order_lines_wide:
+                        self.upsert_order_lines_wide(conn, order_ids)
+                    if self.compact_facts:
+                        self.upsert_compact_facts(conn, order_ids)
+        finally:
+            conn.close()
+        
+        logger.info(f"✓ Loaded {len(order_ids):,} orders ({items:,} items) for {start_date} to {end_date}")
+        return len(order_ids)
+    
+    def prune_facts(self):
+        """Delete fact rows whose order is no longer staged (slices only upsert)"""
+        deleted = 0
+        tables = ['fact_order_items', 'fact_orders']
+        if self.order_lines_wide:
+            tables.insert(0, 'order_lines_wide')
+        if self.compact_facts:
+            # Runs once before the slices, so it also creates the compact tables
+            self.ensure_compact_facts()
+            tables[:0] = ['fact_order_items_compact', 'fact_orders_compact']
+        with db.get_connection() as conn:
+            for table in tables:
+                deleted += conn.execute(text(f"""
+                    DELETE FROM {self.schema}.{table} t
+                    WHERE NOT EXISTS (SELECT 1 FROM staging.orders o WHERE o.order_id = t.order_id)
+                """)).rowcount
+        logger.info(f"✓ Pruned {deleted:,} fact rows for orders no longer staged")
+        return deleted
+    
+    def refresh_agg_daily_sales(self, conn, date_keys):
+        """Recompute agg_daily_sales for the given days (incremental path)"""
+        conn.execute(
+            text(f"DELETE FROM {self.schema}.agg_daily_sales WHERE date_key = ANY(:date_keys)"),
+            {'date_keys': list(date_keys)}
+        )
+        query = text(f"""
+            INSERT INTO {self.schema}.agg_daily_sales (
+                date_key, date, status, total_orders, unique_customers,
+                total_items, revenue, cost, profit, updated_at
+            )
+        """ + AGG_DAILY_SALES_SELECT.format(schema=self.schema, where="WHERE order_date_key = ANY(:date_keys)") + ";")
+        
+        result = conn.execute(query, {'date_keys': list(date_keys)})
+        self.build_customer_sketches(conn, date_keys)
+        return result.rowcount
+    
     def load_all_facts(self):
         """Load all fact tables"""
         print("\n" + "=" * 60)
@@ -104,6 +475,12 @@ class FactLoader:
         results = {}
         results['fact_orders'] = self.load_fact_orders()
         results['fact_order_items'] = self.load_fact_order_items()
+        results['agg_daily_sales'] = self.load_agg_daily_sales()
+        if self.order_lines_wide:
+            results['order_lines_wide'] = self.load_order_lines_wide()
+        if self.compact_facts:
+            results.update(self.load_compact_facts())
+        results.update(CustomerAnalyticsLoader(schema=self.schema).load_all())
         
         print("\n" + "=" * 60)
         print("📊 FACT LOAD SUMMARY")
@@ -116,5 +493,6 @@ class FactLoader:
         return results
 
 if __name__ == "__main__":
+    db.use_workload('etl')
     loader = FactLoader()
     loader.load_all_facts()
\ No newline at end of file
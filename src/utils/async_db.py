@@ -0,0 +1,238 @@
+"""
+Asyncio database access layer on an asyncpg connection pool.
+
+Runs alongside the synchronous ``db`` (SQLAlchemy) singleton for read-heavy
+fan-out: many independent queries are awaited concurrently, limited only by
+the pool size (ASYNC_DB_POOL_SIZE), not by the number of threads issuing them.
+
+Coroutine helpers (``fetch``, ``fetch_frame``, ``fetch_frames``, ``copy_frame``,
+``stream``) can be awaited from any event loop; a pool is created per loop on
+first use. Synchronous callers (the Streamlit script, CLI tools) use
+``async_db.run(coro)``, which executes the coroutine on a shared background
+loop, so every thread shares one pool.
+
+Read-only helpers (``fetch_frame``, ``fetch_frames``) take ``read_only=True``
+to run on a read replica (DB_REPLICA_URLS), sharing ``db.replicas``' round-robin
+order and health state; the primary is the fallback.
+
+Pools use the session settings of the process's workload profile
+(``db.workload``, see config.WORKLOAD_PROFILES), are capped at its
+max_concurrency, and record acquire waits in ``db.wait_stats``.
+
+Queries use asyncpg's ``$1, $2, ...`` positional parameters.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import pandas as pd
+
+from src.utils.config import config
+from src.utils.db_connection import REPLICA_LAG_SQL, db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabase:
+    """asyncpg pool manager with query, COPY and streaming-cursor helpers"""
+
+    def __init__(self, url=None, min_size=None, max_size=None, replicas=None, workload=None):
+        self.url = url or config.database_url
+        self.min_size = min_size if min_size is not None else config.ASYNC_DB_POOL_MIN
+        self.max_size = max_size if max_size is not None else config.ASYNC_DB_POOL_SIZE
+        self.replicas = replicas if replicas is not None else db.replicas
+        self.workload = workload  # None: follow db.workload
+        self._pools = {}  # (event loop, url, workload) -> {'pool': asyncpg pool, 'lock': asyncio.Lock}
+        self._pool_info = {}  # asyncpg pool -> (PoolWaitStats, acquire timeout)
+        self._pid = os.getpid()
+        self._loop = None
+        self._loop_pid = None
+        self._lock = threading.Lock()
+        self._loop_lock = threading.Lock()
+
+    async def get_pool(self, url=None):
+        """Connection pool to ``url`` (default: the primary) for the running event loop"""
+        loop = asyncio.get_running_loop()
+        url = url or self.url
+        workload = self.workload or db.workload
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: forget the parent's pools without closing their sockets
+                self._pools = {}
+                self._pool_info = {}
+                self._pid = os.getpid()
+            entry = self._pools.get((loop, url, workload))
+            if entry is None:
+                # Forget pools whose loop has finished (e.g. an earlier asyncio.run)
+                for closed in [key for key in self._pools if key[0].is_closed()]:
+                    self._pool_info.pop(self._pools.pop(closed)['pool'], None)
+                entry = self._pools[(loop, url, workload)] = {'pool': None, 'lock': asyncio.Lock()}
+
+        async with entry['lock']:
+            if entry['pool'] is None:
+                import asyncpg
+
+                read_only = url != self.url
+                server_settings = config.workload_session_settings(workload)
+                if read_only:
+                    server_settings['default_transaction_read_only'] = 'on'
+                max_size = min(self.max_size, config.workload_profile(workload)['max_concurrency'])
+                min_size = min(self.min_size, max_size)
+                try:
+                    entry['pool'] = await asyncpg.create_pool(
+                        url,
+                        min_size=min_size,
+                        max_size=max_size,
+                        command_timeout=config.ASYNC_DB_COMMAND_TIMEOUT,
+                        server_settings=server_settings,
+                    )
+                    self._pool_info[entry['pool']] = (
+                        db.pool_wait_stats(workload, 'async'), config.workload_profile(workload)['pool_timeout']
+                    )
+                    logger.info(f"✓ Async connection pool established: {url.rsplit('@', 1)[-1]}"
+                                f"{' (read replica)' if read_only else ''} [{workload}] "
+                                f"(min_size={min_size}, max_size={max_size})")
+                except Exception as e:
+                    logger.error(f"✗ Failed to create async connection pool: {e}")
+                    raise
+        return entry['pool']
+
+    @asynccontextmanager
+    async def acquire(self, pool):
+        """``pool.acquire()`` that records the wait for a free connection (up to the profile's pool_timeout)"""
+        stats, timeout = self._pool_info.get(pool, (None, None))
+        start = time.perf_counter()
+        try:
+            conn = await pool.acquire(timeout=timeout)
+        except asyncio.TimeoutError:
+            if stats is not None:
+                stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        if stats is not None:
+            stats.record(time.perf_counter() - start)
+        try:
+            yield conn
+        finally:
+            await pool.release(conn)
+
+    async def read_pool(self):
+        """Pool of the next healthy read replica, or of the primary when there is none"""
+        import asyncpg
+
+        unavailable = (OSError, asyncio.TimeoutError, asyncpg.PostgresConnectionError,
+                       asyncpg.CannotConnectNowError, asyncpg.InterfaceError)
+        for url in self.replicas.candidates():
+            try:
+                pool = await self.get_pool(url)
+                if not self.replicas.needs_check(url) or \
+                        self.replicas.record_lag(url, float(await pool.fetchval(REPLICA_LAG_SQL))):
+                    return pool
+            except unavailable as e:
+                self.replicas.mark_down(url, e.__class__.__name__)
+        return await self.get_pool()
+
+    async def fetch(self, sql, *args):
+        """Run a query and return its rows as asyncpg Records"""
+        pool = await self.get_pool()
+        async with self.acquire(pool) as conn:
+            return await conn.fetch(sql, *args)
+
+    async def fetchval(self, sql, *args):
+        """Run a query and return the first column of its first row"""
+        pool = await self.get_pool()
+        async with self.acquire(pool) as conn:
+            return await conn.fetchval(sql, *args)
+
+    async def execute(self, sql, *args):
+        """Run a statement and return its status string"""
+        pool = await self.get_pool()
+        async with self.acquire(pool) as conn:
+            return await conn.execute(sql, *args)
+
+    async def fetch_frame(self, sql, *args, read_only=False):
+        """Run a query and return a DataFrame (columns are kept for empty results)"""
+        pool = await (self.read_pool() if read_only else self.get_pool())
+        async with self.acquire(pool) as conn:
+            statement = await conn.prepare(sql)
+            rows = await statement.fetch(*args)
+            columns = [attribute.name for attribute in statement.get_attributes()]
+        return pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns)
+
+    async def fetch_frames(self, queries, read_only=False):
+        """Run many queries concurrently; returns {key: DataFrame} for a {key: sql} dict
+
+        A plain list of SQL strings is keyed by the SQL itself.
+        """
+        if not isinstance(queries, dict):
+            queries = {sql: sql for sql in queries}
+        frames = await asyncio.gather(
+            *(self.fetch_frame(sql, read_only=read_only) for sql in queries.values())
+        )
+        return dict(zip(queries, frames))
+
+    async def copy_frame(self, table, df):
+        """Bulk-load a DataFrame into ``schema.table`` with binary COPY; returns rows copied"""
+        schema, _, name = table.rpartition('.')
+        records = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        pool = await self.get_pool()
+        async with self.acquire(pool) as conn:
+            await conn.copy_records_to_table(
+                name, schema_name=schema or None, records=records, columns=list(df.columns)
+            )
+        return len(df)
+
+    async def stream(self, sql, *args, batch_size=10_000):
+        """Yield lists of up to ``batch_size`` Records from a server-side cursor"""
+        pool = await self.get_pool()
+        async with self.acquire(pool) as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(sql, *args)
+                while True:
+                    batch = await cursor.fetch(batch_size)
+                    if not batch:
+                        break
+                    yield batch
+
+    async def close(self):
+        """Close the pools of the running loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entries = [self._pools.pop(key) for key in list(self._pools) if key[0] is loop]
+        for entry in entries:
+            if entry['pool'] is not None:
+                self._pool_info.pop(entry['pool'], None)
+                await entry['pool'].close()
+
+    def _background_loop(self):
+        """Shared event loop on a daemon thread (one per process)"""
+        pid = os.getpid()
+        with self._loop_lock:
+            if self._loop is None or self._loop_pid != pid:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="async-db", daemon=True).start()
+                self._loop_pid = pid
+        return self._loop
+
+    def run(self, coro):
+        """Run a coroutine on the shared background loop and wait for its result
+
+        Safe to call from any number of threads: they all share the loop's pool.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._background_loop()).result()
+
+    def shutdown(self):
+        """Close the background loop's pool and stop the loop"""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None and self._loop_pid == os.getpid():
+            asyncio.run_coroutine_threadsafe(self.close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+
+
+# Create singleton instance (the pool itself is created lazily)
+async_db = AsyncDatabase()
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+from sqlalchemy import text
+
+from src.utils.db_connection import db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DDL_PATH = Path(__file__).resolve().parents[2] / "sql" / "ddl" / "04_create_pipeline_runs.sql"
+
+
+def fingerprint_inputs(paths):
+    """Return a SHA-256 fingerprint over the names and contents of the input files"""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class PipelineCheckpoint:
+    """Record completed pipeline stages in etl.pipeline_runs / etl.pipeline_stages"""
+
+    def __init__(self, input_fingerprint):
+        self.input_fingerprint = input_fingerprint
+        self.run_id = None
+        self.completed_stages = set()
+
+    def ensure_tables(self):
+        """Create the checkpoint tables if they do not exist yet"""
+        with db.get_connection() as conn:
+            conn.exec_driver_sql(DDL_PATH.read_text())
+
+    def start(self, resume=False):
+        """Start a new run, or pick up the last unfinished run for the same inputs"""
+        self.ensure_tables()
+
+        with db.get_connection() as conn:
+            if resume:
+                row = conn.execute(
+                    text(
+                        """
+                        SELECT run_id
+                        FROM etl.pipeline_runs
+                        WHERE input_fingerprint = :fingerprint
+                            AND status <> 'completed'
+                        ORDER BY run_id DESC
+                        LIMIT 1
+                    """
+                    ),
+                    {"fingerprint": self.input_fingerprint},
+                ).fetchone()
+
+                if row is not None:
+                    self.run_id = row[0]
+                    stages = conn.execute(
+                        text("SELECT stage FROM etl.pipeline_stages WHERE run_id = :run_id"),
+                        {"run_id": self.run_id},
+                    )
+                    self.completed_stages = {stage for (stage,) in stages}
+                    conn.execute(
+                        text(
+                            "UPDATE etl.pipeline_runs SET status = 'running', error_message = NULL "
+                            "WHERE run_id = :run_id"
+                        ),
+                        {"run_id": self.run_id},
+                    )
+                    logger.info(f"✓ Resuming run {self.run_id} (completed stages: {sorted(self.completed_stages) or 'none'})")
+                    return self.run_id
+
+                logger.info("No unfinished run with matching inputs, starting a new run")
+
+            self.run_id = conn.execute(
+                text("INSERT INTO etl.pipeline_runs (input_fingerprint) VALUES (:fingerprint) RETURNING run_id"),
+                {"fingerprint": self.input_fingerprint},
+            ).scalar()
+
+        logger.info(f"✓ Started run {self.run_id} (inputs {self.input_fingerprint[:12]})")
+        return self.run_id
+
+    def is_complete(self, stage):
+        """Check whether a stage already completed in this run"""
+        return stage in self.completed_stages
+
+    def complete_stage(self, stage, row_counts, duration_seconds):
+        """Record a completed stage with its row counts"""
+        with db.get_connection() as conn:
+            conn.execute(
+                text(
+                    """
+                    INSERT INTO etl.pipeline_stages (
+                        run_id, stage, input_fingerprint, row_counts, duration_seconds
+                    )
+                    VALUES (:run_id, :stage, :fingerprint, CAST(:row_counts AS JSONB), :duration)
+                    ON CONFLICT (run_id, stage) DO UPDATE SET
+                        row_counts = EXCLUDED.row_counts,
+                        duration_seconds = EXCLUDED.duration_seconds,
+                        completed_at = CURRENT_TIMESTAMP
+                """
+                ),
+                {
+                    "run_id": self.run_id,
+                    "stage": stage,
+                    "fingerprint": self.input_fingerprint,
+                    "row_counts": json.dumps(row_counts),
+                    "duration": round(duration_seconds, 3),
+                },
+            )
+        self.completed_stages.add(stage)
+        logger.info(f"✓ Checkpoint: {stage} complete")
+
+    def finish(self, status, error_message=None):
+        """Mark the run as completed or failed"""
+        with db.get_connection() as conn:
+            conn.execute(
+                text(
+                    """
+                    UPDATE etl.pipeline_runs
+                    SET status = :status, finished_at = CURRENT_TIMESTAMP, error_message = :error
+                    WHERE run_id = :run_id
+                """
+                ),
+                {"run_id": self.run_id, "status": status, "error": error_message},
+            )
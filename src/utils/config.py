@@ -4,6 +4,19 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# Session settings a workload profile applies to every connection (GUC names)
+WORKLOAD_SESSION_SETTINGS = ('application_name', 'work_mem', 'statement_timeout', 'max_parallel_workers_per_gather')
+
+
+def _workload_profile(name, **defaults):
+    """Profile settings, each overridable with WORKLOAD_<NAME>_<SETTING> (e.g. WORKLOAD_ETL_WORK_MEM)"""
+    prefix = f"WORKLOAD_{name.upper().replace('-', '_')}_"
+    profile = {key: os.getenv(prefix + key.upper(), str(value)) for key, value in defaults.items()}
+    for key in ('pool_size', 'max_concurrency', 'pool_timeout'):
+        profile[key] = int(profile[key])
+    return profile
+
+
 class Config:
     """Configuration class for database and application settings"""
     
@@ -14,6 +27,90 @@ class Config:
     DB_USER = os.getenv('DB_USER', 'dataeng')
     DB_PASSWORD = os.getenv('DB_PASSWORD', 'dataeng123')
     
+    # Connection Pool
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    
+    # Workload profiles: each has its own pool (pool_size connections kept open,
+    # at most max_concurrency at once, pool_timeout seconds to wait for one) and
+    # session settings. Entry points pick theirs with db.use_workload(); DB_WORKLOAD
+    # is the default. etl's pool follows DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT.
+    DB_WORKLOAD = os.getenv('DB_WORKLOAD', 'etl')
+    WORKLOAD_PROFILES = {
+        # Loads and transforms: room for large hash joins and sorts, no time limit
+        'etl': _workload_profile(
+            'etl', pool_size=DB_POOL_SIZE, max_concurrency=DB_POOL_SIZE + DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT, application_name='ecommerce-etl', work_mem='128MB',
+            statement_timeout='0', max_parallel_workers_per_gather=2,
+        ),
+        # Dashboard panels: many short queries, a runaway query is cancelled
+        'interactive': _workload_profile(
+            'interactive', pool_size=10, max_concurrency=20, pool_timeout=10,
+            application_name='ecommerce-dashboard', work_mem='16MB', statement_timeout='30s',
+            max_parallel_workers_per_gather=1,
+        ),
+        # Reports and exports: few long scans, parallel workers allowed
+        'batch-analytics': _workload_profile(
+            'batch-analytics', pool_size=2, max_concurrency=4, pool_timeout=60,
+            application_name='ecommerce-analytics', work_mem='64MB', statement_timeout='30min',
+            max_parallel_workers_per_gather=4,
+        ),
+    }
+    
+    # Read replicas (comma-separated URLs; read-only queries are routed to them)
+    DB_REPLICA_URLS = [url.strip() for url in os.getenv('DB_REPLICA_URLS', '').split(',') if url.strip()]
+    DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', '30'))
+    DB_REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', '10'))
+    DB_REPLICA_RETRY = float(os.getenv('DB_REPLICA_RETRY', '30'))
+    
+    # Async access layer (asyncpg pool, see src/utils/async_db.py)
+    ASYNC_DB_POOL_MIN = int(os.getenv('ASYNC_DB_POOL_MIN', '1'))
+    ASYNC_DB_POOL_SIZE = int(os.getenv('ASYNC_DB_POOL_SIZE', '10'))
+    ASYNC_DB_COMMAND_TIMEOUT = float(os.getenv('ASYNC_DB_COMMAND_TIMEOUT', '60'))
+    
+    # Query Profiling (opt-in)
+    QUERY_PROFILE = os.getenv('QUERY_PROFILE', 'false').lower() in ('1', 'true', 'yes')
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '500'))
+    EXPLAIN_SLOW_QUERIES = os.getenv('EXPLAIN_SLOW_QUERIES', 'false').lower() in ('1', 'true', 'yes')
+    
+    # Python Profiling (--profile; see src/utils/python_profiler.py)
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    PROFILE_SAMPLE_MS = float(os.getenv('PROFILE_SAMPLE_MS', '10'))
+    
+    # Date Dimension (calendar range; extended automatically to cover all order dates)
+    DIM_DATE_START = os.getenv('DIM_DATE_START', '2020-01-01')
+    DIM_DATE_END = os.getenv('DIM_DATE_END', '2030-12-31')
+    
+    # Denormalised marts.order_lines_wide (built by FactLoader)
+    ORDER_LINES_WIDE = os.getenv('ORDER_LINES_WIDE', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Integer-cents copies of the fact tables (marts.fact_*_compact, built by FactLoader)
+    COMPACT_FACTS = os.getenv('COMPACT_FACTS', 'false').lower() in ('1', 'true', 'yes')
+    
+    # Dashboard result cache (compacted frames, LRU within a byte budget)
+    DASHBOARD_CACHE_MB = float(os.getenv('DASHBOARD_CACHE_MB', '256'))
+    DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '300'))
+    DASHBOARD_TREND_POINTS = int(os.getenv('DASHBOARD_TREND_POINTS', '400'))
+    
+    # Data Quality (default thresholds are fractions of failing rows)
+    DQ_MODE = os.getenv('DQ_MODE', 'sql')
+    DQ_WARN_THRESHOLD = float(os.getenv('DQ_WARN_THRESHOLD', '0'))
+    DQ_FAIL_THRESHOLD = float(os.getenv('DQ_FAIL_THRESHOLD', '0'))
+    
+    def workload_profile(self, name=None):
+        """Settings of a workload profile (default: DB_WORKLOAD)"""
+        name = name or self.DB_WORKLOAD
+        if name not in self.WORKLOAD_PROFILES:
+            raise ValueError(f"Unknown workload profile {name!r}, expected one of {', '.join(self.WORKLOAD_PROFILES)}")
+        return self.WORKLOAD_PROFILES[name]
+    
+    def workload_session_settings(self, name=None):
+        """Session settings (GUC -> value) a workload profile applies to its connections"""
+        profile = self.workload_profile(name)
+        return {setting: profile[setting] for setting in WORKLOAD_SESSION_SETTINGS}
+    
     @property
     def database_url(self):
         """Get database connection URL"""
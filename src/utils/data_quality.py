@@ -0,0 +1,413 @@
+"""
+Data-quality rule engine.
+
+Rules are grouped by table and every table is checked in a single pass:
+
+* mode="sql" (default) pushes all rules for a table down into one SELECT of
+  FILTER aggregates, so each table is scanned exactly once. Rules share that
+  scan, so their timing is the table's scan time.
+* mode="pandas" streams the table in chunks and evaluates each rule as a
+  vectorised pass over every chunk, timing each rule separately. Referenced
+  key sets are loaded once per rule.
+
+Each rule's failure rate is compared with its warn/fail thresholds (fractions
+of rows; hours for freshness rules) and the result is a ValidationReport.
+
+Usage:
+    engine = DataQualityEngine()
+    report = engine.run()
+    report.print_report()
+"""
+
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from src.utils.config import config
+from src.utils.db_connection import db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PASS, WARN, FAIL = 'PASS', 'WARN', 'FAIL'
+
+
+class Rule:
+    """Base class: a check that counts failing rows of one table"""
+
+    kind = 'rule'
+
+    def __init__(self, name=None, warn_threshold=None, fail_threshold=None):
+        self.name = name
+        self.warn_threshold = config.DQ_WARN_THRESHOLD if warn_threshold is None else warn_threshold
+        self.fail_threshold = config.DQ_FAIL_THRESHOLD if fail_threshold is None else fail_threshold
+
+    columns = ()
+
+    def sql_aggregate(self):
+        """Aggregate expression over alias ``t`` returning the number of failing rows"""
+        raise NotImplementedError
+
+    def sql_joins(self, index):
+        return ""
+
+    def start(self):
+        """Reset per-run state before streaming chunks (pandas mode)"""
+        self._failed = 0
+
+    def evaluate_chunk(self, chunk):
+        """Add the failing rows of a chunk (pandas mode)"""
+        raise NotImplementedError
+
+    def finish(self):
+        return self._failed
+
+    def measure(self, failed, total_rows):
+        """Return (observed value, status) for the failing-row count"""
+        rate = failed / total_rows if total_rows else 0.0
+        if rate > self.fail_threshold:
+            return rate, FAIL
+        if rate > self.warn_threshold:
+            return rate, WARN
+        return rate, PASS
+
+
+class NotNull(Rule):
+    kind = 'not_null'
+
+    def __init__(self, column, **kwargs):
+        super().__init__(kwargs.pop('name', None) or f"{column} not null", **kwargs)
+        self.column = column
+        self.columns = (column,)
+
+    def sql_aggregate(self):
+        return f"COUNT(*) FILTER (WHERE t.{self.column} IS NULL)"
+
+    def evaluate_chunk(self, chunk):
+        self._failed += int(chunk[self.column].isna().sum())
+
+
+class Unique(Rule):
+    kind = 'unique'
+
+    def __init__(self, column, **kwargs):
+        super().__init__(kwargs.pop('name', None) or f"{column} unique", **kwargs)
+        self.column = column
+        self.columns = (column,)
+
+    def sql_aggregate(self):
+        # Number of surplus (duplicate) non-null values
+        return f"COUNT(t.{self.column}) - COUNT(DISTINCT t.{self.column})"
+
+    def start(self):
+        super().start()
+        self._values = []
+
+    def evaluate_chunk(self, chunk):
+        self._values.append(chunk[self.column].dropna().to_numpy())
+
+    def finish(self):
+        values = np.concatenate(self._values) if self._values else np.array([])
+        self._values = []
+        return int(len(values) - len(np.unique(values)))
+
+
+class Expression(Rule):
+    """Row-level condition that must hold, e.g. ``price > cost``
+
+    The expression is used verbatim in SQL and in DataFrame.eval, so keep it
+    to column names, literals, arithmetic and comparisons. Rows where it is
+    NULL (unknown) are not counted as failures, as with a CHECK constraint.
+    """
+
+    kind = 'range'
+
+    def __init__(self, expression, columns, **kwargs):
+        super().__init__(kwargs.pop('name', None) or expression, **kwargs)
+        self.expression = expression
+        self.columns = tuple(columns)
+
+    def sql_aggregate(self):
+        pattern = r"\b(" + "|".join(map(re.escape, self.columns)) + r")\b"
+        prefixed = re.sub(pattern, r"t.\1", self.expression)
+        return f"COUNT(*) FILTER (WHERE NOT ({prefixed}))"
+
+    def evaluate_chunk(self, chunk):
+        subset = chunk[list(self.columns)].dropna().astype(float)
+        if len(subset):
+            self._failed += int((~subset.eval(self.expression)).sum())
+
+
+class References(Rule):
+    """Referential integrity: non-null keys must exist in a parent table"""
+
+    kind = 'referential'
+
+    def __init__(self, column, parent_table, parent_column, **kwargs):
+        name = kwargs.pop('name', None) or f"{column} → {parent_table}.{parent_column}"
+        super().__init__(name, **kwargs)
+        self.column = column
+        self.columns = (column,)
+        self.parent_table = parent_table
+        self.parent_column = parent_column
+
+    def sql_joins(self, index):
+        self._alias = f"ref{index}"
+        return (f"LEFT JOIN {self.parent_table} {self._alias} "
+                f"ON t.{self.column} = {self._alias}.{self.parent_column}")
+
+    def sql_aggregate(self):
+        return (f"COUNT(*) FILTER (WHERE t.{self.column} IS NOT NULL "
+                f"AND {self._alias}.{self.parent_column} IS NULL)")
+
+    def start(self):
+        super().start()
+        with db.read_connection(consistent=True) as conn:
+            keys = conn.execute(text(f"SELECT {self.parent_column} FROM {self.parent_table}")).scalars().all()
+        self._keys = np.array(keys)
+
+    def evaluate_chunk(self, chunk):
+        values = chunk[self.column].dropna().to_numpy()
+        self._failed += int((~np.isin(values, self._keys)).sum())
+
+
+class Freshness(Rule):
+    """The newest value of a timestamp column must be recent (thresholds in hours)"""
+
+    kind = 'freshness'
+
+    def __init__(self, column, warn_after_hours=24, fail_after_hours=72, **kwargs):
+        super().__init__(kwargs.pop('name', None) or f"{column} fresher than {fail_after_hours}h",
+                         warn_after_hours, fail_after_hours)
+        self.column = column
+        self.columns = (column,)
+
+    def sql_aggregate(self):
+        return f"EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - MAX(t.{self.column}))) / 3600.0"
+
+    def start(self):
+        super().start()
+        self._latest = None
+
+    def evaluate_chunk(self, chunk):
+        latest = chunk[self.column].max()
+        if pd.notna(latest) and (self._latest is None or latest > self._latest):
+            self._latest = latest
+
+    def finish(self):
+        if self._latest is None:
+            return None
+        return (pd.Timestamp.now() - pd.Timestamp(self._latest)).total_seconds() / 3600.0
+
+    def measure(self, age_hours, total_rows):
+        age_hours = None if age_hours is None else float(age_hours)
+        if age_hours is None or age_hours > self.fail_threshold:
+            return age_hours, FAIL
+        if age_hours > self.warn_threshold:
+            return age_hours, WARN
+        return age_hours, PASS
+
+
+class MinRows(Rule):
+    """The table must contain at least ``min_rows`` rows"""
+
+    kind = 'row_count'
+
+    def __init__(self, min_rows=1, **kwargs):
+        super().__init__(kwargs.pop('name', None) or f"at least {min_rows:,} row(s)", **kwargs)
+        self.min_rows = min_rows
+
+    def sql_aggregate(self):
+        return "COUNT(*)"
+
+    def evaluate_chunk(self, chunk):
+        self._failed += len(chunk)
+
+    def measure(self, rows, total_rows):
+        rows = int(rows)
+        return rows, (FAIL if rows < self.min_rows else PASS)
+
+
+def default_rules(marts='marts'):
+    """Default rule set for the warehouse, with the mart tables read from schema ``marts``"""
+    return {
+        'staging.customers': [MinRows(1), NotNull('customer_id'), Unique('customer_id')],
+        'staging.products': [MinRows(1), NotNull('product_id')],
+        'staging.orders': [MinRows(1), NotNull('order_id'), NotNull('order_date')],
+        'staging.order_items': [MinRows(1), NotNull('order_id'), Expression('quantity > 0', ['quantity'])],
+        f'{marts}.dim_customers': [
+            MinRows(1, name="No customers in dimension"),
+            NotNull('customer_id'),
+            Unique('customer_id'),
+            NotNull('email', warn_threshold=0.0, fail_threshold=0.05),
+        ],
+        f'{marts}.dim_products': [
+            MinRows(1),
+            Unique('product_id'),
+            Expression('price > 0', ['price']),
+            Expression('price > cost', ['price', 'cost'], warn_threshold=0.0, fail_threshold=0.01),
+        ],
+        f'{marts}.dim_date': [MinRows(1), Unique('date')],
+        f'{marts}.fact_orders': [
+            MinRows(1, name="No orders in fact table"),
+            Unique('order_id'),
+            NotNull('customer_key', warn_threshold=0.0, fail_threshold=0.01),
+            References('customer_key', f'{marts}.dim_customers', 'customer_key'),
+            References('order_date_key', f'{marts}.dim_date', 'date_key'),
+            Expression('total_amount >= 0', ['total_amount']),
+            Freshness('updated_at', warn_after_hours=24, fail_after_hours=72),
+        ],
+        f'{marts}.fact_order_items': [
+            MinRows(1),
+            References('order_key', f'{marts}.fact_orders', 'order_key'),
+            References('product_key', f'{marts}.dim_products', 'product_key'),
+            Expression('quantity > 0', ['quantity']),
+            Expression('unit_price > 0', ['unit_price']),
+        ],
+    }
+
+
+# Default rule set for the warehouse, checked by ETLPipeline.validate_data
+DEFAULT_RULES = default_rules()
+
+
+class ValidationReport:
+    """Results of a validation run: one row per rule"""
+
+    def __init__(self, results, table_rows, table_seconds, mode):
+        self.results = results
+        self.table_rows = table_rows
+        self.table_seconds = table_seconds
+        self.mode = mode
+
+    @property
+    def passed(self):
+        return not any(r['status'] == FAIL for r in self.results)
+
+    @property
+    def warnings(self):
+        return [r for r in self.results if r['status'] == WARN]
+
+    @property
+    def failures(self):
+        return [r for r in self.results if r['status'] == FAIL]
+
+    def to_frame(self):
+        return pd.DataFrame(self.results)
+
+    def print_report(self):
+        """Print the per-rule results"""
+        print("\n" + "=" * 96)
+        print(f"🔎 DATA QUALITY REPORT ({self.mode} mode, "
+              f"{sum(self.table_seconds.values()):.2f}s total scan time)")
+        print("=" * 96)
+        for table, rows in self.table_rows.items():
+            print(f"   {table} — {rows:,} rows scanned in {self.table_seconds[table]:.3f}s")
+            for r in (r for r in self.results if r['table'] == table):
+                icon = {PASS: '✓', WARN: '⚠️ ', FAIL: '✗'}[r['status']]
+                value = r['value']
+                if value is None:
+                    observed = '-'
+                elif r['kind'] == 'row_count':
+                    observed = f"{value:,} rows"
+                elif r['kind'] == 'freshness':
+                    observed = f"{value:,.1f}h old"
+                else:
+                    observed = f"{value:.2%}"
+                seconds = 'batched' if r['seconds'] is None else f"{r['seconds']:.3f}s"
+                print(f"      {icon} {r['status']:4} {r['rule'][:48]:48} {observed:>12} {seconds:>9}")
+        print("=" * 96)
+        print(f"   {len(self.failures)} failed, {len(self.warnings)} warnings, "
+              f"{len(self.results) - len(self.failures) - len(self.warnings)} passed")
+        print("=" * 96 + "\n")
+
+
+class DataQualityEngine:
+    """Run the data-quality rules, one pass per table"""
+
+    def __init__(self, rules=None, mode='sql', chunksize=100_000, max_workers=4):
+        if mode not in ('sql', 'pandas'):
+            raise ValueError(f"mode must be 'sql' or 'pandas', got {mode!r}")
+        self.rules = DEFAULT_RULES if rules is None else rules
+        self.mode = mode
+        self.chunksize = chunksize
+        self.max_workers = max_workers
+
+    def check_table_sql(self, table, rules):
+        """Evaluate all rules of a table in one SELECT"""
+        joins = "\n".join(rule.sql_joins(i) for i, rule in enumerate(rules))
+        aggregates = ",\n".join(f"{rule.sql_aggregate()} AS r{i}" for i, rule in enumerate(rules))
+        query = text(f"SELECT COUNT(*) AS total_rows,\n{aggregates}\nFROM {table} t\n{joins}")
+
+        start = time.perf_counter()
+        with db.read_connection(consistent=True) as conn:
+            row = conn.execute(query).mappings().one()
+        seconds = time.perf_counter() - start
+
+        total_rows = row['total_rows']
+        observed = [row[f"r{i}"] for i in range(len(rules))]
+        return total_rows, seconds, [(rule, value, None) for rule, value in zip(rules, observed)]
+
+    def check_table_pandas(self, table, rules):
+        """Stream the table in chunks and evaluate each rule vectorised per chunk"""
+        columns = sorted({column for rule in rules for column in rule.columns})
+        select = ", ".join(columns) if columns else "1 AS one"
+        timings = {id(rule): 0.0 for rule in rules}
+
+        start = time.perf_counter()
+        for rule in rules:
+            rule_start = time.perf_counter()
+            rule.start()
+            timings[id(rule)] += time.perf_counter() - rule_start
+
+        total_rows = 0
+        with db.read_connection(consistent=True) as conn:
+            for chunk in pd.read_sql(f"SELECT {select} FROM {table}", conn, chunksize=self.chunksize):
+                total_rows += len(chunk)
+                for rule in rules:
+                    rule_start = time.perf_counter()
+                    rule.evaluate_chunk(chunk)
+                    timings[id(rule)] += time.perf_counter() - rule_start
+
+        results = []
+        for rule in rules:
+            rule_start = time.perf_counter()
+            observed = rule.finish()
+            timings[id(rule)] += time.perf_counter() - rule_start
+            results.append((rule, observed, timings[id(rule)]))
+        return total_rows, time.perf_counter() - start, results
+
+    def check_table(self, table):
+        rules = self.rules[table]
+        if self.mode == 'sql':
+            return self.check_table_sql(table, rules)
+        return self.check_table_pandas(table, rules)
+
+    def run(self):
+        """Check every table (tables in parallel) and return a ValidationReport"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            outcomes = dict(zip(self.rules, executor.map(self.check_table, self.rules)))
+
+        results = []
+        table_rows = {}
+        table_seconds = {}
+        for table, (total_rows, seconds, rule_results) in outcomes.items():
+            table_rows[table] = total_rows
+            table_seconds[table] = seconds
+            for rule, observed, rule_seconds in rule_results:
+                value, status = rule.measure(observed, total_rows)
+                results.append({
+                    'table': table,
+                    'rule': rule.name,
+                    'kind': rule.kind,
+                    'observed': observed,
+                    'value': value,
+                    'status': status,
+                    'seconds': rule_seconds,
+                })
+        return ValidationReport(results, table_rows, table_seconds, self.mode)
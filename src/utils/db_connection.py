@@ -1,32 +1,315 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from collections import deque
 from contextlib import contextmanager
 from src.utils.config import config
+import itertools
 import logging
+import os
+import threading
+import time
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Replication lag of a standby in seconds (0 when fully replayed or not a standby)
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+# Whether a standby has replayed the primary's WAL up to a given LSN
+REPLICA_CAUGHT_UP_SQL = "SELECT pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn) IS NOT FALSE"
+
+
+def _display_url(url):
+    """host:port/dbname of a database URL (no credentials, for logs)"""
+    return url.rsplit('@', 1)[-1]
+
+
+def _libpq_options(settings):
+    """libpq ``options`` string setting each GUC for the session (spaces escaped)"""
+    return ' '.join(f"-c {name}=" + str(value).replace(' ', '\\ ') for name, value in settings.items())
+
+
+class ReplicaSet:
+    """Round-robin choice among read replicas with health state
+
+    A replica that fails to connect or lags more than DB_REPLICA_MAX_LAG is
+    skipped for DB_REPLICA_RETRY seconds. Lag is re-checked at most every
+    DB_REPLICA_CHECK_INTERVAL seconds per replica.
+    """
+
+    def __init__(self, urls=(), max_lag=None, check_interval=None, retry=None):
+        self.urls = list(urls)
+        self.max_lag = max_lag if max_lag is not None else config.DB_REPLICA_MAX_LAG
+        self.check_interval = check_interval if check_interval is not None else config.DB_REPLICA_CHECK_INTERVAL
+        self.retry = retry if retry is not None else config.DB_REPLICA_RETRY
+        self._turn = itertools.count()
+        self._down_until = {}
+        self._checked_at = {}
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.urls)
+
+    def candidates(self):
+        """Healthy replicas, starting from the next one in round-robin order"""
+        if not self.urls:
+            return []
+        start = next(self._turn) % len(self.urls)
+        now = time.monotonic()
+        ordered = self.urls[start:] + self.urls[:start]
+        return [url for url in ordered if self._down_until.get(url, 0) <= now]
+
+    def needs_check(self, url):
+        """Whether the replica's lag is due for a re-check"""
+        return time.monotonic() - self._checked_at.get(url, float('-inf')) >= self.check_interval
+
+    def record_lag(self, url, lag):
+        """Store a lag check; returns False (and marks the replica down) when it lags too far"""
+        with self._lock:
+            self._checked_at[url] = time.monotonic()
+        if lag > self.max_lag:
+            self.mark_down(url, f"replication lag {lag:.1f}s > {self.max_lag:g}s")
+            return False
+        return True
+
+    def mark_down(self, url, reason):
+        """Skip a replica for ``retry`` seconds"""
+        with self._lock:
+            self._down_until[url] = time.monotonic() + self.retry
+            self._checked_at.pop(url, None)
+        logger.warning(f"⚠️  Read replica {_display_url(url)} unavailable ({reason}), "
+                       f"retrying in {self.retry:g}s")
+
+
+class PoolWaitStats:
+    """Time spent waiting for a pooled connection, for one workload profile and pool"""
+
+    def __init__(self, workload, pool, max_samples=10_000):
+        self.workload = workload
+        self.pool = pool
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._recent = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, timed_out=False):
+        """Record one checkout (or one that gave up after the pool timeout)"""
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self._recent.append(seconds)
+
+    def summary(self):
+        """Checkouts, timeouts and wait times in ms (percentiles over the recent checkouts)"""
+        with self._lock:
+            recent = sorted(self._recent)
+            attempts = self.checkouts + self.timeouts
+
+        def percentile(q):
+            return 1000 * recent[min(len(recent) - 1, int(q * len(recent)))] if recent else 0.0
+
+        return {
+            'workload': self.workload,
+            'pool': self.pool,
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'wait_seconds': self.total_seconds,
+            'avg_ms': 1000 * self.total_seconds / attempts if attempts else 0.0,
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': 1000 * self.max_seconds,
+        }
+
+
+_timed_queue_pool_class = None
+
+
+def _timed_queue_pool():
+    """QueuePool that records how long each checkout waits (built on first use: imports SQLAlchemy)"""
+    global _timed_queue_pool_class
+    if _timed_queue_pool_class is None:
+        from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+        from sqlalchemy.pool import QueuePool
+
+        class TimedQueuePool(QueuePool):
+            wait_stats = None
+
+            def connect(self):
+                start = time.perf_counter()
+                try:
+                    conn = super().connect()
+                except PoolTimeoutError:
+                    if self.wait_stats is not None:
+                        self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+                    raise
+                if self.wait_stats is not None:
+                    self.wait_stats.record(time.perf_counter() - start)
+                return conn
+
+            def recreate(self):
+                # dispose() replaces the pool (e.g. after a fork); keep recording to the same stats
+                pool = super().recreate()
+                pool.wait_stats = self.wait_stats
+                return pool
+
+        _timed_queue_pool_class = TimedQueuePool
+    return _timed_queue_pool_class
+
+
 class DatabaseConnection:
-    """Database connection manager using SQLAlchemy"""
+    """Database connection manager using SQLAlchemy
+
+    The engine is created lazily on first use, so importing this module (and
+    the ``db`` singleton) does not import SQLAlchemy or open a pool. The engine
+    is also per-process: after a fork the inherited pool is discarded without
+    closing the parent's connections, which makes ``db`` safe to use from
+    multiprocessing workers.
+
+    With read replicas configured (DB_REPLICA_URLS), ``read_connection`` routes
+    read-only work to them round-robin; everything else uses the primary.
+
+    Connections follow a workload profile (config.WORKLOAD_PROFILES, selected
+    with ``use_workload``): each profile has its own engine, pool limits and
+    session settings, and its pool waits are recorded in ``wait_stats``.
+    """
+
+    def __init__(self, url=None, replica_urls=None, workload=None):
+        """Initialize database connection settings"""
+        self.url = url or config.database_url
+        self.replicas = ReplicaSet(config.DB_REPLICA_URLS if replica_urls is None else replica_urls)
+        self.workload = workload or config.DB_WORKLOAD
+        self.wait_stats = {}  # (workload, pool) -> PoolWaitStats
+        self._engine = None  # engine of the selected workload
+        self._engines = {}  # workload -> engine
+        self._replica_engines = {}  # (workload, url) -> engine
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def use_workload(self, name):
+        """Use a workload profile's pool and session settings for this process's connections"""
+        config.workload_profile(name)  # unknown profiles raise ValueError
+        with self._lock:
+            self.workload = name
+            self._engine = self._engines.get(name)
+            self._session = None
+
+    def pool_wait_stats(self, workload, pool):
+        """Wait statistics of a workload's pool ('sync', 'replica' or 'async')"""
+        key = (workload, pool)
+        stats = self.wait_stats.get(key)
+        if stats is None:
+            stats = self.wait_stats.setdefault(key, PoolWaitStats(workload, pool))
+        return stats
 
-    def __init__(self):
-        """Initialize database connection"""
+    def wait_report(self):
+        """Connection wait summary per workload profile and pool"""
+        return [stats.summary() for _, stats in sorted(self.wait_stats.items())]
+
+    def _create_engine(self, url=None, read_only=False):
+        """Create the SQLAlchemy engine with the selected workload profile's pool and session settings"""
+        from sqlalchemy import create_engine
+        from sqlalchemy.engine import make_url
+
+        url = url or self.url
+        workload = self.workload
+        profile = config.workload_profile(workload)
+        settings = config.workload_session_settings(workload)
+        if read_only:
+            settings['default_transaction_read_only'] = 'on'
+        # Session settings travel as libpq startup options (PostgreSQL only; tests use SQLite)
+        connect_args = {'options': _libpq_options(settings)} if make_url(url).get_backend_name() == 'postgresql' else {}
+        pool_size = min(profile['pool_size'], profile['max_concurrency'])
         try:
             # ✅ Enable autocommit to avoid idle transactions and lock waits
-            self.engine = create_engine(
-                config.database_url,
+            engine = create_engine(
+                url,
+                poolclass=_timed_queue_pool(),
                 pool_pre_ping=True,
+                pool_size=pool_size,
+                max_overflow=profile['max_concurrency'] - pool_size,
+                pool_timeout=profile['pool_timeout'],
+                pool_recycle=config.DB_POOL_RECYCLE,
                 echo=False,
-                isolation_level="AUTOCOMMIT"
+                isolation_level="AUTOCOMMIT",
+                connect_args=connect_args
             )
-            self.Session = sessionmaker(bind=self.engine)
-            logger.info(f"✓ Database connection established: {config.DB_NAME}")
+            engine.pool.wait_stats = self.pool_wait_stats(workload, 'replica' if read_only else 'sync')
+            if read_only:
+                logger.info(f"✓ Read replica engine created: {_display_url(url)} [{workload}]")
+            else:
+                logger.info(f"✓ Database connection established: {config.DB_NAME} [{workload}] "
+                            f"(pool_size={pool_size}, max_concurrency={profile['max_concurrency']}, "
+                            f"work_mem={profile['work_mem']}, statement_timeout={profile['statement_timeout']})")
+            return engine
         except Exception as e:
             logger.error(f"✗ Failed to connect to database: {e}")
             raise
 
+    def _check_fork(self):
+        """Discard the pools inherited from the parent when running in a forked child"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid is not None and self._pid != pid:
+                # Forked child: drop the parent's pooled connections without
+                # closing them, the parent still owns those sockets
+                for engine in self._engines.values():
+                    engine.dispose(close=False)
+                for replica_engine in self._replica_engines.values():
+                    replica_engine.dispose(close=False)
+                self._replica_engines = {}
+                self._session = None
+                logger.info(f"✓ Reset connection pool in child process {pid}")
+            self._pid = pid
+
+    @property
+    def engine(self):
+        """SQLAlchemy engine for the current process, created on first use"""
+        self._check_fork()
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._engines.get(self.workload)
+                    if self._engine is None:
+                        self._engine = self._engines[self.workload] = self._create_engine()
+        return self._engine
+
+    @property
+    def Session(self):
+        """Session factory bound to the engine"""
+        if self._session is None:
+            from sqlalchemy.orm import sessionmaker
+            self._session = sessionmaker(bind=self.engine)
+        return self._session
+
+    def replica_engine(self, url):
+        """Read-only engine for a replica URL, created on first use"""
+        self._check_fork()
+        key = (self.workload, url)
+        with self._lock:
+            if key not in self._replica_engines:
+                self._replica_engines[key] = self._create_engine(url, read_only=True)
+            return self._replica_engines[key]
+
+    def dispose(self):
+        """Close all pooled connections (the engines are recreated on next use)"""
+        for engine in self._engines.values():
+            engine.dispose()
+        for replica_engine in self._replica_engines.values():
+            replica_engine.dispose()
+
     @contextmanager
     def get_connection(self):
         """Context manager for database connections (autocommit mode)"""
@@ -41,8 +324,60 @@ class DatabaseConnection:
         finally:
             conn.close()
 
+    def _connect_replica(self, min_lsn=None):
+        """Connection to the next healthy replica (caught up to min_lsn), or None"""
+        from sqlalchemy import text
+
+        for url in self.replicas.candidates():
+            conn = None
+            try:
+                conn = self.replica_engine(url).connect().execution_options(isolation_level="AUTOCOMMIT")
+                if min_lsn is not None:
+                    if conn.execute(text(REPLICA_CAUGHT_UP_SQL), {'lsn': min_lsn}).scalar():
+                        return conn
+                    # Behind the primary: try the next replica (not a health problem)
+                elif not self.replicas.needs_check(url) or \
+                        self.replicas.record_lag(url, float(conn.execute(text(REPLICA_LAG_SQL)).scalar())):
+                    return conn
+                conn.close()
+            except Exception as e:
+                if conn is not None:
+                    conn.close()
+                self.replicas.mark_down(url, e.__class__.__name__)
+        return None
+
+    @contextmanager
+    def read_connection(self, consistent=False):
+        """Context manager for read-only work, routed to a read replica when available
+
+        Replicas are used round-robin; unhealthy or lagging ones are skipped and
+        the primary is the fallback. With ``consistent=True`` only a replica that
+        has replayed everything committed on the primary so far is used
+        (read-your-writes, e.g. validation right after a load).
+        """
+        from sqlalchemy import text
+
+        conn = None
+        if self.replicas:
+            min_lsn = None
+            if consistent:
+                with self.get_connection() as primary:
+                    min_lsn = primary.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+            conn = self._connect_replica(min_lsn)
+        if conn is None:
+            conn = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            yield conn
+        except Exception as e:
+            logger.error(f"Database error: {e}")
+            raise
+        finally:
+            conn.close()
+
     def test_connection(self):
         """Test database connection"""
+        from sqlalchemy import text
+
         try:
             with self.get_connection() as conn:
                 result = conn.execute(text("SELECT version();"))
@@ -56,6 +391,8 @@ class DatabaseConnection:
 
     def get_table_count(self, schema, table):
         """Get row count for a table"""
+        from sqlalchemy import text
+
         try:
             with self.get_connection() as conn:
                 result = conn.execute(text(f"SELECT COUNT(*) FROM {schema}.{table}"))
@@ -65,7 +402,7 @@ class DatabaseConnection:
             logger.error(f"Error getting count for {schema}.{table}: {e}")
             return 0
 
-# Create singleton instance
+# Create singleton instance (the engine itself is created lazily)
 db = DatabaseConnection()
 
 # Test connection when module is imported
@@ -0,0 +1,56 @@
+"""
+Largest-Triangle-Three-Buckets (LTTB) downsampling for line charts.
+
+LTTB keeps the first and last points and, for each of ``threshold - 2``
+equal-sized buckets in between, the point that forms the largest triangle
+with the point kept from the previous bucket and the average of the next
+bucket. Peaks and troughs survive, so a chart of a few hundred points looks
+like the full series.
+"""
+
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """Return the positions of the points LTTB keeps (all of them if len <= threshold)"""
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    kept = np.empty(threshold, dtype='int64')
+    kept[0], kept[-1] = 0, n - 1
+    # Bucket boundaries for the points between the first and the last
+    edges = np.linspace(1, n - 1, threshold - 1).astype('int64')
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        kept[i + 1] = previous
+    return kept
+
+
+def lttb(df, x, y, threshold):
+    """Downsample a DataFrame to ``threshold`` rows, picking points by column ``y``
+
+    Other columns are taken from the same rows. ``x`` may be numeric or datetime.
+    """
+    if threshold is None or len(df) <= threshold:
+        return df
+    xs = df[x]
+    if np.issubdtype(xs.dtype, np.datetime64):
+        xs = xs.astype('int64')
+    return df.iloc[lttb_indices(xs, df[y], threshold)]
@@ -0,0 +1,164 @@
+"""
+Constant-memory export of query results.
+
+CSV is written by PostgreSQL itself with ``COPY (query) TO STDOUT`` and
+streamed straight into the destination file. Parquet is written in row
+groups from a server-side cursor, fetching ``batch_size`` rows at a time.
+Neither path holds more than one batch of the result in memory. Both read
+through ``db.read_connection()``, so exports run on a read replica when one is
+configured and healthy, and on the primary otherwise.
+
+Parquet column types come from the cursor description: numeric columns
+with a declared precision/scale become decimals, unconstrained numerics
+(e.g. SUM/AVG results) become float64, and unknown types are written as text.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+
+from src.utils.db_connection import db
+
+FORMATS = ("csv", "parquet")
+
+
+class _CountingWriter:
+    """Binary file wrapper that counts the bytes written through it"""
+
+    def __init__(self, file):
+        self.file = file
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return self.file.write(data)
+
+
+def _open_destination(destination):
+    """Return (binary file, should_close) for a path or '-' (stdout)"""
+    if destination == "-":
+        return sys.stdout.buffer, False
+    Path(destination).parent.mkdir(parents=True, exist_ok=True)
+    return open(destination, "wb"), True
+
+
+def infer_format(destination, fmt=None):
+    """Pick the export format from --format or the file extension (CSV for stdout)"""
+    if fmt:
+        return fmt
+    if destination != "-" and Path(destination).suffix.lower() in (".parquet", ".pq"):
+        return "parquet"
+    return "csv"
+
+
+def export_csv(sql, destination="-"):
+    """Stream a query result as CSV (with header) via COPY; returns (rows, bytes)"""
+    query = sql.strip().rstrip(";")
+    file, should_close = _open_destination(destination)
+    writer = _CountingWriter(file)
+    try:
+        with db.read_connection() as conn:
+            cursor = conn.connection.cursor()
+            try:
+                cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", writer)
+                rows = cursor.rowcount
+            finally:
+                cursor.close()
+    finally:
+        if should_close:
+            file.close()
+        else:
+            file.flush()
+    return rows, writer.bytes_written
+
+
+def _arrow_type(column):
+    """Map a psycopg2 cursor description entry to a pyarrow type"""
+    import pyarrow as pa
+
+    types = {
+        16: pa.bool_(),
+        20: pa.int64(),
+        21: pa.int16(),
+        23: pa.int32(),
+        700: pa.float32(),
+        701: pa.float64(),
+        1082: pa.date32(),
+        1114: pa.timestamp("us"),
+        1184: pa.timestamp("us", tz="UTC"),
+    }
+    if column.type_code == 1700:  # numeric
+        if column.precision and column.precision <= 38 and column.scale is not None:
+            return pa.decimal128(column.precision, column.scale)
+        return pa.float64()
+    return types.get(column.type_code, pa.string())
+
+
+def _to_arrow_column(values, arrow_type):
+    import pyarrow as pa
+
+    if pa.types.is_floating(arrow_type):
+        values = [None if v is None else float(v) for v in values]
+    elif pa.types.is_string(arrow_type):
+        values = [None if v is None else str(v) for v in values]
+    return pa.array(values, type=arrow_type)
+
+
+def export_parquet(sql, destination, batch_size=50_000):
+    """Stream a query result into a Parquet file, one row group per batch; returns (rows, bytes)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if destination == "-":
+        raise ValueError("Parquet exports need a file destination")
+    Path(destination).parent.mkdir(parents=True, exist_ok=True)
+
+    rows = 0
+    writer = None
+    try:
+        with db.read_connection() as conn:
+            # Server-side cursors need a transaction
+            conn = conn.execution_options(
+                isolation_level="READ COMMITTED", stream_results=True, max_row_buffer=batch_size
+            )
+            with conn.begin():
+                result = conn.execute(text(sql))
+                description = result.cursor.description
+                schema = pa.schema([(column.name, _arrow_type(column)) for column in description])
+                writer = pq.ParquetWriter(destination, schema)
+
+                for batch in result.partitions(batch_size):
+                    columns = list(zip(*batch))
+                    arrays = [_to_arrow_column(values, field.type) for values, field in zip(columns, schema)]
+                    writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                    rows += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows, Path(destination).stat().st_size
+
+
+def export_query(sql, destination="-", fmt=None, batch_size=50_000):
+    """Export a query result and return rows, bytes, seconds and throughput"""
+    fmt = infer_format(destination, fmt)
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}, got {fmt!r}")
+
+    start = time.perf_counter()
+    if fmt == "csv":
+        rows, size = export_csv(sql, destination)
+    else:
+        rows, size = export_parquet(sql, destination, batch_size)
+    seconds = time.perf_counter() - start
+
+    return {
+        "format": fmt,
+        "destination": destination,
+        "rows": rows,
+        "bytes": size,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0.0,
+        "mb_per_second": size / 1e6 / seconds if seconds else 0.0,
+    }
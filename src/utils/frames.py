@@ -0,0 +1,155 @@
+"""
+Compact result frames and a byte-budgeted LRU cache for them.
+
+pd.read_sql returns object columns for strings, dates and DECIMAL values (one
+Python object per cell). compact_frame converts them at fetch time: DECIMAL
+columns become float64, dates datetime64, integers are downcast, repetitive
+strings become categoricals and the rest Arrow-backed strings. FrameCache
+keeps compacted frames up to a total byte budget, evicting the least recently
+used entries first.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from src.loaders.schemas import STRING_DTYPE
+
+
+def frame_memory(df):
+    """Deep memory usage of a DataFrame in bytes"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _compact_object_column(col, category_ratio, category_min_rows):
+    values = col.dropna()
+    if values.empty:
+        return col
+    sample = values.iloc[0]
+
+    if isinstance(sample, Decimal):
+        return col.astype('float64')
+    if isinstance(sample, bool):
+        return col.astype('boolean')
+    if isinstance(sample, str):
+        if len(values) >= category_min_rows and values.nunique() <= category_ratio * len(values):
+            return col.astype('category')
+        return col.astype(STRING_DTYPE)
+    if isinstance(sample, date):
+        return pd.to_datetime(col)
+    return col
+
+
+def compact_frame(df, category_ratio=0.5, category_min_rows=100):
+    """Return a copy of ``df`` with compact dtypes
+
+    String columns with at least ``category_min_rows`` values, of which at most
+    ``category_ratio`` are distinct, become categoricals (small aggregates stay
+    plain strings, where categories would save nothing). Floats are only downcast to float32 when every
+    value survives the round trip, so money columns keep their cents.
+    """
+    result = {}
+    for name, col in df.items():
+        if col.dtype == object:
+            col = _compact_object_column(col, category_ratio, category_min_rows)
+
+        if pd.api.types.is_integer_dtype(col.dtype) and not pd.api.types.is_extension_array_dtype(col.dtype):
+            col = pd.to_numeric(col, downcast='integer')
+        elif pd.api.types.is_float_dtype(col.dtype) and col.dtype != np.float32:
+            narrow = col.astype(np.float32)
+            if np.array_equal(narrow.astype(np.float64).to_numpy(), col.to_numpy(), equal_nan=True):
+                col = narrow
+        result[name] = col
+    return pd.DataFrame(result, index=df.index)
+
+
+class FrameCache:
+    """Thread-safe LRU cache of DataFrames with a total byte budget and TTL"""
+
+    def __init__(self, max_bytes, ttl=300):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self):
+        return sum(entry['bytes'] for entry in self.entries.values())
+
+    def get(self, key):
+        """Return the cached frame (marking it recently used) or None"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry['created_at'] > self.ttl:
+                del self.entries[key]
+                return None
+            entry['hits'] += 1
+            self.entries.move_to_end(key)
+            return entry['frame']
+
+    def put(self, key, frame, raw_bytes=None):
+        """Store a frame, evicting least recently used entries to stay within budget"""
+        size = frame_memory(frame)
+        with self._lock:
+            self.entries.pop(key, None)
+            if size > self.max_bytes:
+                return frame  # larger than the whole budget: serve it uncached
+            while self.entries and self.total_bytes + size > self.max_bytes:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            self.entries[key] = {
+                'frame': frame,
+                'bytes': size,
+                'raw_bytes': raw_bytes if raw_bytes is not None else size,
+                'rows': len(frame),
+                'hits': 0,
+                'created_at': time.time(),
+            }
+        return frame
+
+    def get_or_load(self, key, load):
+        """Return the cached frame for ``key``, loading and compacting it on a miss"""
+        frame = self.get(key)
+        if frame is None:
+            raw = load()
+            frame = self.put(key, compact_frame(raw), raw_bytes=frame_memory(raw))
+        # Shallow copy: callers may add or replace columns without touching the cache
+        return frame.copy(deep=False)
+
+    def get_or_load_many(self, keys, load_many):
+        """Like get_or_load for several keys; ``load_many(missing_keys)`` returns {key: frame}
+
+        Lets callers fetch every miss in one concurrent round trip.
+        """
+        frames = {key: self.get(key) for key in keys}
+        missing = [key for key, frame in frames.items() if frame is None]
+        if missing:
+            for key, raw in load_many(missing).items():
+                frames[key] = self.put(key, compact_frame(raw), raw_bytes=frame_memory(raw))
+        return {key: frame.copy(deep=False) for key, frame in frames.items()}
+
+    def report(self):
+        """Per-entry memory accounting, most recently used first"""
+        with self._lock:
+            now = time.time()
+            rows = [
+                {
+                    'entry': ' '.join(str(key).split())[:80],
+                    'rows': entry['rows'],
+                    'bytes': entry['bytes'],
+                    'raw_bytes': entry['raw_bytes'],
+                    'saved_pct': 100.0 * (1 - entry['bytes'] / entry['raw_bytes']) if entry['raw_bytes'] else 0.0,
+                    'hits': entry['hits'],
+                    'age_seconds': round(now - entry['created_at'], 1),
+                }
+                for key, entry in reversed(self.entries.items())
+            ]
+        return pd.DataFrame(rows, columns=['entry', 'rows', 'bytes', 'raw_bytes', 'saved_pct', 'hits', 'age_seconds'])
@@ -1,3 +1,4 @@
+import argparse
 import pandas as pd
 import numpy as np
 from faker import Faker
@@ -5,6 +6,8 @@ from datetime import datetime, timedelta
 import random
 import os
 
+from src.utils.python_profiler import add_profile_arguments, profile_python, python_profiler
+
 # Set seeds for reproducibility
 fake = Faker()
 Faker.seed(42)
@@ -134,15 +137,24 @@ def generate_order_items(orders_df=None, products_df=None):
 
 def main():
     """Generate all sample data"""
+    parser = argparse.ArgumentParser(description="Generate the sample e-commerce CSV files")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    
     print("\n" + "=" * 60)
     print("🚀 GENERATING SAMPLE E-COMMERCE DATA")
     print("=" * 60 + "\n")
     
     # Generate data
-    customers = generate_customers(1000)
-    products = generate_products(200)
-    orders = generate_orders(5000, customers)
-    order_items = generate_order_items(orders, products)
+    with profile_python('generator', args.profile, args.profile_dir, args.profile_memory):
+        with python_profiler.stage('generate_customers'):
+            customers = generate_customers(1000)
+        with python_profiler.stage('generate_products'):
+            products = generate_products(200)
+        with python_profiler.stage('generate_orders'):
+            orders = generate_orders(5000, customers)
+        with python_profiler.stage('generate_order_items'):
+            order_items = generate_order_items(orders, products)
     
     # Print summary
     print("\n" + "=" * 60)
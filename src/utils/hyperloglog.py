@@ -0,0 +1,108 @@
+"""
+Vectorised HyperLogLog sketch for approximate distinct counts.
+
+A sketch with precision p keeps m = 2**p one-byte registers. The relative
+standard error of the estimate is 1.04 / sqrt(m), i.e. about 0.81% for the
+default p=14; roughly 95% of estimates fall within two standard errors
+(±1.6%) and 99.7% within three (±2.4%). Sketches of the same precision
+merge losslessly (register-wise max), so a window's distinct count is the
+estimate of the union of its daily sketches. Serialised sketches are
+zlib-compressed, so sparse daily sketches stay small.
+"""
+
+import zlib
+
+import numpy as np
+
+DEFAULT_PRECISION = 14
+
+
+def _hash64(values):
+    """SplitMix64 finaliser: a fast, well-mixed 64-bit hash of integer ids"""
+    x = np.asarray(values, dtype=np.uint64).copy()
+    with np.errstate(over='ignore'):
+        x += np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x = x ^ (x >> np.uint64(31))
+    return x
+
+
+class HyperLogLog:
+    """HyperLogLog sketch over integer ids"""
+
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"precision must be between 4 and 16, got {precision}")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8) if registers is None else registers
+
+    @property
+    def relative_error(self):
+        """Relative standard error of the estimate"""
+        return 1.04 / np.sqrt(self.m)
+
+    def add_many(self, values):
+        """Add a batch of integer ids"""
+        values = np.asarray(values)
+        if values.size == 0:
+            return self
+
+        hashes = _hash64(values)
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        remaining = hashes & np.uint64((1 << (64 - p)) - 1)
+
+        # Position of the leftmost 1-bit in the remaining 64-p bits. remaining
+        # has at most 60 significant bits here and frexp's exponent is its bit
+        # length, which is exact for values below 2**53 (p >= 11) and off by at
+        # most one for the rare largest values otherwise.
+        _, bit_length = np.frexp(remaining.astype(np.float64))
+        rho = ((64 - p) - bit_length + 1).astype(np.uint8)
+
+        np.maximum.at(self.registers, index, rho)
+        return self
+
+    def merge(self, other):
+        """Merge another sketch into this one (union)"""
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        """Estimated number of distinct ids"""
+        m = self.m
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            return float(m * np.log(m / zeros))
+        return float(raw)
+
+    def to_bytes(self):
+        """Serialise as precision byte + compressed registers"""
+        return bytes([self.precision]) + zlib.compress(self.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Load a sketch written by to_bytes"""
+        data = bytes(data)
+        precision = data[0]
+        registers = np.frombuffer(zlib.decompress(data[1:]), dtype=np.uint8).copy()
+        return cls(precision, registers)
+
+    @classmethod
+    def union(cls, sketches, precision=DEFAULT_PRECISION):
+        """Merge serialised or in-memory sketches into one"""
+        result = cls(precision)
+        for sketch in sketches:
+            if sketch is None:
+                continue
+            if not isinstance(sketch, HyperLogLog):
+                sketch = cls.from_bytes(sketch)
+            result.merge(sketch)
+        return result
@@ -0,0 +1,281 @@
+"""
+Sales KPIs for a trailing date window.
+
+The default path reads marts.agg_daily_sales: orders, revenue and profit are
+summed from the daily rows (each order belongs to exactly one day, so the
+order count is exact), and unique customers come from the union of the daily
+HyperLogLog sketches, with a relative standard error of about 0.8% (see
+src/utils/hyperloglog.py). exact=True runs COUNT(DISTINCT ...) over
+marts.fact_orders instead, for audits.
+
+revenue_trend also reads the daily aggregates, rolled up server-side into
+day, week or month buckets depending on the window length, so a trend over
+all history returns a few hundred rows rather than one per day.
+
+panel_queries holds the SQL of the dashboard's chart and table panels, shared
+by the Streamlit app and the dashboard load test (src/benchmarks/dashboard_load.py).
+"""
+
+from decimal import Decimal
+
+from src.utils.config import config
+
+# (longest window in days, bucket) - the first match wins
+TREND_BUCKETS = [(92, 'day'), (730, 'week'), (None, 'month')]
+
+# Dashboard "Time Period" choices -> trailing window in days
+TIME_PERIODS = {
+    "Last 7 Days": 7,
+    "Last 30 Days": 30,
+    "Last 90 Days": 90,
+    "All Time": 9999,
+}
+
+EXACT_SALES_OVERVIEW = """
+    SELECT
+        COUNT(DISTINCT order_id) as total_orders,
+        COUNT(DISTINCT NULLIF(customer_key, -1)) as unique_customers,
+        COALESCE(SUM(total_amount), 0) as revenue,
+        COALESCE(SUM(profit), 0) as profit,
+        COALESCE(AVG(total_amount), 0) as avg_order_value
+    FROM marts.fact_orders
+    WHERE order_date >= CURRENT_DATE - :days * INTERVAL '1 day'
+        AND status = :status
+"""
+
+DAILY_SALES_WINDOW = """
+    SELECT total_orders, revenue, profit, customer_sketch
+    FROM marts.agg_daily_sales
+    WHERE date >= CURRENT_DATE - :days * INTERVAL '1 day'
+        AND status = :status
+"""
+
+# Buckets start at the later of the window start and the first day with sales,
+# so "all time" windows do not produce years of empty buckets
+REVENUE_TREND = """
+    WITH bounds AS (
+        SELECT GREATEST(CURRENT_DATE - :days, MIN(date)) AS start_date
+        FROM marts.agg_daily_sales
+        WHERE status = :status
+    ),
+    buckets AS (
+        SELECT generate_series(
+            date_trunc(:bucket, b.start_date),
+            date_trunc(:bucket, CURRENT_DATE),
+            CAST('1 ' || :bucket AS INTERVAL)
+        )::DATE AS bucket, b.start_date
+        FROM bounds b
+    )
+    SELECT
+        bk.bucket AS date,
+        COALESCE(SUM(a.revenue), 0) AS revenue,
+        COALESCE(SUM(a.profit), 0) AS profit,
+        COALESCE(SUM(a.total_orders), 0) AS orders
+    FROM buckets bk
+    LEFT JOIN marts.agg_daily_sales a
+        ON a.status = :status
+        AND a.date >= GREATEST(bk.bucket, bk.start_date)
+        AND a.date < bk.bucket + CAST('1 ' || :bucket AS INTERVAL)
+        AND a.date <= CURRENT_DATE
+    GROUP BY bk.bucket
+    ORDER BY bk.bucket
+"""
+
+
+def trend_bucket(days):
+    """Pick the day/week/month bucket for a trailing window of ``days`` days"""
+    for max_days, bucket in TREND_BUCKETS:
+        if max_days is None or days <= max_days:
+            return bucket
+
+
+def revenue_trend(conn, days, status='completed', bucket=None, max_points=None):
+    """Return (bucketed revenue/profit/orders frame, bucket) for the last ``days`` days
+
+    With ``max_points`` the series is further reduced with LTTB (keyed on
+    revenue), so the rows returned never exceed it.
+    """
+    bucket = bucket or trend_bucket(days)
+    if bucket not in {b for _, b in TREND_BUCKETS}:
+        raise ValueError(f"bucket must be day, week or month, got {bucket!r}")
+
+    # pandas/NumPy are only needed here; importing this module stays cheap
+    import pandas as pd
+    from sqlalchemy import text
+
+    from src.utils.downsample import lttb
+
+    trend = pd.read_sql(
+        text(REVENUE_TREND), conn, params={'days': days, 'status': status, 'bucket': bucket},
+        parse_dates=['date'],
+    )
+    for column in ('revenue', 'profit'):
+        trend[column] = trend[column].astype('float64')
+    trend['orders'] = trend['orders'].astype('int64')
+    return lttb(trend, 'date', 'revenue', max_points).reset_index(drop=True), bucket
+
+
+def sales_overview(conn, days, status='completed', exact=False):
+    """Return order, customer, revenue and profit KPIs for the last ``days`` days"""
+    # Imported here so importing this module (e.g. run_analytics --help) stays cheap
+    from sqlalchemy import text
+
+    from src.utils.hyperloglog import HyperLogLog
+
+    params = {'days': days, 'status': status}
+
+    if exact:
+        row = conn.execute(text(EXACT_SALES_OVERVIEW), params).mappings().one()
+        return {
+            'total_orders': int(row['total_orders']),
+            'unique_customers': int(row['unique_customers']),
+            'revenue': float(row['revenue']),
+            'profit': float(row['profit']),
+            'avg_order_value': float(row['avg_order_value']),
+            'exact': True,
+            'unique_customers_error': 0.0,
+        }
+
+    total_orders = 0
+    revenue = Decimal(0)
+    profit = Decimal(0)
+    sketch = HyperLogLog()
+    for row in conn.execute(text(DAILY_SALES_WINDOW), params):
+        total_orders += row.total_orders
+        revenue += row.revenue
+        profit += row.profit
+        if row.customer_sketch is not None:
+            sketch.merge(HyperLogLog.from_bytes(row.customer_sketch))
+
+    return {
+        'total_orders': total_orders,
+        'unique_customers': int(round(sketch.estimate())),
+        'revenue': float(revenue),
+        'profit': float(profit),
+        'avg_order_value': float(revenue / total_orders) if total_orders else 0.0,
+        'exact': False,
+        'unique_customers_error': sketch.relative_error,
+    }
+
+
+def panel_queries(days):
+    """SQL for every chart/table panel, keyed by panel name"""
+    # Single-table scans of order_lines_wide when it is built, star joins otherwise
+    return {
+        'products': f"""
+            SELECT 
+                product_name,
+                category,
+                COALESCE(SUM(total_price), 0) as revenue,
+                SUM(quantity) as units_sold
+            FROM marts.order_lines_wide
+            WHERE order_date >= CURRENT_DATE - INTERVAL '{days} days'
+                AND status = 'completed'
+            GROUP BY product_key, product_name, category
+            ORDER BY revenue DESC
+            LIMIT 10
+        """ if config.ORDER_LINES_WIDE else f"""
+            SELECT 
+                p.product_name,
+                p.category,
+                COALESCE(SUM(fi.total_price), 0) as revenue,
+                SUM(fi.quantity) as units_sold
+            FROM marts.dim_products p
+            JOIN marts.fact_order_items fi ON p.product_key = fi.product_key
+            JOIN marts.fact_orders fo ON fi.order_key = fo.order_key
+            WHERE fo.order_date >= CURRENT_DATE - INTERVAL '{days} days'
+                AND fo.status = 'completed'
+            GROUP BY p.product_key, p.product_name, p.category
+            ORDER BY revenue DESC
+            LIMIT 10
+        """,
+        'category': f"""
+            SELECT 
+                category,
+                COALESCE(SUM(total_price), 0) as revenue,
+                COUNT(DISTINCT order_key) as orders
+            FROM marts.order_lines_wide
+            WHERE order_date >= CURRENT_DATE - INTERVAL '{days} days'
+                AND status = 'completed'
+            GROUP BY category
+            ORDER BY revenue DESC
+        """ if config.ORDER_LINES_WIDE else f"""
+            SELECT 
+                p.category,
+                COALESCE(SUM(fi.total_price), 0) as revenue,
+                COUNT(DISTINCT fi.order_key) as orders
+            FROM marts.dim_products p
+            JOIN marts.fact_order_items fi ON p.product_key = fi.product_key
+            JOIN marts.fact_orders fo ON fi.order_key = fo.order_key
+            WHERE fo.order_date >= CURRENT_DATE - INTERVAL '{days} days'
+                AND fo.status = 'completed'
+            GROUP BY p.category
+            ORDER BY revenue DESC
+        """,
+        'segments': f"""
+            SELECT 
+                c.customer_segment,
+                COUNT(DISTINCT c.customer_key) as customers,
+                COALESCE(SUM(f.total_amount), 0) as revenue
+            FROM marts.dim_customers c
+            LEFT JOIN marts.fact_orders f ON c.customer_key = f.customer_key
+            WHERE f.order_date >= CURRENT_DATE - INTERVAL '{days} days'
+                AND f.status = 'completed'
+            GROUP BY c.customer_segment
+            ORDER BY revenue DESC
+        """,
+        'country': f"""
+            SELECT 
+                country,
+                COALESCE(SUM(total_price), 0) as revenue
+            FROM marts.order_lines_wide
+            WHERE order_date >= CURRENT_DATE - INTERVAL '{days} days'
+                AND status = 'completed'
+            GROUP BY country
+            ORDER BY revenue DESC
+            LIMIT 10
+        """ if config.ORDER_LINES_WIDE else f"""
+            SELECT 
+                c.country,
+                COALESCE(SUM(f.total_amount), 0) as revenue
+            FROM marts.dim_customers c
+            JOIN marts.fact_orders f ON c.customer_key = f.customer_key
+            WHERE f.order_date >= CURRENT_DATE - INTERVAL '{days} days'
+                AND f.status = 'completed'
+            GROUP BY c.country
+            ORDER BY revenue DESC
+            LIMIT 10
+        """,
+        'rfm': """
+            SELECT 
+                rfm_segment,
+                COUNT(*) as customers,
+                COALESCE(SUM(monetary), 0) as revenue,
+                ROUND(AVG(recency_days)) as avg_recency_days
+            FROM marts.customer_rfm
+            GROUP BY rfm_segment
+            ORDER BY revenue DESC
+        """,
+        'cohort': """
+            SELECT cohort_month, months_since, retention_rate
+            FROM marts.cohort_retention
+            WHERE cohort_month >= (SELECT MAX(cohort_month) FROM marts.cohort_retention) - INTERVAL '11 months'
+            ORDER BY cohort_month, months_since
+        """,
+        'orders': f"""
+            SELECT 
+                fo.order_id,
+                dc.full_name as customer,
+                dc.country,
+                fo.order_date,
+                fo.status,
+                fo.total_items,
+                fo.total_amount,
+                fo.profit
+            FROM marts.fact_orders fo
+            JOIN marts.dim_customers dc ON fo.customer_key = dc.customer_key
+            WHERE fo.order_date >= CURRENT_DATE - INTERVAL '{days} days'
+            ORDER BY fo.order_date DESC
+            LIMIT 100
+        """,
+    }
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Synthetic Order Firehose
+Emits new orders and order items continuously at a target rate (rows per
+second, orders + items) to drive the ingestion and transform path under a
+sustained arrival rate:
+
+* ``--sink raw`` writes a rotating orders_*.csv / order_items_*.csv pair into
+  the stream_ingest inbox every tick (under a '.' name, renamed when complete)
+  and pauses while the ingestor's back-pressure marker exists.
+* ``--sink staging`` COPYs the rows straight into staging.orders / order_items.
+
+Orders reference existing staging customers and items existing staging
+products at their list price; ids continue after the highest staged (and
+pending inbox) ids.
+
+Rate profiles (multiplier applied to --rate at elapsed time t):
+    constant  1
+    burst     --burst-factor for the first sixth of every --period, 1 otherwise
+    ramp      1, 2, 3, ... one step per --period (finds the maximum sustainable rate)
+    wave      1 + 0.5 * sin(2πt / --period)
+
+Usage:
+    python -m src.utils.order_firehose --rate 500 --duration 60
+    python -m src.utils.order_firehose --rate 200 --profile ramp --period 30
+    python -m src.utils.order_firehose --sink staging --rate 5000 --profile burst
+"""
+
+import argparse
+import logging
+import math
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from src.loaders.csv_to_postgres import copy_frame
+from src.utils.db_connection import db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Same status mix as generate_sample_data
+STATUSES = ['completed', 'cancelled', 'pending', 'shipped']
+STATUS_WEIGHTS = [0.80, 0.10, 0.05, 0.05]
+
+# Must match MicroBatchIngestor.BACKPRESSURE_MARKER (not imported to keep startup light)
+BACKPRESSURE_MARKER = '.backpressure'
+
+PROFILES = ['constant', 'burst', 'ramp', 'wave']
+
+
+def rate_multiplier(profile, elapsed, period=60.0, burst_factor=5.0):
+    """Multiplier applied to the base rate ``elapsed`` seconds into the run"""
+    if profile == 'constant':
+        return 1.0
+    if profile == 'burst':
+        return burst_factor if elapsed % period < period / 6 else 1.0
+    if profile == 'ramp':
+        return float(1 + int(elapsed // period))
+    if profile == 'wave':
+        return 1.0 + 0.5 * math.sin(2 * math.pi * elapsed / period)
+    raise ValueError(f"Unknown rate profile: {profile!r} (expected one of {PROFILES})")
+
+
+class OrderFirehose:
+    """Generate orders for existing customers/products and emit them at a target row rate"""
+
+    def __init__(
+        self,
+        customer_ids,
+        products,
+        next_order_id=1,
+        next_item_id=1,
+        sink='raw',
+        inbox='data/raw',
+        rate=500.0,
+        profile='constant',
+        period=60.0,
+        burst_factor=5.0,
+        tick=1.0,
+        report_interval=10.0,
+        seed=None,
+    ):
+        if sink not in ('raw', 'staging'):
+            raise ValueError(f"Unknown sink: {sink!r} (expected 'raw' or 'staging')")
+        rate_multiplier(profile, 0.0)  # validate the profile name up front
+        if not len(customer_ids) or not len(products):
+            raise ValueError("The firehose needs staged customers and products to reference")
+
+        self.customer_ids = np.asarray(customer_ids, dtype=np.int64)
+        products = pd.DataFrame(products, columns=['product_id', 'price'])
+        self.product_ids = products['product_id'].to_numpy(dtype=np.int64)
+        self.prices = products['price'].to_numpy(dtype=float)
+        self.next_order_id = next_order_id
+        self.next_item_id = next_item_id
+        self.sink = sink
+        self.inbox = Path(inbox)
+        self.rate = rate
+        self.profile = profile
+        self.period = period
+        self.burst_factor = burst_factor
+        self.tick = tick
+        self.report_interval = report_interval
+        self.rng = np.random.default_rng(seed)
+
+        self.orders = 0
+        self.items = 0
+        self.files = 0
+        self.target_rows = 0.0
+        self.paused_seconds = 0.0
+        self.elapsed = 0.0
+
+        if sink == 'raw':
+            self.inbox.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def rows(self):
+        return self.orders + self.items
+
+    @staticmethod
+    def _max_pending_id(inbox, pattern, column):
+        """Highest id in files still waiting in the inbox (not yet in staging)"""
+        highest = 0
+        for path in Path(inbox).glob(pattern):
+            if pattern.startswith('orders') and path.name.startswith('order_items'):
+                continue
+            ids = pd.read_csv(path, usecols=[column])[column]
+            if len(ids):
+                highest = max(highest, int(ids.max()))
+        return highest
+
+    @classmethod
+    def from_staging(cls, sink='raw', inbox='data/raw', **kwargs):
+        """Build a firehose over the staged customers/products, continuing after the highest ids"""
+        with db.get_connection() as conn:
+            customer_ids = conn.execute(text("SELECT customer_id FROM staging.customers")).scalars().all()
+            products = conn.execute(text("SELECT product_id, price FROM staging.products")).all()
+            max_order_id, max_item_id = conn.execute(text("""
+                SELECT (SELECT COALESCE(MAX(order_id), 0) FROM staging.orders),
+                       (SELECT COALESCE(MAX(order_item_id), 0) FROM staging.order_items)
+            """)).one()
+
+        if sink == 'raw' and Path(inbox).is_dir():
+            max_order_id = max(max_order_id, cls._max_pending_id(inbox, 'orders*.csv', 'order_id'))
+            max_item_id = max(max_item_id, cls._max_pending_id(inbox, 'order_items*.csv', 'order_item_id'))
+
+        logger.info(f"✓ Firehose references {len(customer_ids):,} customers and {len(products):,} products; "
+                    f"new orders start at order_id {max_order_id + 1:,}")
+        return cls(
+            customer_ids, [(row.product_id, float(row.price)) for row in products],
+            next_order_id=max_order_id + 1, next_item_id=max_item_id + 1,
+            sink=sink, inbox=inbox, **kwargs
+        )
+
+    def current_rate(self, elapsed):
+        """Target rows per second at ``elapsed`` seconds into the run"""
+        return self.rate * rate_multiplier(self.profile, elapsed, self.period, self.burst_factor)
+
+    def generate(self, n_orders, order_date=None):
+        """A batch of new orders and their items (1-5 distinct products per order)"""
+        order_ids = np.arange(self.next_order_id, self.next_order_id + n_orders, dtype=np.int64)
+        self.next_order_id += n_orders
+
+        orders = pd.DataFrame({
+            'order_id': order_ids,
+            'customer_id': self.rng.choice(self.customer_ids, n_orders),
+            'order_date': pd.Timestamp(order_date or datetime.now()).floor('s'),
+            'status': self.rng.choice(STATUSES, n_orders, p=STATUS_WEIGHTS),
+        })
+
+        # Draw 1-5 products per order; a product drawn twice for an order is kept once
+        counts = self.rng.integers(1, 6, n_orders)
+        picks = self.rng.integers(0, len(self.product_ids), int(counts.sum()))
+        items = pd.DataFrame({
+            'order_id': np.repeat(order_ids, counts),
+            'product_id': self.product_ids[picks],
+            'quantity': self.rng.integers(1, 6, len(picks)),
+            'unit_price': self.prices[picks],
+        }).drop_duplicates(['order_id', 'product_id'], ignore_index=True)
+        items.insert(0, 'order_item_id', np.arange(self.next_item_id, self.next_item_id + len(items)))
+        self.next_item_id += len(items)
+        return orders, items
+
+    def backpressure(self):
+        """True while the ingestor asks producers to pause"""
+        return self.sink == 'raw' and (self.inbox / BACKPRESSURE_MARKER).exists()
+
+    def write_files(self, orders, items):
+        """Write one orders / order_items file pair into the inbox, each renamed into place when complete"""
+        stamp = f"{datetime.now():%Y%m%d_%H%M%S}_{int(orders['order_id'].iloc[0])}"
+        # Orders first, so an ingestor scan never sees items ahead of their order
+        for table, df in (('orders', orders), ('order_items', items)):
+            path = self.inbox / f"{table}_{stamp}.csv"
+            temp_path = self.inbox / f".{path.name}.tmp"
+            df.to_csv(temp_path, index=False)
+            temp_path.rename(path)
+            self.files += 1
+
+    def write_staging(self, orders, items):
+        """COPY the batch into the staging tables in one transaction"""
+        conn = db.engine.connect().execution_options(isolation_level="READ COMMITTED")
+        try:
+            with conn.begin():
+                copy_frame(conn, 'staging.orders', orders)
+                copy_frame(conn, 'staging.order_items', items)
+        finally:
+            conn.close()
+
+    def emit(self, rows):
+        """Generate and write about ``rows`` rows (whole orders); returns the rows written"""
+        # Rows per order observed so far (1 order + ~3 items before any are written)
+        rows_per_order = self.rows / self.orders if self.orders else 4.0
+        orders, items = self.generate(max(1, round(rows / rows_per_order)))
+        if self.sink == 'raw':
+            self.write_files(orders, items)
+        else:
+            self.write_staging(orders, items)
+        self.orders += len(orders)
+        self.items += len(items)
+        return len(orders) + len(items)
+
+    def run(self, duration=None, max_rows=None):
+        """Emit at the target rate until ``duration`` seconds / ``max_rows`` rows or Ctrl-C"""
+        print("\n" + "=" * 60)
+        print(f"🚰 ORDER FIREHOSE → {self.inbox if self.sink == 'raw' else 'staging (COPY)'}")
+        print(f"   {self.rate:,.0f} rows/s, {self.profile} profile")
+        print("=" * 60 + "\n")
+
+        start = last = time.monotonic()
+        window = (start, 0, 0.0)  # (time, rows, target rows) at the last report
+        owed = 0.0
+        try:
+            while True:
+                now = time.monotonic()
+                self.elapsed = now - start
+
+                if self.backpressure():
+                    # Paused time is not owed: resume at the target rate instead of bursting
+                    self.paused_seconds += now - last
+                    owed = 0.0
+                else:
+                    # Rate at the middle of the interval since the last tick
+                    due = self.current_rate((last + now) / 2 - start) * (now - last)
+                    self.target_rows += due
+                    owed += due
+                    if owed >= 1:
+                        owed -= self.emit(owed)
+                last = now
+
+                if now - window[0] >= self.report_interval:
+                    seconds = now - window[0]
+                    logger.info(
+                        f"t={self.elapsed:6.0f}s | target {(self.target_rows - window[2]) / seconds:8,.0f} rows/s | "
+                        f"achieved {(self.rows - window[1]) / seconds:8,.0f} rows/s | "
+                        f"{self.orders:,} orders, {self.items:,} items"
+                        + (f" | paused {self.paused_seconds:.0f}s (back-pressure)" if self.paused_seconds else "")
+                    )
+                    window = (now, self.rows, self.target_rows)
+
+                if duration is not None and self.elapsed >= duration:
+                    break
+                if max_rows is not None and self.rows >= max_rows:
+                    break
+                time.sleep(max(0.0, self.tick - (time.monotonic() - now)))
+        except KeyboardInterrupt:
+            logger.info("Stopping firehose...")
+        finally:
+            end = time.monotonic()
+            if not self.backpressure():
+                # Target for the time spent in the last (possibly long) write
+                self.target_rows += self.current_rate((last + end) / 2 - start) * (end - last)
+            self.elapsed = end - start
+            self.print_summary()
+
+    def print_summary(self):
+        """Print the achieved rate against the target"""
+        achieved = self.rows / self.elapsed if self.elapsed else 0.0
+        target = self.target_rows / self.elapsed if self.elapsed else 0.0
+        print("\n" + "=" * 60)
+        print("📊 ORDER FIREHOSE SUMMARY")
+        print("=" * 60)
+        print(f"   Duration:         {self.elapsed:>10.1f}s")
+        print(f"   Orders:           {self.orders:>10,}")
+        print(f"   Order items:      {self.items:>10,}")
+        if self.sink == 'raw':
+            print(f"   Files written:    {self.files:>10,}")
+        print(f"   Target rate:      {target:>10,.0f} rows/s")
+        print(f"   Achieved rate:    {achieved:>10,.0f} rows/s"
+              + (f" ({achieved / target:.0%} of target)" if target else ""))
+        if self.paused_seconds:
+            print(f"   Back-pressure:    {self.paused_seconds:>10.1f}s paused")
+        print("=" * 60 + "\n")
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Emit synthetic orders at a target rate for throughput testing")
+    parser.add_argument('--rate', type=float, default=500.0, help="Base target rate in rows/s (orders + items)")
+    parser.add_argument('--profile', choices=PROFILES, default='constant', help="How the rate varies over time")
+    parser.add_argument('--period', type=float, default=60.0, help="Seconds per burst cycle / ramp step / wave")
+    parser.add_argument('--burst-factor', type=float, default=5.0, help="Rate multiplier during a burst")
+    parser.add_argument('--sink', choices=['raw', 'staging'], default='raw',
+                        help="Rotating files in the ingest inbox, or COPY straight into staging")
+    parser.add_argument('--inbox', default='data/raw', help="Inbox directory for --sink raw")
+    parser.add_argument('--tick', type=float, default=1.0, help="Seconds between writes (one file pair per tick)")
+    parser.add_argument('--duration', type=float, help="Stop after this many seconds (default: run until Ctrl-C)")
+    parser.add_argument('--max-rows', type=int, help="Stop once this many rows are written (the last batch completes)")
+    parser.add_argument('--report-interval', type=float, default=10.0, help="Seconds between rate reports")
+    parser.add_argument('--seed', type=int, help="Random seed")
+    args = parser.parse_args()
+
+    db.use_workload('etl')
+    firehose = OrderFirehose.from_staging(
+        sink=args.sink,
+        inbox=args.inbox,
+        rate=args.rate,
+        profile=args.profile,
+        period=args.period,
+        burst_factor=args.burst_factor,
+        tick=args.tick,
+        report_interval=args.report_interval,
+        seed=args.seed,
+    )
+    firehose.run(duration=args.duration, max_rows=args.max_rows)
+
+
+if __name__ == "__main__":
+    main()
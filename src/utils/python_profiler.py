@@ -0,0 +1,407 @@
+"""
+Opt-in Python profiling for pipeline runs.
+
+The counterpart of the SQL profiler (query_profiler) for the Python side of a
+run: pandas parsing in CSVLoader, DataFrame marshalling, loops in
+generate_sample_data. Work is attributed to stages opened with
+``python_profiler.stage(name)`` (a no-op unless profiling is enabled).
+
+* A sampling thread records the Python stack of every thread that is inside a
+  stage (plus the main thread) every few milliseconds. Samples are wall-clock,
+  so time blocked on the database shows up too. It also tracks each stage's
+  peak RSS. At the default 10 ms interval the overhead is within run-to-run
+  noise, so it can stay on for production-sized runs.
+* mode="cprofile" also runs cProfile for the outermost stage on each thread:
+  exact call counts and cumulative times, at about 2.5x the runtime of
+  Python-heavy code.
+* trace_memory=True adds tracemalloc allocation sites. The sampler takes a heap
+  snapshot whenever a stage's traced memory has grown by a quarter, so the
+  reported sites are those held near the stage's peak. tracemalloc slows
+  allocation-heavy Python (row loops, object columns) by up to 5x, so it is
+  opt-in. Stages that overlap in time share one heap.
+
+Each run writes to <output_dir>/<name>_<timestamp>/:
+    stacks.collapsed   every sample as "stage;frame;...;frame count" (flamegraph.pl, speedscope)
+    <stage>.collapsed  the samples of one stage
+    <stage>.prof       cProfile dump of one stage (mode="cprofile"; pstats, snakeviz)
+    report.txt         the per-stage report printed at the end
+
+Usage:
+    from src.utils.python_profiler import profile_python, python_profiler
+
+    with profile_python("pipeline", mode="sample", trace_memory=False):
+        with python_profiler.stage("extract_load"):
+            ...
+"""
+
+import io
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODES = ['sample', 'cprofile']
+
+# Snapshot the heap when a stage's traced memory grows by this factor (at most once per second)
+SNAPSHOT_GROWTH = 1.25
+SNAPSHOT_MIN_SECONDS = 1.0
+
+
+def _rss():
+    """Resident set size of this process in bytes (None where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def _short_path(filename):
+    """Package-relative path of a source file (keeps frame labels readable)"""
+    if 'site-packages' + os.sep in filename:
+        return filename.split('site-packages' + os.sep, 1)[1]
+    cwd = os.getcwd() + os.sep
+    if filename.startswith(cwd):
+        return filename[len(cwd):]
+    return os.path.basename(filename)
+
+
+class StageProfile:
+    """Samples, timings and allocation snapshots of one stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.samples = Counter()  # (frame label, ...) root first -> count
+        self.stats = None  # pstats.Stats (mode="cprofile")
+        self.start_memory = 0
+        self.peak_memory = 0
+        self.start_snapshot = None
+        self.peak_snapshot = None
+        self.snapshot_memory = 0
+        self.snapshot_time = 0.0
+
+    @property
+    def sample_count(self):
+        return sum(self.samples.values())
+
+    def add_profile(self, profile):
+        import pstats
+
+        if self.stats is None:
+            self.stats = pstats.Stats(profile)
+        else:
+            self.stats.add(profile)
+
+    def top_functions(self, top=10):
+        """(function, cumulative seconds, self seconds, calls) sorted by cumulative time"""
+        if self.stats is not None:
+            rows = [
+                (f"{func} ({_short_path(filename)}:{line})", cumulative, own, calls)
+                for (filename, line, func), (_, calls, own, cumulative, _) in self.stats.stats.items()
+            ]
+        else:
+            # Estimated from samples: a function's share of the stage's samples
+            total = self.sample_count
+            cumulative, own = Counter(), Counter()
+            for stack, count in self.samples.items():
+                for frame in set(stack):
+                    cumulative[frame] += count
+                own[stack[-1]] += count
+            # Frames above the stage's entry point are in every sample; keep only the entry point
+            shared = set(os.path.commonprefix(list(self.samples))[:-1])
+            scale = self.seconds / total if total else 0.0
+            rows = [
+                (frame, count * scale, own[frame] * scale, None)
+                for frame, count in cumulative.items() if frame not in shared
+            ]
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows[:top]
+
+    def top_allocations(self, top=10):
+        """(site, bytes, blocks) held near the stage's peak, relative to its start"""
+        if self.start_snapshot is None or self.peak_snapshot is None:
+            return []
+        import cProfile
+        import pstats
+        import tracemalloc
+
+        # Leave out the profilers' own bookkeeping
+        ignore = [tracemalloc.Filter(False, path) for path in (__file__, cProfile.__file__, pstats.__file__)]
+        diffs = self.peak_snapshot.filter_traces(ignore).compare_to(self.start_snapshot.filter_traces(ignore), 'lineno')
+        rows = [
+            (f"{_short_path(diff.traceback[0].filename)}:{diff.traceback[0].lineno}", diff.size_diff, diff.count_diff)
+            for diff in diffs if diff.size_diff > 0
+        ]
+        return rows[:top]
+
+
+class PythonProfiler:
+    """Sampling + optional cProfile + tracemalloc profiling, attributed to stages"""
+
+    def __init__(self):
+        self.mode = None
+        self.interval = 0.01
+        self.trace_memory = False
+        self.root = 'run'
+        self.stages = {}
+        self._active = {}  # thread ident -> names of the open stages, innermost last
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._stop = threading.Event()
+        self._labels = {}
+        self._started_tracemalloc = False
+        self._start = 0.0
+
+    @property
+    def enabled(self):
+        return self.mode is not None
+
+    def enable(self, name='run', mode='sample', interval_ms=10, trace_memory=False):
+        """Start sampling (and optionally tracemalloc); stages opened from now on are profiled"""
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode!r} (expected one of {MODES})")
+        import tracemalloc
+
+        self.reset()
+        self.root = name
+        self.mode = mode
+        self.interval = interval_ms / 1000
+        self.trace_memory = trace_memory
+        self.stages[name] = StageProfile(name)
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+        self._start = time.perf_counter()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name='python-profiler', daemon=True)
+        self._sampler.start()
+        logger.info(f"✓ Python profiling enabled ({mode}, {interval_ms:g} ms sampling"
+                    f"{', tracemalloc' if trace_memory else ''})")
+
+    def disable(self):
+        """Stop sampling and tracing"""
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+        if self._started_tracemalloc:
+            import tracemalloc
+
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        if self.root in self.stages:
+            self.stages[self.root].seconds = time.perf_counter() - self._start
+        self.mode = None
+
+    def reset(self):
+        """Clear collected profiles"""
+        with self._lock:
+            self.stages = {}
+            self._active = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Attribute the work done by this thread inside the block to ``name``"""
+        if not self.enabled:
+            yield
+            return
+        import cProfile
+        import tracemalloc
+
+        ident = threading.get_ident()
+        with self._lock:
+            profile = self.stages.setdefault(name, StageProfile(name))
+            stack = self._active.setdefault(ident, [])
+            stack.append(name)
+            outermost = len(stack) == 1
+
+        if profile.start_snapshot is None and not profile.start_memory:
+            if self.trace_memory and tracemalloc.is_tracing():
+                profile.start_snapshot = tracemalloc.take_snapshot()
+                profile.start_memory = profile.snapshot_memory = tracemalloc.get_traced_memory()[0]
+                profile.snapshot_time = time.perf_counter()
+            else:
+                profile.start_memory = _rss() or 0
+
+        cprofile = None
+        if self.mode == 'cprofile' and outermost:
+            cprofile = cProfile.Profile()
+            try:
+                cprofile.enable()
+            except ValueError as e:  # another profiler is active on this thread
+                logger.warning(f"⚠️  cProfile unavailable for {name}: {e}")
+                cprofile = None
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if cprofile is not None:
+                cprofile.disable()
+            profile.seconds += time.perf_counter() - start
+            if profile.start_snapshot is not None and profile.peak_snapshot is None and tracemalloc.is_tracing():
+                # Never grew enough for a snapshot during the stage: report what it kept
+                profile.peak_snapshot = tracemalloc.take_snapshot()
+            if cprofile is not None:
+                profile.add_profile(cprofile)
+            with self._lock:
+                stack.pop()
+                if not stack:
+                    self._active.pop(ident, None)
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _sample_loop(self):
+        main_ident = threading.main_thread().ident
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                active = {ident: stack[-1] for ident, stack in self._active.items()}
+                for ident, frame in frames.items():
+                    if ident == own_ident or (ident not in active and ident != main_ident):
+                        continue  # idle pool workers and the sampler itself
+                    stack = []
+                    while frame is not None:
+                        stack.append(self._label(frame.f_code))
+                        frame = frame.f_back
+                    self.stages[active.get(ident, self.root)].samples[tuple(reversed(stack))] += 1
+
+            if active:
+                self._track_memory(set(active.values()))
+
+    def _track_memory(self, names):
+        """Record peaks of the running stages (snapshotting the traced heap as they grow)"""
+        import tracemalloc
+
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        current = tracemalloc.get_traced_memory()[0] if tracing else _rss()
+        if current is None:
+            return
+        now = time.perf_counter()
+        snapshot = None
+        for name in names:
+            profile = self.stages[name]
+            profile.peak_memory = max(profile.peak_memory, current)
+            if not tracing or profile.start_snapshot is None:
+                continue
+            grown = current > profile.snapshot_memory * SNAPSHOT_GROWTH
+            if grown and now - profile.snapshot_time >= SNAPSHOT_MIN_SECONDS:
+                snapshot = snapshot or tracemalloc.take_snapshot()
+                profile.peak_snapshot = snapshot
+                profile.snapshot_memory = current
+                profile.snapshot_time = now
+
+    def write(self, output_dir):
+        """Write the collapsed stacks and cProfile dumps; returns the run directory"""
+        run_dir = Path(output_dir) / f"{self.root}_{datetime.now():%Y%m%d_%H%M%S}"
+        run_dir.mkdir(parents=True, exist_ok=True)
+
+        with open(run_dir / 'stacks.collapsed', 'w') as combined:
+            for name, profile in self.stages.items():
+                if not profile.samples:
+                    continue
+                with open(run_dir / f"{name}.collapsed", 'w') as stage_file:
+                    for stack, count in profile.samples.items():
+                        line = ';'.join(stack)
+                        stage_file.write(f"{line} {count}\n")
+                        combined.write(f"{name};{line} {count}\n")
+                if profile.stats is not None:
+                    profile.stats.dump_stats(run_dir / f"{name}.prof")
+        return run_dir
+
+    def print_report(self, top=10):
+        """Print the top functions and allocation sites of every stage"""
+        print("\n" + "=" * 100)
+        cprofiled = any(profile.stats is not None for profile in self.stages.values())
+        print(f"🐍 PYTHON PROFILE ({'cProfile + ' if cprofiled else ''}sampled stacks)")
+        print("=" * 100)
+        for name, profile in self.stages.items():
+            if not profile.sample_count and profile.stats is None:
+                continue
+            peak = ''
+            if profile.peak_memory:
+                source = 'traced' if profile.start_snapshot is not None else 'RSS'
+                peak = f", peak +{max(0, profile.peak_memory - profile.start_memory) / 1024 ** 2:,.1f} MB {source}"
+            print(f"\n⏱️  {name}: {profile.seconds:.2f}s, {profile.sample_count:,} samples{peak}")
+
+            functions = profile.top_functions(top)
+            if functions:
+                source = 'cProfile' if profile.stats is not None else 'sampled'
+                print(f"   {'cum s':>8} {'self s':>8} {'calls':>9}  top functions by cumulative time ({source})")
+                for function, cumulative, own, calls in functions:
+                    calls = f"{calls:,}" if calls is not None else '-'
+                    print(f"   {cumulative:>8.2f} {own:>8.2f} {calls:>9}  {function[:90]}")
+
+            allocations = profile.top_allocations(top)
+            if allocations:
+                print(f"   {'MB':>8} {'blocks':>9}  top allocation sites (near peak)")
+                for site, size, blocks in allocations:
+                    print(f"   {size / 1024 ** 2:>8.2f} {blocks:>9,}  {site}")
+        print("\n" + "=" * 100 + "\n")
+
+
+# Create singleton instance
+python_profiler = PythonProfiler()
+
+
+def add_profile_arguments(parser):
+    """Add the --profile / --profile-dir options shared by the entry points"""
+    from src.utils.config import config
+
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='sample',
+        choices=MODES,
+        help="Profile the Python side per stage: sampled stacks (default) or cProfile, plus tracemalloc"
+    )
+    parser.add_argument(
+        '--profile-memory',
+        action='store_true',
+        help="With --profile: report tracemalloc allocation sites per stage (slows allocation-heavy code)"
+    )
+    parser.add_argument(
+        '--profile-dir',
+        default=config.PROFILE_DIR,
+        help="Where profile dumps and collapsed stacks are written"
+    )
+
+
+@contextmanager
+def profile_python(name, mode='sample', output_dir='profiles', trace_memory=False, interval_ms=None, top=10):
+    """Profile the block (no-op when mode is None), then write the dumps and print the report"""
+    if mode is None:
+        yield None
+        return
+
+    if interval_ms is None:
+        from src.utils.config import config
+        interval_ms = config.PROFILE_SAMPLE_MS
+
+    python_profiler.enable(name, mode=mode, interval_ms=interval_ms, trace_memory=trace_memory)
+    try:
+        yield python_profiler
+    finally:
+        python_profiler.disable()
+        run_dir = python_profiler.write(output_dir)
+        report = io.StringIO()
+        with redirect_stdout(report):
+            python_profiler.print_report(top)
+        (run_dir / 'report.txt').write_text(report.getvalue())
+        print(report.getvalue())
+        logger.info(f"✓ Profiles written to {run_dir} (flamegraph: flamegraph.pl {run_dir}/stacks.collapsed)")
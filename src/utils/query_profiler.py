@@ -0,0 +1,275 @@
+"""
+Opt-in SQL profiling built on SQLAlchemy engine events.
+
+Every statement executed on a profiled engine is timed and attributed to the
+current label (pipeline stage or analytics query name). Statements slower than
+a threshold are logged and can optionally have their EXPLAIN (ANALYZE, BUFFERS)
+plan captured. When pg_stat_statements is installed, snapshots taken before and
+after a run can be diffed to see server-side time per statement.
+
+Usage:
+    from src.utils.query_profiler import profile_run
+
+    with profile_run(db, slow_query_ms=200, explain_slow=True) as profiler:
+        with profiler.label("transform_facts"):
+            ...
+"""
+
+import contextvars
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_current_label = contextvars.ContextVar("query_profiler_label", default="unlabelled")
+
+EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+DATA_MODIFYING = re.compile(r"\b(INSERT|UPDATE|DELETE|TRUNCATE|MERGE)\b", re.IGNORECASE)
+
+
+def normalize_statement(statement, max_length=200):
+    """Collapse whitespace and truncate a statement so repeated executions group together"""
+    statement = re.sub(r"--[^\n]*", " ", statement)
+    statement = " ".join(statement.split())
+    return statement[:max_length]
+
+
+class QueryProfiler:
+    """Collect per-statement timings from SQLAlchemy cursor events"""
+
+    def __init__(self):
+        self.slow_query_ms = 500.0
+        self.explain_slow = False
+        self.stats = {}
+        self._engines = []
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self._engines)
+
+    def enable(self, engine, slow_query_ms=None, explain_slow=None):
+        """Start profiling statements executed on ``engine``"""
+        if slow_query_ms is not None:
+            self.slow_query_ms = float(slow_query_ms)
+        if explain_slow is not None:
+            self.explain_slow = explain_slow
+        if engine in self._engines:
+            return
+
+        from sqlalchemy import event
+
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        self._engines.append(engine)
+        logger.info(f"✓ Query profiling enabled (slow threshold {self.slow_query_ms:.0f} ms)")
+
+    def disable(self):
+        """Stop profiling all engines"""
+        from sqlalchemy import event
+
+        for engine in self._engines:
+            event.remove(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+        self._engines = []
+
+    def reset(self):
+        """Clear collected statistics"""
+        with self._lock:
+            self.stats = {}
+
+    @contextmanager
+    def label(self, name):
+        """Attribute statements executed inside the block to ``name``"""
+        token = _current_label.set(name)
+        try:
+            yield
+        finally:
+            _current_label.reset(token)
+
+    @staticmethod
+    def current_label():
+        return _current_label.get()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+        label = _current_label.get()
+        key = (label, normalize_statement(statement))
+        rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else 0
+
+        with self._lock:
+            entry = self.stats.setdefault(
+                key, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "slow_calls": 0, "plan": None}
+            )
+            entry["calls"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["rows"] += rows
+
+        if elapsed_ms < self.slow_query_ms:
+            return
+
+        with self._lock:
+            entry["slow_calls"] += 1
+        logger.warning(f"🐢 Slow query [{label}] {elapsed_ms:,.1f} ms: {key[1]}")
+
+        if self.explain_slow and EXPLAINABLE.match(statement) and not DATA_MODIFYING.search(statement):
+            plan = self.explain(conn.engine, statement, parameters)
+            if plan:
+                with self._lock:
+                    entry["plan"] = plan
+                logger.info(f"Plan for slow query [{label}]:\n{plan}")
+
+    @staticmethod
+    def explain(engine, statement, parameters):
+        """Return the EXPLAIN (ANALYZE, BUFFERS) plan of a read-only statement (runs it again)"""
+        # A raw DBAPI connection bypasses the engine events, so this is not profiled itself
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+            raw.rollback()
+            return plan
+        except Exception as e:
+            logger.warning(f"Could not capture plan: {e}")
+            return None
+        finally:
+            raw.close()
+
+    def report(self, top=20):
+        """Return aggregated statistics sorted by total time"""
+        with self._lock:
+            rows = [
+                {"label": label, "statement": statement, **entry, "avg_ms": entry["total_ms"] / entry["calls"]}
+                for (label, statement), entry in self.stats.items()
+            ]
+        rows.sort(key=lambda r: r["total_ms"], reverse=True)
+        return rows[:top]
+
+    def print_report(self, top=20):
+        """Print the aggregated per-statement statistics"""
+        rows = self.report(top)
+        total_ms = sum(entry["total_ms"] for entry in self.stats.values())
+
+        print("\n" + "=" * 100)
+        print(f"🔍 QUERY PROFILE (top {len(rows)} by total time, {total_ms / 1000:.2f}s in SQL)")
+        print("=" * 100)
+        print(f"   {'label':24} {'calls':>6} {'total ms':>10} {'avg ms':>9} {'max ms':>9} {'rows':>9} {'slow':>5}  statement")
+        for r in rows:
+            print(
+                f"   {r['label'][:24]:24} {r['calls']:>6,} {r['total_ms']:>10,.1f} {r['avg_ms']:>9,.1f} "
+                f"{r['max_ms']:>9,.1f} {r['rows']:>9,} {r['slow_calls']:>5}  {r['statement'][:60]}"
+            )
+        print("=" * 100 + "\n")
+
+
+# Create singleton instance
+query_profiler = QueryProfiler()
+
+
+def pg_stat_statements_available(conn):
+    """Check whether the pg_stat_statements extension is installed"""
+    from sqlalchemy import text
+
+    return bool(conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")).scalar())
+
+
+def snapshot_pg_stat_statements(conn):
+    """Return {queryid: stats} from pg_stat_statements, or None if unavailable"""
+    if not pg_stat_statements_available(conn):
+        return None
+
+    from sqlalchemy import text
+
+    result = conn.execute(
+        text(
+            """
+            SELECT queryid, query, calls, total_exec_time, rows,
+                   shared_blks_hit, shared_blks_read
+            FROM pg_stat_statements
+            WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+        """
+        )
+    )
+    return {
+        row.queryid: {
+            "query": row.query,
+            "calls": row.calls,
+            "total_ms": row.total_exec_time,
+            "rows": row.rows,
+            "shared_blks_hit": row.shared_blks_hit,
+            "shared_blks_read": row.shared_blks_read,
+        }
+        for row in result
+    }
+
+
+def diff_pg_stat_statements(before, after, top=20):
+    """Return per-statement deltas between two snapshots, sorted by time spent"""
+    deltas = []
+    for queryid, stats in after.items():
+        prev = before.get(queryid, {})
+        calls = stats["calls"] - prev.get("calls", 0)
+        if calls <= 0:
+            continue
+        deltas.append(
+            {
+                "query": normalize_statement(stats["query"]),
+                "calls": calls,
+                "total_ms": stats["total_ms"] - prev.get("total_ms", 0.0),
+                "rows": stats["rows"] - prev.get("rows", 0),
+                "shared_blks_hit": stats["shared_blks_hit"] - prev.get("shared_blks_hit", 0),
+                "shared_blks_read": stats["shared_blks_read"] - prev.get("shared_blks_read", 0),
+            }
+        )
+    deltas.sort(key=lambda d: d["total_ms"], reverse=True)
+    return deltas[:top]
+
+
+def print_pg_stat_statements_diff(deltas):
+    """Print the output of diff_pg_stat_statements"""
+    print("\n" + "=" * 100)
+    print("🗄️  PG_STAT_STATEMENTS DELTA")
+    print("=" * 100)
+    print(f"   {'calls':>6} {'total ms':>10} {'rows':>9} {'blks hit':>9} {'blks read':>9}  query")
+    for d in deltas:
+        print(
+            f"   {d['calls']:>6,} {d['total_ms']:>10,.1f} {d['rows']:>9,} "
+            f"{d['shared_blks_hit']:>9,} {d['shared_blks_read']:>9,}  {d['query'][:60]}"
+        )
+    print("=" * 100 + "\n")
+
+
+@contextmanager
+def profile_run(database, slow_query_ms=None, explain_slow=None):
+    """Profile every statement of a pipeline/analytics run and print reports at the end"""
+    before = None
+    try:
+        with database.get_connection() as conn:
+            before = snapshot_pg_stat_statements(conn)
+    except Exception as e:
+        logger.warning(f"Could not read pg_stat_statements: {e}")
+    if before is None:
+        logger.info("pg_stat_statements not available, skipping server-side statement diff")
+
+    query_profiler.enable(database.engine, slow_query_ms, explain_slow)
+    # Read-only queries may run on replicas (pg_stat_statements covers the primary only)
+    for url in database.replicas.urls:
+        query_profiler.enable(database.replica_engine(url))
+    try:
+        yield query_profiler
+    finally:
+        query_profiler.disable()
+        query_profiler.print_report()
+        if before is not None:
+            with database.get_connection() as conn:
+                after = snapshot_pg_stat_statements(conn)
+            print_pg_stat_statements_diff(diff_pg_stat_statements(before, after))
@@ -1,39 +1,47 @@
-from sqlalchemy import text
+import argparse
+import sys
+from pathlib import Path
+from src.utils.config import config
 from src.utils.db_connection import db
-import pandas as pd
+from src.utils.kpis import sales_overview
+from src.utils.query_profiler import profile_run, query_profiler
 
-def run_query(query_name, sql):
-    """Run a SQL query and display results"""
-    print(f"\n{'='*60}")
-    print(f"📊 {query_name}")
-    print('='*60)
-    
-    try:
-        with db.get_connection() as conn:
-            df = pd.read_sql(sql, conn)
-            print(df.to_string(index=False))
-            print(f"\n✓ {len(df)} rows returned")
-    except Exception as e:
-        print(f"✗ Error running query: {e}")
+# Built-in extracts for --export (any .sql file can be exported too)
+EXTRACTS = {
+    'customers': """
+        SELECT
+            c.customer_id,
+            c.full_name,
+            c.email,
+            c.country,
+            c.customer_segment,
+            COUNT(f.order_key) as total_orders,
+            COALESCE(SUM(f.total_amount), 0) as lifetime_value,
+            MIN(f.order_date) as first_order_date,
+            MAX(f.order_date) as last_order_date
+        FROM marts.dim_customers c
+        LEFT JOIN marts.fact_orders f ON c.customer_key = f.customer_key AND f.status = 'completed'
+        GROUP BY c.customer_key, c.customer_id, c.full_name, c.email, c.country, c.customer_segment
+    """,
+    'orders': """
+        SELECT
+            fo.order_id,
+            dc.customer_id,
+            fo.order_date,
+            fo.status,
+            fo.total_items,
+            fo.total_amount,
+            fo.total_cost,
+            fo.profit
+        FROM marts.fact_orders fo
+        LEFT JOIN marts.dim_customers dc ON fo.customer_key = dc.customer_key
+    """,
+    'order_lines': "SELECT * FROM marts.order_lines_wide",
+}
 
-def main():
-    """Run key analytics queries"""
-    
-    # Sales Overview
-    run_query("Sales Overview - Last 30 Days", """
-        SELECT 
-            COUNT(DISTINCT order_id) as total_orders,
-            COUNT(DISTINCT customer_key) as unique_customers,
-            ROUND(SUM(total_amount), 2) as total_revenue,
-            ROUND(SUM(profit), 2) as total_profit,
-            ROUND(AVG(total_amount), 2) as avg_order_value
-        FROM marts.fact_orders
-        WHERE order_date >= CURRENT_DATE - INTERVAL '30 days'
-            AND status = 'completed';
-    """)
-    
-    # Top Products
-    run_query("Top 10 Products by Revenue", """
+# Report queries run after the sales overview (concurrently with --concurrent)
+REPORT_QUERIES = {
+    "Top 10 Products by Revenue": """
         SELECT 
             p.product_name,
             p.category,
@@ -44,10 +52,8 @@ def main():
         GROUP BY p.product_key, p.product_name, p.category
         ORDER BY revenue DESC
         LIMIT 10;
-    """)
-    
-    # Customer Segments
-    run_query("Customer Segmentation", """
+    """,
+    "Customer Segmentation": """
         SELECT 
             c.customer_segment,
             COUNT(DISTINCT c.customer_key) as customers,
@@ -57,7 +63,164 @@ def main():
         WHERE f.status = 'completed'
         GROUP BY c.customer_segment
         ORDER BY revenue DESC;
-    """)
+    """,
+}
+
+def print_result(query_name, raw):
+    """Display a query result, compacted, with its memory footprint"""
+    from src.utils.frames import compact_frame, frame_memory
+    
+    print(f"\n{'='*60}")
+    print(f"📊 {query_name}")
+    print('='*60)
+    
+    df = compact_frame(raw)
+    print(df.to_string(index=False))
+    print(f"\n✓ {len(df)} rows returned "
+          f"({frame_memory(df) / 1024:,.1f} KB in memory, {frame_memory(raw) / 1024:,.1f} KB before compaction)")
+
+def run_query(query_name, sql):
+    """Run a SQL query and display results"""
+    import pandas as pd
+    
+    try:
+        with db.read_connection() as conn, query_profiler.label(query_name):
+            raw = pd.read_sql(sql, conn)
+        print_result(query_name, raw)
+    except Exception as e:
+        print(f"✗ Error running query: {e}")
+
+def run_queries_concurrently(queries):
+    """Fetch all queries at once on the async pool, then display them in order"""
+    from src.utils.async_db import async_db
+    
+    try:
+        frames = async_db.run(async_db.fetch_frames(queries, read_only=True))
+        for query_name, raw in frames.items():
+            print_result(query_name, raw)
+    except Exception as e:
+        print(f"✗ Error running queries: {e}")
+    finally:
+        async_db.shutdown()
+
+def run_sales_overview(days=30, exact=False):
+    """Display sales KPIs (unique customers from HyperLogLog sketches unless exact)"""
+    import pandas as pd
+    
+    query_name = f"Sales Overview - Last {days} Days"
+    print(f"\n{'='*60}")
+    print(f"📊 {query_name}")
+    print('='*60)
+    
+    try:
+        with db.read_connection() as conn, query_profiler.label(query_name):
+            kpis = sales_overview(conn, days, exact=exact)
+        df = pd.DataFrame([{
+            'total_orders': kpis['total_orders'],
+            'unique_customers': kpis['unique_customers'],
+            'total_revenue': round(kpis['revenue'], 2),
+            'total_profit': round(kpis['profit'], 2),
+            'avg_order_value': round(kpis['avg_order_value'], 2),
+        }])
+        print(df.to_string(index=False))
+        if exact:
+            print("\n✓ Exact distinct counts")
+        else:
+            print(f"\n✓ unique_customers is a HyperLogLog estimate "
+                  f"(±{kpis['unique_customers_error'] * 100:.1f}% std error; use --exact for audits)")
+    except Exception as e:
+        print(f"✗ Error running query: {e}")
+
+def run_all_queries(exact=False, concurrent=False):
+    """Run key analytics queries"""
+    
+    # Sales Overview
+    run_sales_overview(30, exact=exact)
+    
+    if concurrent:
+        run_queries_concurrently(REPORT_QUERIES)
+    else:
+        for query_name, sql in REPORT_QUERIES.items():
+            run_query(query_name, sql)
+
+def run_export(extract, output='-', fmt=None, batch_size=50_000):
+    """Stream an extract to a file or stdout and report throughput on stderr"""
+    from src.utils.export import export_query
+    
+    if extract in EXTRACTS:
+        sql = EXTRACTS[extract]
+    elif extract.endswith('.sql'):
+        sql = Path(extract).read_text()
+    else:
+        raise SystemExit(f"Unknown extract {extract!r}: use one of {sorted(EXTRACTS)} or a .sql file")
+    
+    with query_profiler.label(f"export {extract}"):
+        stats = export_query(sql, output, fmt, batch_size)
+    
+    # Progress goes to stderr so that stdout exports stay clean
+    print(
+        f"✓ Exported {stats['rows']:,} rows ({stats['bytes'] / 1e6:,.1f} MB {stats['format']}) "
+        f"to {'stdout' if output == '-' else output} in {stats['seconds']:.2f}s "
+        f"({stats['rows_per_second']:,.0f} rows/s, {stats['mb_per_second']:,.1f} MB/s)",
+        file=sys.stderr
+    )
+    return stats
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Run key analytics queries")
+    parser.add_argument(
+        '--profile-sql',
+        action='store_true',
+        default=config.QUERY_PROFILE,
+        help="Time every SQL statement and print a per-statement profile at the end"
+    )
+    parser.add_argument(
+        '--exact',
+        action='store_true',
+        help="Count distinct customers exactly instead of from HyperLogLog sketches"
+    )
+    parser.add_argument(
+        '--concurrent',
+        action='store_true',
+        help="Fetch the report queries concurrently on the asyncpg pool (not covered by --profile-sql)"
+    )
+    parser.add_argument(
+        '--export',
+        metavar='EXTRACT',
+        help=f"Stream an extract ({', '.join(EXTRACTS)} or a .sql file) instead of running the report"
+    )
+    parser.add_argument(
+        '--output',
+        default='-',
+        help="Export destination file, or '-' for stdout (default)"
+    )
+    parser.add_argument(
+        '--format',
+        choices=['csv', 'parquet'],
+        help="Export format (default: from the --output extension, else csv)"
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=50_000,
+        help="Rows fetched per server-side cursor batch for Parquet exports"
+    )
+    args = parser.parse_args()
+    
+    db.use_workload('batch-analytics')
+    if args.export:
+        def task():
+            run_export(args.export, args.output, args.format, args.batch_size)
+    else:
+        def task():
+            run_all_queries(exact=args.exact, concurrent=args.concurrent)
+    
+    if args.profile_sql:
+        with profile_run(db, config.SLOW_QUERY_MS, config.EXPLAIN_SLOW_QUERIES):
+            task()
+    else:
+        task()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,3 +1,4 @@
+import numpy as np
 from sqlalchemy import text
 
 
@@ -94,3 +95,147 @@ def test_revenue_calculations(database_connection):
     with database_connection.get_connection() as conn:
         result = conn.execute(query).scalar()
         assert result == 0, "Found orders with negative revenue"
+
+
+def test_staging_reload_is_idempotent(database_connection, sample_data_path):
+    """Test that reloading an unchanged file inserts and updates nothing"""
+    from src.loaders.csv_to_postgres import CSVLoader
+    from src.loaders.schemas import read_staging_csv
+
+    loader = CSVLoader()
+    df = read_staging_csv("products", sample_data_path / "products.csv")
+    loader.upsert("products", df)
+    before = database_connection.get_table_count("staging", "products")
+
+    assert loader.upsert("products", df) == (0, 0)
+    assert database_connection.get_table_count("staging", "products") == before
+
+
+def test_async_fan_out_matches_sync_results(database_connection):
+    """Test that concurrent asyncpg queries return the same results as the sync engine"""
+    from src.utils.async_db import AsyncDatabase
+
+    async_database = AsyncDatabase(max_size=4)
+    queries = {
+        table: f"SELECT COUNT(*) AS n FROM marts.{table}"
+        for table in ["dim_customers", "dim_products", "fact_orders", "fact_order_items"]
+    }
+    try:
+        frames = async_database.run(async_database.fetch_frames(queries))
+    finally:
+        async_database.shutdown()
+
+    for table, frame in frames.items():
+        assert frame.loc[0, "n"] == database_connection.get_table_count("marts", table)
+
+
+def test_key_lookup_matches_dimension_join(database_connection):
+    """Test that cached key maps resolve staged ids like the SQL join does"""
+    from src.transformers.key_lookup import UNKNOWN_KEY, KeyLookup
+
+    with database_connection.get_connection() as conn:
+        lookup = KeyLookup()
+        lookup.sync(conn)
+        rows = conn.execute(text("""
+            SELECT oi.product_id, COALESCE(dp.product_key, -1)
+            FROM staging.order_items oi
+            LEFT JOIN marts.dim_products dp ON oi.product_id = dp.product_id
+        """)).all()
+        assert lookup.sync(conn) == {"customer": 0, "product": 0}
+
+    product_ids = np.array([row[0] for row in rows])
+    expected = np.array([row[1] for row in rows])
+    assert np.array_equal(lookup.resolve("product", product_ids), expected)
+    assert lookup.resolve("product", [-5]).tolist() == [UNKNOWN_KEY]
+
+
+def test_read_connection_skips_unreachable_replicas(database_connection):
+    """Test that read-only work falls back past a dead replica and stays read-only"""
+    from src.utils.db_connection import DatabaseConnection
+
+    unreachable = database_connection.url.rsplit("@", 1)[0] + "@localhost:1/ecommerce_dw"
+    database = DatabaseConnection(replica_urls=[unreachable, database_connection.url])
+
+    for consistent in (False, True):
+        with database.read_connection(consistent=consistent) as conn:
+            assert conn.execute(text("SHOW default_transaction_read_only")).scalar() == "on"
+    assert database.replicas.candidates() == [database_connection.url]
+    database.dispose()
+
+
+def test_compact_facts_match_decimal_facts(database_connection):
+    """Test that the integer-cents facts, seen through the compat views, equal the DECIMAL facts"""
+    from src.transformers.load_facts import FactLoader
+
+    counts = FactLoader(compact_facts=True).load_compact_facts()
+    assert counts["fact_order_items_compact"] == database_connection.get_table_count("marts", "fact_order_items")
+
+    with database_connection.get_connection() as conn:
+        for table in ["fact_orders", "fact_order_items"]:
+            mismatched = conn.execute(text(
+                f"SELECT COUNT(*) FROM (SELECT * FROM marts.{table} EXCEPT SELECT * FROM marts.{table}_compat) diff"
+            )).scalar()
+            assert mismatched == 0, f"marts.{table}_compat differs from marts.{table}"
+
+
+def test_refreshed_customers_keep_their_segment(database_connection):
+    """Test that the incremental RFM refresh keeps scored customers in their segment"""
+    from src.transformers.customer_analytics import CustomerAnalyticsLoader
+
+    loader = CustomerAnalyticsLoader(rescore_every=10**9, rescore_interval=10**9)
+    conn = database_connection.engine.connect().execution_options(isolation_level="READ COMMITTED")
+    try:
+        with conn.begin() as transaction:
+            query = text(
+                "SELECT customer_key, r_score, rfm_segment FROM marts.customer_rfm "
+                "WHERE rfm_segment IS NOT NULL ORDER BY customer_key LIMIT 5"
+            )
+            before = conn.execute(query).all()
+            keys = [row.customer_key for row in before]
+
+            loader.refresh_customers(conn, keys)
+            after = conn.execute(query).all()
+            transaction.rollback()
+    finally:
+        conn.close()
+
+    assert keys and after == before
+
+
+def test_exports_fall_back_to_the_primary(database_connection, monkeypatch, tmp_path):
+    """Test that exports read through read_connection, using the primary when no replica is reachable"""
+    from src.utils import export
+    from src.utils.db_connection import DatabaseConnection
+
+    unreachable = database_connection.url.rsplit("@", 1)[0] + "@localhost:1/ecommerce_dw"
+    database = DatabaseConnection(replica_urls=[unreachable])
+    monkeypatch.setattr(export, "db", database)
+
+    sql = "SELECT order_id, total_amount FROM marts.fact_orders"
+    expected = database_connection.get_table_count("marts", "fact_orders")
+    assert export.export_query(sql, str(tmp_path / "orders.csv"))["rows"] == expected
+    assert export.export_query(sql, str(tmp_path / "orders.parquet"))["rows"] == expected
+    assert database.replicas.candidates() == []
+    database.dispose()
+
+
+def test_compact_facts_accept_large_quantities(database_connection):
+    """Test that quantities beyond the SMALLINT range copy into the compact facts unchanged"""
+    from src.transformers.load_facts import FACT_ORDER_ITEMS_COMPACT_SELECT
+
+    conn = database_connection.engine.connect().execution_options(isolation_level="READ COMMITTED")
+    try:
+        with conn.begin() as transaction:
+            item_key = conn.execute(text(
+                "UPDATE marts.fact_order_items SET quantity = 40000 "
+                "WHERE order_item_key = (SELECT MIN(order_item_key) FROM marts.fact_order_items) "
+                "RETURNING order_item_key"
+            )).scalar()
+            compact = conn.execute(text(
+                FACT_ORDER_ITEMS_COMPACT_SELECT.format(schema="marts", where="WHERE order_item_key = :key")
+            ), {"key": item_key}).one()
+            transaction.rollback()
+    finally:
+        conn.close()
+
+    assert compact.quantity == 40000
@@ -0,0 +1,43 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("airflow.sdk")
+
+DAG_PATH = Path(__file__).resolve().parents[2] / "airflow" / "dags" / "ecommerce_pipeline.py"
+
+
+@pytest.fixture(scope="module")
+def pipeline_dag():
+    spec = importlib.util.spec_from_file_location("ecommerce_pipeline", DAG_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.dag
+
+
+def test_dimensions_wait_only_for_their_source_table(pipeline_dag):
+    """Test that each dimension task depends on the staging load it reads"""
+    assert pipeline_dag.get_task("load_dim_customers").upstream_task_ids == {"load_staging_customers"}
+    assert pipeline_dag.get_task("load_dim_products").upstream_task_ids == {"load_staging_products"}
+    assert pipeline_dag.get_task("load_dim_date").upstream_task_ids == {"load_staging_orders"}
+
+
+def test_staging_shards_and_fact_slices_are_mapped(pipeline_dag):
+    """Test that per-file staging loads and per-month fact slices fan out dynamically"""
+    from airflow.sdk.definitions.mappedoperator import MappedOperator
+
+    for task_id in ["load_staging_orders", "load_staging_order_items", "load_fact_slice"]:
+        assert isinstance(pipeline_dag.get_task(task_id), MappedOperator)
+
+    fact_slice = pipeline_dag.get_task("load_fact_slice")
+    assert {"plan_fact_partitions", "prune_facts"} <= fact_slice.upstream_task_ids
+    assert fact_slice.downstream_task_ids == {"load_agg_daily_sales", "load_customer_analytics"}
+
+
+def test_database_tasks_share_the_pool(pipeline_dag):
+    """Test that every warehouse task runs in the DB pool"""
+    pools = {task.task_id: task.pool for task in pipeline_dag.tasks}
+
+    assert pools["list_orders_shards"] == "default_pool"
+    assert pools["load_fact_slice"] == pools["load_staging_orders"] == pools["validate"] == "ecommerce_dw"
@@ -0,0 +1,24 @@
+from src.transformers.blue_green import MART_DDL_PATHS, SHADOW_SCHEMA, schema_ddl
+from src.utils.data_quality import References, default_rules
+
+
+def test_shadow_ddl_creates_every_table_in_the_shadow_schema():
+    """Test that the mart DDL is rewritten to the shadow schema, foreign keys included"""
+    ddl = "\n".join(schema_ddl(path, SHADOW_SCHEMA) for path in MART_DDL_PATHS)
+
+    assert "marts." not in ddl
+    assert f"CREATE TABLE IF NOT EXISTS {SHADOW_SCHEMA}.fact_orders" in ddl
+    assert f"REFERENCES {SHADOW_SCHEMA}.dim_customers(customer_key)" in ddl
+    assert f"INSERT INTO {SHADOW_SCHEMA}.holidays" in ddl
+    assert f"CREATE OR REPLACE VIEW {SHADOW_SCHEMA}.fact_order_items_compat" in ddl
+    assert f"FROM {SHADOW_SCHEMA}.fact_order_items_compact" in ddl
+
+
+def test_default_rules_target_the_given_mart_schema():
+    """Test that shadow validation checks shadow tables against shadow parents"""
+    rules = default_rules(SHADOW_SCHEMA)
+    mart_tables = [table for table in rules if not table.startswith("staging.")]
+
+    assert mart_tables and all(table.startswith(f"{SHADOW_SCHEMA}.") for table in mart_tables)
+    parents = {rule.parent_table for table in mart_tables for rule in rules[table] if isinstance(rule, References)}
+    assert parents == {f"{SHADOW_SCHEMA}.{name}" for name in ("dim_customers", "dim_date", "fact_orders", "dim_products")}
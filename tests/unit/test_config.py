@@ -1,4 +1,4 @@
-from src.utils.config import config
+from src.utils.config import _workload_profile, config
 
 
 def test_config_has_database_url():
@@ -13,3 +13,15 @@ def test_config_has_required_fields():
     assert config.DB_PORT is not None
     assert config.DB_NAME is not None
     assert config.DB_USER is not None
+
+
+def test_workload_profiles_have_session_settings(monkeypatch):
+    """Test that every profile defines its session settings and settings can be overridden from the environment"""
+    for name in ('etl', 'interactive', 'batch-analytics'):
+        settings = config.workload_session_settings(name)
+        assert set(settings) == {'application_name', 'work_mem', 'statement_timeout', 'max_parallel_workers_per_gather'}
+
+    monkeypatch.setenv('WORKLOAD_BATCH_ANALYTICS_WORK_MEM', '1GB')
+    monkeypatch.setenv('WORKLOAD_BATCH_ANALYTICS_MAX_CONCURRENCY', '8')
+    profile = _workload_profile('batch-analytics', pool_size=2, max_concurrency=4, pool_timeout=60, work_mem='64MB')
+    assert profile == {'pool_size': 2, 'max_concurrency': 8, 'pool_timeout': 60, 'work_mem': '1GB'}
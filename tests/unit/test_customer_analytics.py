@@ -0,0 +1,75 @@
+import pandas as pd
+
+from src.transformers.customer_analytics import (
+    aggregate_orders,
+    cohort_matrix,
+    quintile_cutoffs,
+    score_rfm,
+    score_with_cutoffs,
+)
+
+
+def make_orders():
+    return pd.DataFrame({
+        "customer_key": [1, 1, 2, 3, 1, 2],
+        "order_date": pd.to_datetime([
+            "2025-01-05", "2025-02-10", "2025-01-20", "2025-02-01", "2025-03-15", "2025-01-25",
+        ]),
+        "total_amount": [10.0, 20.0, 5.0, 7.5, 30.0, 5.0],
+    })
+
+
+def test_aggregate_orders_combines_chunks():
+    """Test that per-chunk partial aggregates combine into whole-table results"""
+    orders = make_orders()
+    aggregates, activity = aggregate_orders([orders.iloc[:3].copy(), orders.iloc[3:].copy()])
+
+    assert aggregates.loc[1, "frequency"] == 3
+    assert aggregates.loc[1, "monetary"] == 60.0
+    assert aggregates.loc[1, "first_order_date"] == pd.Timestamp("2025-01-05")
+    assert aggregates.loc[1, "last_order_date"] == pd.Timestamp("2025-03-15")
+    assert str(aggregates.loc[3, "cohort_month"]) == "2025-02"
+    # Customer 2 ordered twice in January: one active month
+    assert len(activity[activity["customer_key"] == 2]) == 1
+
+
+def test_score_rfm_ranks_customers():
+    """Test that recency is measured from the latest order and scores are 1-5"""
+    aggregates, _ = aggregate_orders([make_orders()])
+    scored = score_rfm(aggregates)
+
+    assert scored.loc[1, "recency_days"] == 0
+    assert scored.loc[2, "recency_days"] == (pd.Timestamp("2025-03-15") - pd.Timestamp("2025-01-25")).days
+    assert scored[["r_score", "f_score", "m_score"]].isin(range(1, 6)).all().all()
+    assert scored.loc[1, "r_score"] == 5 and scored.loc[1, "f_score"] == 5
+    assert scored.loc[1, "rfm_segment"] == "Champions"
+
+
+def test_cohort_matrix_retention():
+    """Test that each cohort's active share per month offset is computed"""
+    aggregates, activity = aggregate_orders([make_orders()])
+    matrix = cohort_matrix(aggregates, activity).set_index(["cohort_month", "months_since"])
+
+    january = pd.Timestamp("2025-01-01").date()
+    assert matrix.loc[(january, 0), "cohort_size"] == 2
+    assert matrix.loc[(january, 1), "active_customers"] == 1
+    assert matrix.loc[(january, 2), "retention_rate"] == 0.5
+
+
+def test_score_with_cutoffs_matches_full_scoring():
+    """Test that stored cutoffs reproduce the full ranking and score new customers"""
+    aggregates, _ = aggregate_orders([make_orders()])
+    scored = score_rfm(aggregates)
+    cutoffs = quintile_cutoffs(scored)
+
+    columns = ["recency_days", "r_score", "f_score", "m_score", "rfm_segment"]
+    pd.testing.assert_frame_equal(score_with_cutoffs(aggregates, cutoffs)[columns], scored[columns])
+
+    newcomer = pd.DataFrame(
+        {"last_order_date": pd.to_datetime(["2025-04-01"]), "frequency": [1], "monetary": [100.0]},
+        index=pd.Index([4], name="customer_key"),
+    )
+    rescored = score_with_cutoffs(newcomer, cutoffs)
+    assert rescored.loc[4, "recency_days"] == 0
+    assert rescored.loc[4, "r_score"] == 5 and rescored.loc[4, "m_score"] == 5
+    assert rescored.loc[4, "rfm_segment"] is not None
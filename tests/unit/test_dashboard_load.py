@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from src.benchmarks.dashboard_load import LatencyRecorder, percentiles, postgres_cpu_seconds
+
+
+def test_panel_summary_percentiles_and_hit_rate():
+    """Test latency percentiles, pool wait and cache hit rate per panel"""
+    recorder = LatencyRecorder()
+    for ms in range(1, 101):
+        recorder.record('products', ms / 1000, wait=0.002)
+    recorder.hit('products')
+    recorder.error('kpis')
+
+    products, kpis = recorder.summary(['products', 'kpis'])
+    assert products['queries'] == 100
+    assert products['p50'] == pytest.approx(50.5)
+    assert products['p99'] == pytest.approx(99.01)
+    assert products['max'] == pytest.approx(100.0)
+    assert products['wait_avg'] == pytest.approx(2.0)
+    assert products['hit_pct'] == pytest.approx(100 / 101)
+    assert kpis['queries'] == 0 and kpis['errors'] == 1 and kpis['p95'] is None
+    assert percentiles([]) == {'p50': None, 'p95': None, 'p99': None, 'max': None}
+
+
+def test_postgres_cpu_seconds_reads_proc_stat(tmp_path):
+    """Test that only postgres processes are summed (utime + stime) and other processes ignored"""
+    ticks = os.sysconf('SC_CLK_TCK')
+    stats = {
+        '101': f"101 (postgres) S 1 101 101 0 -1 4194560 10 0 0 0 {ticks * 2} {ticks} 0 0 20 0 1 0",
+        '102': f"102 (postgres) R 101 101 101 0 -1 4194560 10 0 0 0 {ticks} 0 0 0 20 0 1 0",
+        '103': f"103 (python (x)) R 1 103 103 0 -1 4194560 10 0 0 0 {ticks * 50} 0 0 0 20 0 1 0",
+    }
+    for pid, stat in stats.items():
+        (tmp_path / pid).mkdir()
+        (tmp_path / pid / 'stat').write_text(stat)
+
+    assert postgres_cpu_seconds(tmp_path) == pytest.approx(4.0)
+    assert postgres_cpu_seconds(tmp_path / 'missing') is None
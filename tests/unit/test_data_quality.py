@@ -0,0 +1,58 @@
+import pandas as pd
+
+from src.utils.data_quality import FAIL, PASS, WARN, Expression, Freshness, MinRows, NotNull, References, Unique
+
+
+def run_chunks(rule, chunks):
+    rule.start()
+    for chunk in chunks:
+        rule.evaluate_chunk(chunk)
+    return rule.finish()
+
+
+def test_expression_prefixes_whole_column_names_only():
+    """Test that SQL pushdown qualifies columns without touching longer names"""
+    rule = Expression("unit_price > price", ["price", "unit_price"])
+    assert rule.sql_aggregate() == "COUNT(*) FILTER (WHERE NOT (t.unit_price > t.price))"
+
+
+def test_references_joins_parent_table():
+    """Test that referential rules add a LEFT JOIN and count orphaned keys"""
+    rule = References("product_key", "marts.dim_products", "product_key")
+    assert rule.sql_joins(2) == "LEFT JOIN marts.dim_products ref2 ON t.product_key = ref2.product_key"
+    assert "ref2.product_key IS NULL" in rule.sql_aggregate()
+
+
+def test_chunked_rules_accumulate_across_chunks():
+    """Test that vectorised rules give whole-table results when streamed in chunks"""
+    chunks = [
+        pd.DataFrame({"id": [1, 2, None], "price": [10.0, 5.0, 3.0], "cost": [4.0, 6.0, None]}),
+        pd.DataFrame({"id": [2, 3, None], "price": [8.0, 1.0, 2.0], "cost": [2.0, 1.0, 1.0]}),
+    ]
+
+    assert run_chunks(NotNull("id"), chunks) == 2
+    assert run_chunks(Unique("id"), chunks) == 1
+    assert run_chunks(Expression("price > cost", ["price", "cost"]), chunks) == 2
+    assert run_chunks(MinRows(1), chunks) == 6
+
+
+def test_thresholds_grade_failure_rate():
+    """Test that failure rates are graded against warn/fail thresholds"""
+    rule = NotNull("email", warn_threshold=0.0, fail_threshold=0.05)
+
+    assert rule.measure(0, 100) == (0.0, PASS)
+    assert rule.measure(3, 100) == (0.03, WARN)
+    assert rule.measure(10, 100) == (0.1, FAIL)
+    assert rule.measure(0, 0) == (0.0, PASS)
+
+
+def test_freshness_and_row_count_thresholds():
+    """Test that freshness is graded in hours and row counts against the minimum"""
+    rule = Freshness("updated_at", warn_after_hours=24, fail_after_hours=72)
+    assert rule.measure(1.0, 10)[1] == PASS
+    assert rule.measure(30.0, 10)[1] == WARN
+    assert rule.measure(100.0, 10)[1] == FAIL
+    assert rule.measure(None, 0)[1] == FAIL
+
+    assert MinRows(1).measure(0, 0) == (0, FAIL)
+    assert MinRows(1).measure(5, 5) == (5, PASS)
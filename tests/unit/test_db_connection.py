@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.utils.config import config
+from src.utils.db_connection import DatabaseConnection, ReplicaSet
+
+
+def test_engine_is_created_lazily(tmp_path):
+    """Test that no engine exists until it is first used"""
+    database = DatabaseConnection(f"sqlite:///{tmp_path / 'lazy.db'}")
+    assert database._engine is None
+
+    engine = database.engine
+
+    assert engine is not None
+    assert database.engine is engine
+
+
+def test_engine_pool_is_reset_after_fork(tmp_path):
+    """Test that a child process reuses the engine with a fresh pool"""
+    database = DatabaseConnection(f"sqlite:///{tmp_path / 'fork.db'}")
+    engine = database.engine
+    pool = engine.pool
+
+    # Pretend the engine was created by a parent process
+    database._pid = -1
+
+    assert database.engine is engine
+    assert engine.pool is not pool
+
+
+def test_replica_engines_are_reset_after_fork(tmp_path):
+    """Test that a child process gets new replica engines without touching the primary"""
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    database = DatabaseConnection(f"sqlite:///{tmp_path / 'primary.db'}", replica_urls=[replica_url])
+    replica = database.replica_engine(replica_url)
+    assert database.replica_engine(replica_url) is replica
+
+    # Pretend the replica engine was created by a parent process
+    database._pid = -1
+
+    assert database.replica_engine(replica_url) is not replica
+    assert database._engine is None
+
+
+def test_replicas_rotate_and_skip_unhealthy_ones():
+    """Test round-robin replica order, lag limits and the retry window"""
+    replicas = ReplicaSet(["r1", "r2", "r3"], max_lag=5, check_interval=60, retry=60)
+
+    assert replicas.candidates() == ["r1", "r2", "r3"]
+    assert replicas.candidates() == ["r2", "r3", "r1"]
+
+    replicas.mark_down("r3", "connection refused")
+    assert replicas.record_lag("r1", 1.0) is True
+    assert replicas.record_lag("r2", 9.0) is False
+    assert replicas.candidates() == ["r1"]
+    assert replicas.needs_check("r1") is False
+
+
+def test_read_connection_uses_primary_without_replicas(tmp_path):
+    """Test that reads go to the primary engine when no replicas are configured"""
+    database = DatabaseConnection(f"sqlite:///{tmp_path / 'reads.db'}", replica_urls=[])
+
+    with database.read_connection() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+    assert not database.replicas
+    assert database._replica_engines == {}
+
+
+def test_workloads_have_their_own_pools_and_wait_stats(tmp_path, monkeypatch):
+    """Test that each workload profile gets its own engine, concurrency limit and wait statistics"""
+    tiny = {**config.workload_profile('etl'), 'pool_size': 1, 'max_concurrency': 1, 'pool_timeout': 0}
+    monkeypatch.setitem(config.WORKLOAD_PROFILES, 'tiny', tiny)
+    database = DatabaseConnection(f"sqlite:///{tmp_path / 'workloads.db'}", replica_urls=[], workload='etl')
+    etl_engine = database.engine
+
+    database.use_workload('tiny')
+    assert database.engine is not etl_engine
+    with database.get_connection():
+        with pytest.raises(PoolTimeoutError):
+            with database.get_connection():
+                pass
+
+    database.use_workload('etl')
+    assert database.engine is etl_engine
+    waits = {(row['workload'], row['pool']): row for row in database.wait_report()}
+    assert waits[('tiny', 'sync')]['checkouts'] == 1
+    assert waits[('tiny', 'sync')]['timeouts'] == 1
+    assert waits[('etl', 'sync')]['checkouts'] == 0
+
+    with pytest.raises(ValueError):
+        database.use_workload('nightly')
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.downsample import lttb, lttb_indices
+from src.utils.kpis import trend_bucket
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    """Test that LTTB returns the target count, both endpoints and the spike"""
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    y[437] = 25.0
+
+    kept = lttb_indices(x, y, 100)
+
+    assert len(kept) == 100
+    assert kept[0] == 0 and kept[-1] == 999
+    assert 437 in kept
+    assert np.all(np.diff(kept) > 0)
+
+
+def test_lttb_frame_passthrough_and_datetimes():
+    """Test that short frames are untouched and datetime x columns are supported"""
+    df = pd.DataFrame({
+        "date": pd.date_range("2020-01-01", periods=500, freq="D"),
+        "revenue": np.random.default_rng(0).random(500),
+    })
+
+    assert lttb(df, "date", "revenue", 1000) is df
+    assert lttb(df, "date", "revenue", None) is df
+    assert len(lttb(df, "date", "revenue", 50)) == 50
+
+
+def test_trend_bucket_grows_with_window():
+    """Test that longer windows roll up into coarser buckets"""
+    assert trend_bucket(7) == "day"
+    assert trend_bucket(90) == "day"
+    assert trend_bucket(365) == "week"
+    assert trend_bucket(9999) == "month"
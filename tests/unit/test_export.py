@@ -0,0 +1,32 @@
+from collections import namedtuple
+
+import pyarrow as pa
+
+from src.utils.export import _arrow_type, _to_arrow_column, infer_format
+
+Column = namedtuple("Column", "name type_code precision scale")
+
+
+def test_infer_format_from_destination():
+    """Test that the format follows --format, then the file extension"""
+    assert infer_format("-") == "csv"
+    assert infer_format("exports/orders.parquet") == "parquet"
+    assert infer_format("exports/orders.csv") == "csv"
+    assert infer_format("exports/orders.dat", "parquet") == "parquet"
+
+
+def test_arrow_types_from_cursor_description():
+    """Test that declared numerics stay exact and unconstrained ones become floats"""
+    assert _arrow_type(Column("order_id", 23, None, None)) == pa.int32()
+    assert _arrow_type(Column("total_amount", 1700, 12, 2)) == pa.decimal128(12, 2)
+    assert _arrow_type(Column("revenue", 1700, 65535, 65535)) == pa.float64()
+    assert _arrow_type(Column("order_date", 1114, None, None)) == pa.timestamp("us")
+    assert _arrow_type(Column("payload", 114, None, None)) == pa.string()
+
+
+def test_to_arrow_column_converts_values():
+    """Test that values are coerced to the column's Arrow type, keeping NULLs"""
+    from decimal import Decimal
+
+    assert _to_arrow_column([Decimal("1.5"), None], pa.float64()).to_pylist() == [1.5, None]
+    assert _to_arrow_column([{"a": 1}, None], pa.string()).to_pylist() == ["{'a': 1}", None]
@@ -0,0 +1,96 @@
+from datetime import date
+from decimal import Decimal
+
+import pandas as pd
+
+from src.utils.frames import FrameCache, compact_frame, frame_memory
+
+
+def make_frame(rows=200):
+    return pd.DataFrame({
+        "order_id": range(rows),
+        "status": ["completed", "shipped"] * (rows // 2),
+        "customer": [f"customer {i}" for i in range(rows)],
+        "order_day": [date(2025, 1, 1 + i % 28) for i in range(rows)],
+        "revenue": [Decimal("1234567.89")] * rows,
+    })
+
+
+def test_compact_frame_dtypes_and_precision():
+    """Test that strings, dates and decimals get compact dtypes without losing cents"""
+    df = make_frame()
+    compact = compact_frame(df)
+
+    assert compact["order_id"].dtype == "int16"
+    assert isinstance(compact["status"].dtype, pd.CategoricalDtype)
+    assert not isinstance(compact["customer"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(compact["order_day"])
+    assert compact["revenue"].dtype == "float64"
+    assert compact["revenue"].iloc[0] == 1234567.89
+    assert frame_memory(compact) < frame_memory(df)
+
+
+def test_small_frames_keep_plain_strings():
+    """Test that tiny aggregates are not turned into categoricals"""
+    compact = compact_frame(make_frame(rows=10))
+    assert not isinstance(compact["status"].dtype, pd.CategoricalDtype)
+
+
+def test_cache_evicts_least_recently_used_within_budget():
+    """Test that the byte budget is enforced by evicting the LRU entry"""
+    frame = compact_frame(make_frame())
+    cache = FrameCache(max_bytes=int(frame_memory(frame) * 2.5))
+
+    cache.put("a", frame)
+    cache.put("b", frame)
+    assert cache.get("a") is not None  # "b" is now least recently used
+    cache.put("c", frame)
+
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.evictions == 1
+    assert cache.total_bytes <= cache.max_bytes
+
+
+def test_get_or_load_caches_and_isolates_callers():
+    """Test that loads are cached and callers cannot mutate the cached frame"""
+    calls = []
+
+    def load():
+        calls.append(1)
+        return make_frame()
+
+    cache = FrameCache(max_bytes=10_000_000)
+    first = cache.get_or_load("q", load)
+    first["revenue"] = first["revenue"].apply(lambda x: f"${x:,.2f}")
+    second = cache.get_or_load("q", load)
+
+    assert len(calls) == 1
+    assert second["revenue"].dtype == "float64"
+    report = cache.report()
+    assert report.loc[0, "hits"] == 1
+    assert report.loc[0, "bytes"] < report.loc[0, "raw_bytes"]
+
+
+def test_expired_entries_are_reloaded():
+    """Test that entries older than the TTL are dropped"""
+    cache = FrameCache(max_bytes=10_000_000, ttl=-1)
+    cache.put("q", make_frame())
+    assert cache.get("q") is None
+
+
+def test_get_or_load_many_only_loads_misses():
+    """Test that batched loads request only the uncached keys"""
+    requested = []
+
+    def load_many(keys):
+        requested.append(list(keys))
+        return {key: make_frame() for key in keys}
+
+    cache = FrameCache(max_bytes=10_000_000)
+    cache.get_or_load("a", make_frame)
+    frames = cache.get_or_load_many(["a", "b", "c"], load_many)
+
+    assert requested == [["b", "c"]]
+    assert set(frames) == {"a", "b", "c"}
+    cache.get_or_load_many(["b", "c"], load_many)
+    assert len(requested) == 1
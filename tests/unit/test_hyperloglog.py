@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from src.utils.hyperloglog import HyperLogLog
+
+
+def test_estimate_is_within_error_bound():
+    """Test that the estimate is within four standard errors of the true count"""
+    ids = np.random.default_rng(42).choice(10**9, size=200_000, replace=False)
+    sketch = HyperLogLog().add_many(ids)
+
+    assert sketch.estimate() == pytest.approx(len(ids), rel=4 * sketch.relative_error)
+
+
+def test_small_counts_are_nearly_exact():
+    """Test that linear counting keeps small daily counts accurate"""
+    sketch = HyperLogLog().add_many(np.arange(1, 51))
+    assert round(sketch.estimate()) == 50
+
+
+def test_union_of_serialised_sketches_counts_overlap_once():
+    """Test that merging daily sketches estimates the distinct union"""
+    day_1 = HyperLogLog().add_many(np.arange(0, 30_000))
+    day_2 = HyperLogLog().add_many(np.arange(20_000, 50_000))
+
+    union = HyperLogLog.union([day_1.to_bytes(), day_2.to_bytes()])
+
+    assert union.estimate() == pytest.approx(50_000, rel=4 * union.relative_error)
+
+
+def test_serialisation_round_trip():
+    """Test that to_bytes/from_bytes preserve the registers"""
+    sketch = HyperLogLog(precision=12).add_many(np.arange(1000))
+    restored = HyperLogLog.from_bytes(sketch.to_bytes())
+
+    assert restored.precision == 12
+    assert np.array_equal(restored.registers, sketch.registers)
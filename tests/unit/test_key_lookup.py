@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from src.transformers.key_lookup import UNKNOWN_KEY, KeyMap
+
+
+def test_resolve_maps_batches_and_unknown_ids():
+    """Test that a whole batch resolves at once, with unknown ids on the unknown member"""
+    key_map = KeyMap(ids=[30, 10, 20], keys=[3, 1, 2])
+
+    keys = key_map.resolve(np.array([10, 20, 30, 40, 5, 20]))
+
+    assert keys.tolist() == [1, 2, 3, UNKNOWN_KEY, UNKNOWN_KEY, 2]
+    assert keys.dtype == np.int32
+
+
+def test_resolve_handles_nulls_and_empty_maps():
+    """Test that NULL ids and empty maps resolve to the unknown member"""
+    ids = pd.Series([10, None], dtype="Int64")
+
+    assert KeyMap(ids=[10], keys=[1]).resolve(ids).tolist() == [1, UNKNOWN_KEY]
+    assert KeyMap().resolve([1, 2]).tolist() == [UNKNOWN_KEY, UNKNOWN_KEY]
+
+
+def test_update_adds_members_and_replaces_keys():
+    """Test that incremental updates add new ids and the newest key wins"""
+    key_map = KeyMap(ids=[1, 2], keys=[100, 200])
+    key_map.update([3, 2], [300, 250])
+
+    assert len(key_map) == 3
+    assert key_map.max_key == 300
+    assert key_map.resolve([1, 2, 3]).tolist() == [100, 250, 300]
@@ -0,0 +1,66 @@
+import pytest
+
+from src.loaders.schemas import read_staging_csv
+from src.utils.order_firehose import BACKPRESSURE_MARKER, OrderFirehose, rate_multiplier
+
+
+def make_firehose(tmp_path, **kwargs):
+    return OrderFirehose(
+        customer_ids=[1, 2, 3],
+        products=[(10, 9.99), (11, 20.0), (12, 5.5), (13, 1.25), (14, 100.0), (15, 42.0)],
+        next_order_id=101,
+        next_item_id=1001,
+        inbox=tmp_path / "raw",
+        seed=7,
+        **kwargs,
+    )
+
+
+def test_rate_profiles():
+    """Test the rate multiplier of each profile over time"""
+    assert rate_multiplier('constant', 123) == 1.0
+    assert rate_multiplier('burst', 5, period=60, burst_factor=4) == 4.0
+    assert rate_multiplier('burst', 30, period=60, burst_factor=4) == 1.0
+    assert [rate_multiplier('ramp', t, period=10) for t in (0, 9.9, 10, 25)] == [1.0, 1.0, 2.0, 3.0]
+    assert rate_multiplier('wave', 15, period=60) == pytest.approx(1.5)
+    with pytest.raises(ValueError):
+        rate_multiplier('spiky', 0)
+
+
+def test_generated_orders_reference_existing_keys(tmp_path):
+    """Test that generated rows reference known customers/products and continue the ids"""
+    firehose = make_firehose(tmp_path)
+    orders, items = firehose.generate(50)
+
+    assert orders['order_id'].tolist() == list(range(101, 151))
+    assert set(orders['customer_id']) <= {1, 2, 3}
+    assert set(items['order_id']) == set(orders['order_id'])
+    assert items['order_item_id'].tolist() == list(range(1001, 1001 + len(items)))
+    assert not items.duplicated(['order_id', 'product_id']).any()
+    assert items.groupby('order_id').size().between(1, 5).all()
+
+    prices = {10: 9.99, 11: 20.0, 12: 5.5, 13: 1.25, 14: 100.0, 15: 42.0}
+    assert (items['unit_price'] == items['product_id'].map(prices)).all()
+
+    next_orders, next_items = firehose.generate(1)
+    assert next_orders['order_id'].iloc[0] == 151
+    assert next_items['order_item_id'].iloc[0] == 1001 + len(items)
+
+
+def test_raw_sink_writes_ingestible_file_pairs(tmp_path):
+    """Test that each emit writes a complete orders/items pair and back-pressure pauses"""
+    firehose = make_firehose(tmp_path)
+    written = firehose.emit(200)
+
+    orders_files = list(firehose.inbox.glob('orders_*.csv'))
+    items_files = list(firehose.inbox.glob('order_items_*.csv'))
+    assert len(orders_files) == 1 and len(items_files) == 1
+    assert not list(firehose.inbox.glob('.*'))
+    # Same validation as the stream ingestor applies
+    orders = read_staging_csv('orders', orders_files[0])
+    items = read_staging_csv('order_items', items_files[0])
+    assert len(orders) + len(items) == written == firehose.rows
+
+    assert not firehose.backpressure()
+    (firehose.inbox / BACKPRESSURE_MARKER).touch()
+    assert firehose.backpressure()
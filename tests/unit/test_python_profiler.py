@@ -0,0 +1,60 @@
+import time
+
+from src.utils.python_profiler import PythonProfiler
+
+
+def busy_loop(seconds):
+    """Spin in Python so the sampler sees this frame"""
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+def allocate_rows(n):
+    return [{'id': i, 'name': f"row {i}"} for i in range(n)]
+
+
+def test_samples_are_attributed_to_stages(tmp_path):
+    """Test that sampled stacks land in the innermost stage and are written as collapsed stacks"""
+    profiler = PythonProfiler()
+    profiler.enable('job', mode='sample', interval_ms=2)
+    try:
+        with profiler.stage('outer'):
+            with profiler.stage('inner'):
+                busy_loop(0.2)
+    finally:
+        profiler.disable()
+
+    assert profiler.stages['inner'].sample_count > 10
+    top = [function for function, *_ in profiler.stages['inner'].top_functions(5)]
+    assert any(function.startswith('busy_loop (') for function in top)
+
+    run_dir = profiler.write(tmp_path)
+    lines = (run_dir / 'stacks.collapsed').read_text().splitlines()
+    _, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 0
+    assert any(line.startswith('inner;') and 'busy_loop' in line for line in lines)
+    assert (run_dir / 'inner.collapsed').exists()
+
+
+def test_cprofile_and_allocation_sites(tmp_path):
+    """Test that cProfile dumps the outermost stage and tracemalloc finds the allocating line"""
+    profiler = PythonProfiler()
+    profiler.enable('job', mode='cprofile', interval_ms=5, trace_memory=True)
+    try:
+        with profiler.stage('build'):
+            rows = allocate_rows(20_000)
+    finally:
+        profiler.disable()
+
+    stage = profiler.stages['build']
+    assert any(function.startswith('allocate_rows (') and calls == 1
+               for function, _, _, calls in stage.top_functions(10))
+    sites = [site for site, _, _ in stage.top_allocations(5)]
+    assert any('test_python_profiler.py' in site for site in sites)
+    assert len(rows) == 20_000
+
+    run_dir = profiler.write(tmp_path)
+    assert (run_dir / 'build.prof').exists()
@@ -0,0 +1,47 @@
+from sqlalchemy import create_engine, text
+
+from src.utils.query_profiler import QueryProfiler, diff_pg_stat_statements, normalize_statement
+
+
+def test_normalize_statement_collapses_whitespace_and_comments():
+    """Test that formatting differences do not split statement stats"""
+    statement = """
+        -- Load orders
+        SELECT  order_id
+        FROM    marts.fact_orders
+    """
+    assert normalize_statement(statement) == "SELECT order_id FROM marts.fact_orders"
+
+
+def test_profiler_times_statements_per_label():
+    """Test that statements are timed and attributed to the current label"""
+    engine = create_engine("sqlite://")
+    profiler = QueryProfiler()
+    profiler.enable(engine, slow_query_ms=10_000)
+
+    with engine.connect() as conn:
+        with profiler.label("stage_a"):
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 1"))
+        with profiler.label("stage_b"):
+            conn.execute(text("SELECT 2"))
+
+    profiler.disable()
+    report = {(r["label"], r["statement"]): r for r in profiler.report()}
+
+    assert report[("stage_a", "SELECT 1")]["calls"] == 2
+    assert report[("stage_b", "SELECT 2")]["calls"] == 1
+    assert all(r["slow_calls"] == 0 for r in report.values())
+
+
+def test_diff_pg_stat_statements_reports_only_new_calls():
+    """Test that the snapshot diff keeps statements executed between snapshots"""
+    base = {"query": "SELECT 1", "calls": 5, "total_ms": 10.0, "rows": 5, "shared_blks_hit": 1, "shared_blks_read": 0}
+    before = {1: base, 2: dict(base, query="SELECT 2")}
+    after = {1: dict(base, calls=8, total_ms=16.0, rows=8), 2: dict(base, query="SELECT 2")}
+
+    deltas = diff_pg_stat_statements(before, after)
+
+    assert len(deltas) == 1
+    assert deltas[0]["calls"] == 3
+    assert deltas[0]["total_ms"] == 6.0
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from src.loaders.schemas import STAGING_SCHEMAS, SchemaError, read_staging_csv
+
+
+def test_schemas_cover_all_staging_tables():
+    """Test that every staging table has a schema"""
+    assert set(STAGING_SCHEMAS) == {"customers", "products", "orders", "order_items"}
+
+
+def test_read_orders_uses_compact_dtypes(sample_data_path):
+    """Test that orders are parsed into compact dtypes with dates at read time"""
+    df = read_staging_csv("orders", sample_data_path / "orders.csv")
+
+    assert list(df.columns) == list(STAGING_SCHEMAS["orders"])
+    assert df["order_id"].dtype == "int32"
+    assert isinstance(df["status"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(df["order_date"])
+
+
+def test_type_drift_is_caught_at_read_time(tmp_path):
+    """Test that a non-numeric value in an integer column fails while reading"""
+    path = tmp_path / "order_items.csv"
+    path.write_text("order_item_id,order_id,product_id,quantity,unit_price\n1,1,40,two,9.99\n")
+
+    with pytest.raises(SchemaError):
+        read_staging_csv("order_items", path)
+
+
+def test_missing_column_is_rejected(tmp_path):
+    """Test that a file without a schema column is rejected"""
+    path = tmp_path / "products.csv"
+    path.write_text("product_id,product_name,category,price\n1,Widget,Toys,9.99\n")
+
+    with pytest.raises(SchemaError):
+        read_staging_csv("products", path)
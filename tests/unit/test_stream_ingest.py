@@ -0,0 +1,108 @@
+import os
+import time
+
+import pytest
+from sqlalchemy import exc
+
+from src.loaders.stream_ingest import MicroBatchIngestor, is_transient
+
+
+def make_ingestor(tmp_path, **kwargs):
+    inbox = tmp_path / "raw"
+    inbox.mkdir()
+    return MicroBatchIngestor(inbox=inbox, processed_dir=tmp_path / "processed", **kwargs)
+
+
+def write_file(path, age_seconds):
+    path.write_text("order_id\n")
+    mtime = time.time() - age_seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_scan_classifies_files_and_skips_unsettled(tmp_path):
+    """Test that files are matched to tables in arrival order and fresh files wait"""
+    ingestor = make_ingestor(tmp_path, settle_seconds=5)
+    write_file(ingestor.inbox / "order_items_1.csv", age_seconds=20)
+    write_file(ingestor.inbox / "orders_1.csv", age_seconds=30)
+    write_file(ingestor.inbox / "orders_2.csv", age_seconds=0)
+
+    pending = ingestor.scan()
+
+    assert [(table, path.name) for table, path, _ in pending] == [
+        ("orders", "orders_1.csv"),
+        ("order_items", "order_items_1.csv"),
+    ]
+
+
+def test_batch_flushes_on_size_or_latency(tmp_path):
+    """Test that a partial batch waits until its oldest file reaches max_latency"""
+    ingestor = make_ingestor(tmp_path, max_batch_files=3, max_latency=10)
+    now = time.time()
+
+    assert not ingestor.batch_ready([("orders", None, now - 1)])
+    assert ingestor.batch_ready([("orders", None, now - 11)])
+    assert ingestor.batch_ready([("orders", None, now)] * 3)
+
+
+def test_backpressure_marker_has_hysteresis(tmp_path):
+    """Test that the marker is raised at the limit and cleared at half of it"""
+    ingestor = make_ingestor(tmp_path, max_pending_files=10)
+    marker = ingestor.inbox / MicroBatchIngestor.BACKPRESSURE_MARKER
+
+    ingestor.update_backpressure(10)
+    assert marker.exists()
+
+    ingestor.update_backpressure(7)
+    assert marker.exists()
+
+    ingestor.update_backpressure(5)
+    assert not marker.exists()
+
+
+def fail_ingest(ingestor, error):
+    """Make every batch read the inbox files and fail with ``error`` on ingest"""
+    def read_batch(pending):
+        return {"orders": [], "order_items": []}, pending, 0
+
+    def ingest(frames):
+        raise error
+
+    ingestor.read_batch = read_batch
+    ingestor.ingest = ingest
+
+
+@pytest.mark.parametrize("error, transient", [
+    (exc.OperationalError("UPDATE", {}, Exception("server closed the connection unexpectedly")), True),
+    (exc.DBAPIError("UPDATE", {}, Exception("connection reset"), connection_invalidated=True), True),
+    (exc.IntegrityError("INSERT", {}, Exception("duplicate key value")), False),
+    (ValueError("could not convert string to float"), False),
+])
+def test_is_transient(error, transient):
+    """Test that connection and operational errors are retried, data errors are not"""
+    assert is_transient(error) == transient
+
+
+def test_transient_error_keeps_files_until_attempts_run_out(tmp_path):
+    """Test that a transient failure leaves the batch in the inbox and backs off"""
+    ingestor = make_ingestor(tmp_path, max_attempts=2, retry_backoff=0.5)
+    write_file(ingestor.inbox / "orders_1.csv", age_seconds=10)
+    fail_ingest(ingestor, exc.OperationalError("UPDATE", {}, Exception("deadlock detected")))
+
+    assert ingestor.process_batch(ingestor.scan()) == 0
+    assert (ingestor.inbox / "orders_1.csv").exists()
+    assert ingestor.retry_at > time.monotonic()
+
+    assert ingestor.process_batch(ingestor.scan()) == 1
+    assert (ingestor.failed_dir / "orders_1.csv").exists()
+    assert not ingestor.attempts
+
+
+def test_permanent_error_moves_files_to_failed(tmp_path):
+    """Test that an error the same data would hit again quarantines the batch at once"""
+    ingestor = make_ingestor(tmp_path)
+    write_file(ingestor.inbox / "orders_1.csv", age_seconds=10)
+    fail_ingest(ingestor, exc.IntegrityError("INSERT", {}, Exception("duplicate key value")))
+
+    assert ingestor.process_batch(ingestor.scan()) == 1
+    assert (ingestor.failed_dir / "orders_1.csv").exists()
+    assert ingestor.retry_at == 0.0